@@ -0,0 +1,62 @@
+"""
+The classes of the order book simulator, as a package.
+
+The notebooks keep importing the modules directly (from classes.order_book import OrderBook), but the main
+classes can also be imported from the package (from classes import OrderBook). The package doesn't import
+any module until one of its names is used, so that a process of a pool that only runs the matching engine
+doesn't load the modules it never uses.
+
+The core (order book, traders, market managers) only depends on numpy. prettytable (print_order_book_state,
+print_active_orders), matplotlib (utilities.plot_order_flow), pandas and pyarrow (RollEstimator.update_from_file,
+SimulationExporter) and scipy (policies, SequentialTradeSimulator) are imported only by the modules and methods
+that use them. The import time of the core can be checked with classes.import_budget.
+"""
+import importlib
+
+# name -> module that defines it
+_exports = {
+    'Order': 'order',
+    'Trade': 'trade',
+    'BookSide': 'book_side',
+    'TriggerBook': 'trigger_book',
+    'RingBuffer': 'ring_buffer',
+    'SpillWriter': 'ring_buffer',
+    'OrderBook': 'order_book',
+    'Trader': 'trader',
+    'MarketManager': 'market_manager',
+    'EventScheduler': 'event_scheduler',
+    'EventMarketManager': 'event_market_manager',
+    'OrderFlowGenerator': 'order_flow_generator',
+    'Policy': 'policy',
+    'ExpectedUtilityPolicy': 'policy',
+    'UtilityCache': 'utility_cache',
+    'SimulationExporter': 'simulation_exporter',
+    'RollEstimator': 'roll_estimator',
+    'PriceImpactEstimator': 'price_impact_estimator',
+    'SequentialTradeSimulator': 'sequential_trade_simulator',
+    'OrderFlowMatrix': 'order_flow_matrix',
+    'EnsembleStatistics': 'ensemble_statistics',
+    'QuantileSketch': 'ensemble_statistics',
+    'Indicator': 'streaming_indicators',
+    'EWMAMidPrice': 'streaming_indicators',
+    'RealizedVolatility': 'streaming_indicators',
+    'RollingOrderFlowImbalance': 'streaming_indicators',
+    'TradeSignAutocorrelation': 'streaming_indicators',
+    'VWAP': 'streaming_indicators',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    # import the module of name the first time it is used
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
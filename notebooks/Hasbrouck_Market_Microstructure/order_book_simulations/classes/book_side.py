@@ -0,0 +1,193 @@
+"""
+This class keeps the price levels of one side of the order book (bids or asks), updated incrementally
+while orders are added, filled and cancelled.
+
+Every price level is a FIFO queue of orders. For each order the class keeps the volume that sits ahead of it
+at its price level (queue ahead), so that a market maker can know its queue position with an O(1) query:
+- when a new order is added, it goes at the end of the queue and the queue ahead is the volume of the level
+- when the first order of the level is filled, the queue ahead of every other order goes down by the filled volume.
+  This costs O(1): the level keeps the total volume filled at its front, and the queue ahead of an order is
+  its queue ahead when it entered (plus the volume filled at that time) minus the volume filled since
+- when an order is cancelled or reduced, only the orders behind it are updated
+
+The orders are identified by the key (order_id, trader_id). Orders with the same key at the same price
+are tracked together, with the queue position of the first one.
+
+The volumes of the levels, the volume filled at their front and the queue ahead of the orders are exact running
+sums, they are not rounded at every update (the rounding errors would build up over a long simulation, and integer
+volumes would become floats). The quantity of an order is rounded like the quantity of the same order in the lists
+of the book, so that the two always agree on when an order is fully filled.
+
+The prices of the levels are kept sorted, and the cumulative volume and notional of the levels (from the best
+price outwards) are cached as prefix sums. Any change of the side drops the cache, and the first query after
+the change rebuilds it in O(L) with L levels. The queries that follow, until the next change, are binary searches,
+O(log L) ("VWAP and worst price to fill Q units", "volume up to a price"). So many agents querying the same state
+of the book pay the rebuild once, but a query after every order costs O(L).
+"""
+from bisect import bisect_left, insort
+import numpy as np
+
+
+class PriceLevel():
+    def __init__(self):
+        self.volume = 0 # total volume of the level
+        self.filled = 0 # total volume filled at the front of the level
+        self.orders = {} # key -> [queue ahead + volume filled when the order entered, quantity], in time priority
+
+
+class BookSide():
+
+    def __init__(self, side):
+        self.side = side # 'bid' or 'ask'
+        self.levels = {} # price -> PriceLevel
+        self.prices = [] # prices of the levels, sorted ascending
+        self.volume = 0 # total volume of the side
+        self.prefix_sums = None # cached (prices, cumulative volumes, cumulative notionals), best price first
+
+    def rebuild(self, orders):
+        # rebuild the levels from a list of (price, quantity, order_id, trader_id), sorted by priority.
+        # Rows can be shorter, like the (price, quantity) rows of the tests: order_id defaults to 0 and trader_id to None
+        self.levels = {}
+        self.prices = []
+        self.volume = 0
+        self.prefix_sums = None
+        for order in orders:
+            price, quantity, order_id, trader_id = tuple(order) + (0, None)[len(order) - 2:]
+            self.add(price, (order_id, trader_id), quantity)
+
+    def add(self, price, key, quantity):
+        # a new order goes at the end of the queue of its level
+        level = self.levels.get(price)
+        if level is None:
+            level = PriceLevel()
+            self.levels[price] = level
+            insort(self.prices, price)
+
+        if key in level.orders:
+            level.orders[key][1] = round(level.orders[key][1] + quantity, 5)
+        else:
+            level.orders[key] = [level.volume + level.filled, quantity]
+
+        level.volume += quantity
+        self.volume += quantity
+        self.prefix_sums = None
+
+    def fill(self, price, key, quantity):
+        # the order is executed for quantity units. If it is the first order of the level this costs O(1)
+        level = self.levels.get(price)
+        if (level is None) or (key not in level.orders):
+            return
+
+        if next(iter(level.orders)) != key:
+            # the order is not at the front of the queue: it is like a cancellation of part of the order
+            self.reduce(price, key, quantity)
+            return
+
+        level.filled += self.remove_quantity(price, level, key, quantity)
+
+    def reduce(self, price, key, quantity):
+        # the order is cancelled for quantity units, the orders behind it move forward
+        level = self.levels.get(price)
+        if (level is None) or (key not in level.orders):
+            return
+
+        keys = list(level.orders)
+        keys_behind = keys[keys.index(key) + 1:]
+
+        removed_quantity = self.remove_quantity(price, level, key, quantity)
+        for other_key in keys_behind:
+            level.orders[other_key][0] -= removed_quantity
+
+    def remove_quantity(self, price, level, key, quantity):
+        # remove quantity units of the order, return the volume that left the level
+        entry = level.orders[key]
+        new_quantity = round(entry[1] - quantity, 5)
+        removed_quantity = entry[1] if new_quantity <= 0 else entry[1] - new_quantity
+        entry[1] = new_quantity
+        level.volume -= removed_quantity
+        self.volume -= removed_quantity
+
+        if entry[1] <= 0:
+            del level.orders[key]
+
+        if not level.orders:
+            del self.levels[price]
+            self.prices.pop(bisect_left(self.prices, price))
+            if not self.levels:
+                # an empty side has no volume, this also drops the rounding errors of the running sum
+                self.volume = 0
+
+        self.prefix_sums = None
+        return removed_quantity
+
+    def queue_ahead(self, price, key):
+        # volume ahead of the order at its price level, None if the order is not in the book
+        level = self.levels.get(price)
+        if (level is None) or (key not in level.orders):
+            return None
+
+        return max(round(level.orders[key][0] - level.filled, 5), 0)
+
+    def level_volume(self, price):
+        # total volume at a price level
+        level = self.levels.get(price)
+        if level is None:
+            return 0
+        else:
+            return level.volume
+
+    def return_prefix_sums(self):
+        # prices of the levels from the best one outwards, with cumulative volumes and notionals
+        if self.prefix_sums is None:
+            if self.side == 'bid':
+                prices = self.prices[::-1]
+            else:
+                prices = self.prices
+
+            volumes = np.array([self.levels[price].volume for price in prices], dtype=float)
+            prices = np.array(prices, dtype=float)
+
+            self.prefix_sums = (prices, np.cumsum(volumes), np.cumsum(prices * volumes))
+
+        return self.prefix_sums
+
+    def total_volume(self):
+        # total volume of this side of the book
+        return self.volume
+
+    def cost_to_fill(self, quantity):
+        """Return (VWAP, worst price, filled quantity) of a market order of quantity units hitting this side.
+        If the side doesn't have enough volume, the order is filled only for the available volume.
+        """
+        prices, cumulative_volumes, cumulative_notionals = self.return_prefix_sums()
+        if (len(prices) == 0) or (quantity <= 0):
+            return (np.nan, np.nan, 0)
+
+        # first level where the cumulative volume reaches the quantity
+        index = np.searchsorted(cumulative_volumes, quantity)
+
+        if index == len(prices):
+            filled_quantity = float(cumulative_volumes[-1])
+            return (float(cumulative_notionals[-1]) / filled_quantity, float(prices[-1]), filled_quantity)
+
+        if index == 0:
+            notional = quantity * prices[0]
+        else:
+            notional = cumulative_notionals[index - 1] + (quantity - cumulative_volumes[index - 1]) * prices[index]
+
+        return (float(notional) / quantity, float(prices[index]), quantity)
+
+    def volume_up_to_price(self, price):
+        # volume of the levels with a price at least as good as price
+        # (asks with price <= price, bids with price >= price)
+        prices, cumulative_volumes, _ = self.return_prefix_sums()
+
+        if self.side == 'bid':
+            index = np.searchsorted(-prices, -price, side='right')
+        else:
+            index = np.searchsorted(prices, price, side='right')
+
+        if index == 0:
+            return 0
+        else:
+            return float(cumulative_volumes[index - 1])
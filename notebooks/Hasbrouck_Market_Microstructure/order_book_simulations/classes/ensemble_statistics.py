@@ -0,0 +1,264 @@
+"""
+This class reduces the results of many paths of a simulation (a Monte Carlo ensemble) to statistics per step,
+without keeping the paths in memory.
+
+Every quantity (for example the total wealth of a trader, or the price) is a sequence with one value per step.
+The paths are added one at a time (add_path) or in blocks (add_paths), and for every step the class keeps:
+- count, mean and sum of squared deviations (Welford), so the mean and the variance are exact. Blocks of paths
+  are combined with the parallel formula of Chan et al., the same used to merge two reducers
+- minimum and maximum
+- a quantile sketch (QuantileSketch): the values are kept in levels of at most sketch_size items, an item of level h
+  stands for 2^h paths. When a level is full it is sorted and every other item moves to the next level, so the
+  memory grows like sketch_size * log2(paths / sketch_size) per step and the rank error like log2(paths / sketch_size) / sketch_size
+- optionally a histogram with fixed bin edges, plus an underflow and an overflow bin
+
+Two reducers built on different processes (for example by the variants of MarketManager.fork, or by the
+workers of a pool) are merged with merge, and the result is the same (exactly for counts, means, variances and
+histograms, within the sketch error for the quantiles) as adding all the paths to one reducer.
+nan values are skipped. The random choices of the sketch use numpy's global generator. Example:
+
+statistics = EnsembleStatistics(histogram_edges=np.linspace(0, 200, 41))
+for path in range(number_of_paths):
+    mm = ...
+    mm.run_market_manager()
+    statistics.add_market_manager(mm, sequences=('total_wealth_sequence',))
+
+statistics.mean((0, 'total_wealth_sequence')) # mean total wealth of trader 0 at every step
+statistics.quantile((0, 'total_wealth_sequence'), [0.05, 0.5, 0.95])
+"""
+import copy
+import numpy as np
+
+
+class QuantileSketch():
+
+    def __init__(self, number_of_steps, sketch_size=256):
+        self.number_of_steps = number_of_steps
+        self.sketch_size = sketch_size # maximum number of items of a level
+
+        self.buffer = [] # rows of level 0 not stacked yet
+        self.levels = [np.empty((0, number_of_steps))] # levels[h] has shape (items, steps), each item weights 2^h
+
+    def add(self, values):
+        # values has shape (paths, steps)
+        self.buffer.append(values)
+        if sum(len(rows) for rows in self.buffer) >= self.sketch_size:
+            self.compress()
+
+    def compress(self):
+        if self.buffer:
+            self.levels[0] = np.concatenate([self.levels[0]] + self.buffer)
+            self.buffer = []
+
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) >= self.sketch_size:
+                # keep one item if the number of items is odd, the others are halved into the next level
+                number_to_compact = len(level) - len(level) % 2
+                compacted = np.sort(level[:number_to_compact], axis=0)[np.random.randint(2)::2]
+
+                self.levels[h] = level[number_to_compact:]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty((0, self.number_of_steps)))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], compacted])
+            h += 1
+
+    def merge(self, other):
+        self.buffer += other.buffer
+        for h, level in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty((0, self.number_of_steps)))
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.compress()
+
+    def quantile(self, q):
+        """Estimated quantiles q (a number or a list) of every step. Return an array of shape (steps,),
+        or (len(q), steps) if q is a list.
+        """
+        self.compress()
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0**h) for h, level in enumerate(self.levels)])
+
+        order = np.argsort(values, axis=0) # nan are sorted last
+        sorted_values = np.take_along_axis(values, order, axis=0)
+        sorted_weights = np.where(np.isnan(sorted_values), 0, weights[order])
+        cumulative_weights = np.cumsum(sorted_weights, axis=0)
+        total_weights = cumulative_weights[-1] if len(values) else np.zeros(self.number_of_steps)
+
+        quantiles = []
+        for probability in np.atleast_1d(q):
+            # first item whose cumulative weight reaches the rank of the quantile
+            index = np.argmax(cumulative_weights >= probability * total_weights, axis=0)
+            quantile = sorted_values[index, np.arange(self.number_of_steps)] if len(values) else np.full(self.number_of_steps, np.nan)
+            quantiles.append(np.where(total_weights > 0, quantile, np.nan))
+
+        return quantiles[0] if np.ndim(q) == 0 else np.array(quantiles)
+
+
+class SequenceStatistics():
+
+    def __init__(self, number_of_steps, sketch_size=256, histogram_edges=None):
+        self.number_of_steps = number_of_steps
+
+        self.number_of_paths = 0
+        self.count = np.zeros(number_of_steps) # number of paths with a value at every step
+        self.mean = np.zeros(number_of_steps)
+        self.sum_of_squared_deviations = np.zeros(number_of_steps)
+        self.minimum = np.full(number_of_steps, np.inf)
+        self.maximum = np.full(number_of_steps, -np.inf)
+
+        self.sketch = QuantileSketch(number_of_steps, sketch_size)
+
+        # counts of every step in the bins (-inf, edges[0]), [edges[0], edges[1]), ..., [edges[-1], inf)
+        self.histogram_edges = None if histogram_edges is None else np.asarray(histogram_edges, dtype=float)
+        if self.histogram_edges is None:
+            self.histogram = None
+        else:
+            self.histogram = np.zeros((number_of_steps, len(self.histogram_edges) + 1), dtype=np.int64)
+
+    def combine_moments(self, count, mean, sum_of_squared_deviations):
+        # parallel Welford update with the moments of another group of paths
+        total_count = self.count + count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = mean - self.mean
+            weight = np.where(total_count > 0, count / total_count, 0)
+            self.mean = self.mean + delta * weight
+            self.sum_of_squared_deviations = self.sum_of_squared_deviations + sum_of_squared_deviations + delta**2 * self.count * weight
+        self.count = total_count
+
+    def add(self, values):
+        # values has shape (paths, steps)
+        self.number_of_paths += len(values)
+        is_valid = ~np.isnan(values)
+        count = is_valid.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, np.where(is_valid, values, 0).sum(axis=0) / count, 0)
+        sum_of_squared_deviations = np.where(is_valid, (values - mean)**2, 0).sum(axis=0)
+        self.combine_moments(count, mean, sum_of_squared_deviations)
+
+        self.minimum = np.minimum(self.minimum, np.where(is_valid, values, np.inf).min(axis=0))
+        self.maximum = np.maximum(self.maximum, np.where(is_valid, values, -np.inf).max(axis=0))
+
+        self.sketch.add(values)
+
+        if self.histogram is not None:
+            bins = np.searchsorted(self.histogram_edges, values, side='right')
+            steps = np.broadcast_to(np.arange(self.number_of_steps), values.shape)
+            np.add.at(self.histogram, (steps[is_valid], bins[is_valid]), 1)
+
+    def merge(self, other):
+        self.number_of_paths += other.number_of_paths
+        self.combine_moments(other.count, other.mean, other.sum_of_squared_deviations)
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self.sketch.merge(other.sketch)
+        if self.histogram is not None:
+            self.histogram += other.histogram
+
+
+class EnsembleStatistics():
+
+    def __init__(self, sketch_size=256, histogram_edges=None):
+        self.sketch_size = sketch_size # items per level of the quantile sketches
+        self.histogram_edges = histogram_edges # bin edges of the histograms, None to skip them
+
+        self.statistics = {} # name of the sequence -> SequenceStatistics
+
+    @property
+    def number_of_paths(self):
+        # every path adds a value to all the sequences, so the sequence with most paths counts them all
+        return max((statistics.number_of_paths for statistics in self.statistics.values()), default=0)
+
+    def add_paths(self, name, values):
+        """Add a block of paths of the sequence name, values has shape (paths, steps) (or (steps,) for one path).
+        All the paths of a sequence must have the same number of steps.
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+
+        if name not in self.statistics:
+            self.statistics[name] = SequenceStatistics(values.shape[1], self.sketch_size, self.histogram_edges)
+        statistics = self.statistics[name]
+        if values.shape[1] != statistics.number_of_steps:
+            raise ValueError(f'the paths of {name} have {statistics.number_of_steps} steps.\nYou passed {values.shape[1]}')
+
+        statistics.add(values)
+
+    def add_path(self, sequences):
+        # add one path: sequences is a dictionary name -> array of values, one per step
+        for name, values in sequences.items():
+            self.add_paths(name, values)
+
+    def add_market_manager(self, manager, sequences=('total_wealth_sequence',)):
+        """Add the path of a simulation run by a MarketManager: for every trader and every sequence of (time, value)
+        tuples, the name is (trader_id, sequence name).
+        """
+        path = {}
+        for trader in manager.traders:
+            for sequence_name in sequences:
+                path[(trader.trader_id, sequence_name)] = [value for _, value in getattr(trader, sequence_name)]
+
+        self.add_path(path)
+
+    def merge(self, other):
+        # add the paths of another reducer, for example the partial result of a worker. other is not modified
+        for name, statistics in other.statistics.items():
+            if name in self.statistics:
+                self.statistics[name].merge(statistics)
+            else:
+                self.statistics[name] = copy.deepcopy(statistics)
+        return self
+
+    @staticmethod
+    def merge_all(reducers):
+        # a new reducer with the paths of all the reducers, which are not modified
+        reducers = list(reducers)
+        result = EnsembleStatistics(reducers[0].sketch_size, reducers[0].histogram_edges)
+        for reducer in reducers:
+            result.merge(reducer)
+        return result
+
+    def count(self, name):
+        return self.statistics[name].count
+
+    def mean(self, name):
+        statistics = self.statistics[name]
+        return np.where(statistics.count > 0, statistics.mean, np.nan)
+
+    def variance(self, name, ddof=1):
+        statistics = self.statistics[name]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(statistics.count > ddof, statistics.sum_of_squared_deviations / (statistics.count - ddof), np.nan)
+
+    def std(self, name, ddof=1):
+        return np.sqrt(self.variance(name, ddof))
+
+    def minimum(self, name):
+        return self.statistics[name].minimum
+
+    def maximum(self, name):
+        return self.statistics[name].maximum
+
+    def quantile(self, name, q):
+        return self.statistics[name].sketch.quantile(q)
+
+    def histogram(self, name):
+        # (bin edges, counts of shape (steps, len(edges) + 1)), the first and the last bins are the underflow and the overflow
+        statistics = self.statistics[name]
+        if statistics.histogram is None:
+            raise ValueError('pass histogram_edges to EnsembleStatistics to compute the histograms')
+        return statistics.histogram_edges, statistics.histogram
+
+    def summary(self, name, quantiles=(0.05, 0.5, 0.95)):
+        # dictionary of arrays with one value per step
+        summary = {
+            'number_of_paths': self.statistics[name].number_of_paths,
+            'count': self.count(name),
+            'mean': self.mean(name),
+            'std': self.std(name),
+            'min': self.minimum(name),
+            'max': self.maximum(name),
+        }
+        for q, values in zip(quantiles, self.quantile(name, list(quantiles))):
+            summary[f'quantile_{q}'] = values
+        return summary
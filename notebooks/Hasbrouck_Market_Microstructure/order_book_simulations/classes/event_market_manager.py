@@ -0,0 +1,195 @@
+"""
+This class is an event driven alternative to MarketManager.
+
+MarketManager advances in lockstep and simulate_market is called at every simulation step, even when
+most traders do nothing. Here the simulation is driven by a priority queue of timestamped events
+(see EventScheduler): traders wake up only when they scheduled a wake up, and the orders they issue
+reach the book after a per-trader latency. A trader that is not waking up is not visited while the events
+are processed, so the matching and the strategies cost time proportional to the number of events.
+The recorded sequences still have one entry per trader and step, so filling them (see below) costs
+O(simulation_length * number of traders) however sparse the simulation is: with many quiet traders this
+recording is most of the running time.
+
+The outputs are still sampled on a regular grid: the simulation has simulation_length steps, each
+lasting sampling_interval units of time. All the events with time in ((step - 1) * sampling_interval, step * sampling_interval]
+are processed in the step, then the book is updated once, like in MarketManager.
+The sequences and the active orders are updated at the end of a step only for the traders touched by its events
+(the traders that woke up or submitted an order, the traders of its trades and of the activated conditional orders).
+The cash and the units of the other traders did not change, so their sequences are filled forward lazily: when they
+are touched again and at the end of run_market_manager (also when the simulation is paused), with the total wealth
+valued at the price of every step. With a retention, all the traders are filled every retention steps.
+So after run_market_manager the sequences are the same as the ones of MarketManager.
+
+Write custom logic in the methods initialise_events and on_wake_up. For example:
+
+class strategy(EventMarketManager):
+    def initialise_events(self):
+        self.schedule_wake_up('noise_trader', time=0.5)
+
+    def on_wake_up(self, trader, time):
+        self.submit_order(trader.trader_id, 'market_buy', None, 1, time)
+        self.schedule_wake_up(trader.trader_id, time + np.random.exponential(10))
+"""
+from .market_manager import MarketManager
+from .order_book import OrderBook
+from .event_scheduler import EventScheduler
+from abc import abstractmethod
+
+
+class EventMarketManager(MarketManager):
+
+    def __init__(self, simulation_length, traders_dict, book: OrderBook, latencies=None, sampling_interval=1):
+        super().__init__(simulation_length, traders_dict, book)
+
+        # dictionary trader_id -> latency. The orders of a trader reach the book after its latency.
+        # traders that are not in the dictionary have no latency
+        if latencies is None:
+            latencies = {}
+        self.latencies = latencies
+
+        # every simulation step lasts sampling_interval units of time
+        self.sampling_interval = sampling_interval
+
+        self.scheduler = EventScheduler()
+
+        self.current_time = 0 # time of the last processed event
+
+        # lazy fill forward of the traders' sequences
+        self.last_recorded_steps = {} # trader_id -> last step recorded in the sequences of the trader
+        self.first_pending_step = 1 # step of valuation_prices[0]
+        self.valuation_prices = [] # price used for the total wealth of every step since first_pending_step
+        self.touched_trader_ids = set() # traders touched by the events of the current step
+
+    def run_market_manager(self, *args, stop_step=None):
+        """This is the main engine that you should run. The events defined in self.initialise_events()
+        are processed in time order, together with the events scheduled while the simulation runs.
+        At the end of each simulation step, update the book and the quantities of the traders touched by the step,
+        like the cash and the number of units. The other traders are filled forward at the end.
+
+        If stop_step is passed, the simulation is paused after that step. Calling this method
+        again resumes the simulation from the next step.
+        """
+
+        if self.current_step == 0:
+            # update the traders' sequences with initial values
+            self.update_traders_cash(simulation_step=0)
+            self.update_traders_number_of_units_of_stock(simulation_step=0)
+            self.last_recorded_steps = {trader.trader_id: 0 for trader in self.traders}
+
+            self.initialise_events(*args)
+
+        for simulation_step in range(self.current_step + 1, self.last_step(stop_step) + 1):
+            self.book.time = simulation_step
+            end_of_step = simulation_step * self.sampling_interval
+            self.touched_trader_ids = set()
+            self.book.trigger_book.activated_trader_ids.clear()
+
+            # process only the events of this step, the quiet traders are never touched
+            next_time = self.scheduler.next_time()
+            while (next_time is not None) and (next_time <= end_of_step):
+                event = self.scheduler.pop()
+                self.current_time = event.time
+                self.touch_trader(event.trader_id, simulation_step)
+                self.process_event(event, simulation_step, *args)
+
+                next_time = self.scheduler.next_time()
+
+            # sample the book and the touched traders on the grid
+            self.book.update_sequences()
+
+            for trade in self.book.trades[simulation_step]:
+                self.touch_trader(trade.trader_id_already_in_book, simulation_step)
+                self.touch_trader(trade.trader_id_coming_in_book, simulation_step)
+            for trader_id in self.book.trigger_book.activated_trader_ids:
+                self.touch_trader(trader_id, simulation_step)
+
+            self.update_current_cash_margin_and_units(simulation_step)
+
+            self.valuation_prices.append(self.return_valuation_price())
+            self.record_traders(self.touched_trader_ids, simulation_step)
+            if self.touched_trader_ids:
+                self.update_traders_active_orders(self.touched_trader_ids)
+
+            self.current_step = simulation_step
+
+            if (self.book.retention is not None) and (len(self.valuation_prices) >= self.book.retention):
+                self.fill_forward()
+
+        self.fill_forward()
+
+    def touch_trader(self, trader_id, simulation_step):
+        # the trader is going to change in this step: first record the steps it was quiet, with its current values
+        if (trader_id in self.touched_trader_ids) or (trader_id not in self.traders_by_id):
+            return
+
+        self.touched_trader_ids.add(trader_id)
+        self.record_quiet_steps(self.traders_by_id[trader_id], simulation_step - 1)
+
+    def record_quiet_steps(self, trader, last_step):
+        # fill the sequences of the trader from its last recorded step up to last_step, its quantities did not change
+        first_step = self.last_recorded_steps[trader.trader_id] + 1
+        if first_step > last_step:
+            return
+
+        units = trader.number_units_stock_in_inventory + trader.number_units_stock_in_market
+        for step in range(first_step, last_step + 1):
+            trader.cash_sequence.append((step, trader.cash))
+            trader.number_units_stock_in_inventory_sequence.append((step, trader.number_units_stock_in_inventory))
+            trader.number_units_stock_in_market_sequence.append((step, trader.number_units_stock_in_market))
+            trader.total_wealth_sequence.append((step, trader.cash + units * self.valuation_prices[step - self.first_pending_step]))
+
+        self.last_recorded_steps[trader.trader_id] = last_step
+
+    def record_traders(self, trader_ids, simulation_step):
+        # record the current step of the touched traders, valued at the price of the step
+        for trader_id in trader_ids:
+            self.record_quiet_steps(self.traders_by_id[trader_id], simulation_step)
+
+    def fill_forward(self):
+        # bring the sequences of all the traders up to the current step
+        for trader in self.traders:
+            self.record_quiet_steps(trader, self.current_step)
+
+        self.first_pending_step = self.current_step + 1
+        self.valuation_prices = []
+
+    def process_event(self, event, simulation_step, *args):
+        trader = self.traders_by_id[event.trader_id]
+
+        if event.event_type == 'wake_up':
+            self.on_wake_up(trader, event.time, *args)
+
+        elif event.event_type == 'order_arrival':
+            order_type, price, quantity = event.order
+
+            # the book is updated once at the end of the step
+            trader.submit_order_to_order_book(
+                order_type, price, quantity, self.book, simulation_step, verbose=False, update_lists=False
+                )
+
+    def schedule_wake_up(self, trader_id, time):
+        # the trader will wake up at the given time and on_wake_up will be called
+        self.scheduler.schedule(time, 'wake_up', trader_id)
+
+    def submit_order(self, trader_id, order_type, price, quantity, time):
+        # the order is issued at the given time, and it reaches the book after the trader's latency
+        if order_type == 'do_nothing':
+            return
+
+        arrival_time = time + self.latencies.get(trader_id, 0)
+        self.scheduler.schedule(arrival_time, 'order_arrival', trader_id, (order_type, price, quantity))
+
+    @abstractmethod
+    def initialise_events(self, *args):
+        """
+        Here you can schedule the first wake ups and orders of the simulation
+        """
+        pass
+
+    @abstractmethod
+    def on_wake_up(self, trader, time, *args):
+        """
+        Here you can add a custom logic of how a trader behaves when it wakes up.
+        The trader can submit orders with self.submit_order and schedule its next wake up with self.schedule_wake_up
+        """
+        pass
@@ -0,0 +1,64 @@
+"""
+This class contains a priority queue of timestamped events, used to run event driven simulations.
+
+Events are popped in order of time. Events with the same time are popped in the order in which
+they were scheduled, so the simulation is deterministic.
+
+The supported events are:
+- wake_up: a trader wakes up and decides what to do
+- order_arrival: an order issued by a trader reaches the order book
+"""
+import heapq
+
+
+class Event():
+
+    supported_events = (
+        'wake_up',
+        'order_arrival')
+
+    def __init__(self, time, event_type, trader_id, order=None):
+
+        if event_type not in self.supported_events:
+            raise ValueError(f'valid values for event_type are {self.supported_events}.\nYou passed {event_type}')
+
+        # time at which the event happens
+        self.time = time
+
+        # type of the event (wake_up / order_arrival)
+        self.event_type = event_type
+
+        # id of the trader the event refers to
+        self.trader_id = trader_id
+
+        # tuple (order_type, price, quantity) if the event is an order arrival, None otherwise
+        self.order = order
+
+
+class EventScheduler():
+
+    def __init__(self):
+        self.queue = [] # heap of (time, sequence number, Event)
+        self.sequence_number = 0 # used to pop events with the same time in FIFO order
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, time, event_type, trader_id, order=None):
+        # add an event to the queue, this costs O(log n)
+        event = Event(time, event_type, trader_id, order)
+        heapq.heappush(self.queue, (time, self.sequence_number, event))
+        self.sequence_number += 1
+
+        return event
+
+    def pop(self):
+        # return the next event, this costs O(log n)
+        return heapq.heappop(self.queue)[2]
+
+    def next_time(self):
+        # time of the next event, None if there are no events left
+        if self.queue:
+            return self.queue[0][0]
+        else:
+            return None
@@ -0,0 +1,83 @@
+"""
+This file measures the import time of the modules of the simulator, in a fresh interpreter like the one of a
+process of a pool, and checks it against a budget.
+
+Each module is imported in a new python process (so nothing is already cached in sys.modules), the import is
+repeated number_of_runs times and the median time is kept. The modules loaded by the import are checked too:
+the core of the simulator must not load the plotting, pretty printing and dataframe libraries. Example, from
+the order_book_simulations directory:
+
+python -m classes.import_budget
+
+or, from a notebook:
+
+from classes.import_budget import check_import_budget
+check_import_budget() # raises an error if the budget is exceeded
+"""
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+# modules that a process of the pool imports to run a simulation
+core_modules = ('classes.market_manager', 'classes.event_market_manager', 'classes.order_flow_generator')
+
+# libraries that the core must not import
+heavy_modules = ('matplotlib', 'prettytable', 'pandas', 'pyarrow', 'scipy')
+
+budget_seconds = 0.5 # import time of a core module, numpy included
+
+_measure_script = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure_import(module, number_of_runs=5):
+    """Median import time (seconds) of module in a fresh interpreter, and the top level packages loaded by it.
+    The interpreter runs in the order_book_simulations directory, so that the package classes is importable.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    times = []
+    for _ in range(number_of_runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _measure_script.format(module=module)],
+            cwd=root, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'])
+
+    loaded_packages = sorted({name.split('.')[0] for name in result['modules']})
+    return float(np.median(times)), loaded_packages
+
+
+def check_import_budget(modules=core_modules, budget=budget_seconds, forbidden=heavy_modules, number_of_runs=5):
+    """Measure the import of every module, and raise a RuntimeError if one of them takes more than budget seconds
+    or loads a forbidden library. Return module -> (seconds, forbidden libraries loaded).
+    """
+    report = {}
+    errors = []
+    for module in modules:
+        seconds, loaded_packages = measure_import(module, number_of_runs)
+        loaded_forbidden = [package for package in forbidden if package in loaded_packages]
+        report[module] = (seconds, loaded_forbidden)
+
+        if seconds > budget:
+            errors.append(f'{module} takes {seconds:.3f} s to import, the budget is {budget:.3f} s')
+        if loaded_forbidden:
+            errors.append(f'{module} imports {loaded_forbidden}')
+
+    if errors:
+        raise RuntimeError('\n'.join(errors))
+
+    return report
+
+
+if __name__ == '__main__':
+    for module, (seconds, _) in check_import_budget().items():
+        print(f'{module}: {seconds * 1000:.1f} ms')
@@ -1,18 +1,39 @@
 """
 This class contains the logic of the simulation. You can run the simulations using the method run_market_manager.
 Write custom logic in the method simulate_market.
+
+A running simulation can be paused with run_market_manager(stop_step=...), saved with checkpoint / save_checkpoint
+and resumed later with restore / load_checkpoint (pass restore_random_state=True to continue with the random numbers
+of the checkpoint). The method fork runs many variants of the simulation starting from the current state,
+so that the shared prefix of the simulation is computed only once. For example:
+
+def informed_trader_enters(manager):
+    manager.informed_trader_active = True
+
+def nothing_changes(manager):
+    pass
+
+mm.run_market_manager(stop_step=50000)
+variants = mm.fork([informed_trader_enters, nothing_changes], processes=2)
 """
-from classes.trader import Trader
-from classes.order_book import OrderBook
+from .trader import Trader
+from .order_book import OrderBook
 from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import pickle
+import zlib
 import numpy as np
 
 class MarketManager():
 
     def __init__(self, simulation_length, traders_dict, book: OrderBook):
         self.simulation_length = simulation_length
-        self.traders = self.generate_traders(traders_dict)
         self.book = book
+        self.traders = self.generate_traders(traders_dict)
+        self.traders_by_id = {trader.trader_id: trader for trader in self.traders}
+
+        self.current_step = 0 # last simulation step that has been run
 
 
     def generate_traders(self, traders_dict):
@@ -22,6 +43,8 @@ class MarketManager():
             - value[0] -> initial_cash : initial cash of the trader, can be a float
             - value[1] -> number_units_stock_in_inventory : inital number of units of stock of the trader, can be a float
             - value[2] -> check_order_feasibility : do I have to check if a trader has enough cash/units to trade?
+
+        The traders record their sequences with the same retention of the book.
         """
 
         traders_list = []
@@ -31,24 +54,30 @@ class MarketManager():
                     initial_cash=value[0], 
                     number_units_stock_in_inventory=value[1], 
                     check_order_feasibility=value[2], 
-                    trader_id=key
+                    trader_id=key,
+                    retention=self.book.retention,
+                    spill_directory=self.book.spill_directory
                     )
                     )
         
         return traders_list
 
-    def run_market_manager(self, *args):
+    def run_market_manager(self, *args, stop_step=None):
         """This is the main engine that you should run. This takes care of running the simulation
         that is defined under self.simulate_market() .
         At each timestep of the simulation, run the actual logic of the market and then 
         update the trader's quantities, like the cash and the number of units.
+
+        If stop_step is passed, the simulation is paused after that step. Calling this method
+        again resumes the simulation from the next step.
         """
 
-        # update the traders' sequences with initial values
-        self.update_traders_cash(simulation_step=0)
-        self.update_traders_number_of_units_of_stock(simulation_step=0)
+        if self.current_step == 0:
+            # update the traders' sequences with initial values
+            self.update_traders_cash(simulation_step=0)
+            self.update_traders_number_of_units_of_stock(simulation_step=0)
 
-        for simulation_step in range(1, self.simulation_length + 1):
+        for simulation_step in range(self.current_step + 1, self.last_step(stop_step) + 1):
             self.simulate_market(simulation_step, *args)
 
             self.update_current_cash_margin_and_units(simulation_step)
@@ -58,6 +87,87 @@ class MarketManager():
             self.update_traders_total_wealth(simulation_step)
             self.update_traders_active_orders()
 
+            self.current_step = simulation_step
+
+    def flush_spilled(self):
+        # write to disk the spilled data of the book and of the traders still waiting for a full chunk
+        self.book.flush_spilled()
+        for trader in self.traders:
+            trader.flush_spilled()
+
+    def last_step(self, stop_step=None):
+        # last step to run, the simulation can't go beyond simulation_length
+        if stop_step is None:
+            return self.simulation_length
+        else:
+            return min(stop_step, self.simulation_length)
+
+    def checkpoint(self, compress=True):
+        """Return the full state of the simulation (book, traders, recorded sequences and the numpy random state) as bytes.
+        The state is pickled and, if compress is True, compressed with a fast zlib level.
+        """
+        state = {'manager': self, 'random_state': np.random.get_state()}
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+        if compress:
+            return b'Z' + zlib.compress(data, 1)
+        else:
+            return b'P' + data
+
+    def save_checkpoint(self, filename, compress=True):
+        with open(filename, 'wb') as f:
+            f.write(self.checkpoint(compress))
+
+    @staticmethod
+    def restore(data, restore_random_state=False):
+        """Return the simulation saved in the checkpoint data. If restore_random_state is True, numpy's global
+        random state is set to the one of the checkpoint, so that resuming the simulation gives the same result
+        as never pausing it. Otherwise the global random state is not touched.
+        """
+        if data[:1] == b'Z':
+            data = zlib.decompress(data[1:])
+        else:
+            data = data[1:]
+
+        state = pickle.loads(data)
+        if restore_random_state:
+            np.random.set_state(state['random_state'])
+
+        return state['manager']
+
+    @staticmethod
+    def load_checkpoint(filename, restore_random_state=False):
+        with open(filename, 'rb') as f:
+            return MarketManager.restore(f.read(), restore_random_state)
+
+    def fork(self, variants, *args, processes=None):
+        """Run until the end one copy of the simulation for each variant, starting from the current state.
+        Every variant is a function that takes the copied MarketManager and modifies it (for example
+        it changes a parameter of the strategy) before the simulation is resumed.
+        The simulation itself is not modified. Return the list of the completed copies.
+
+        If processes is greater than 1, the variants run in parallel in a pool of processes.
+        In that case the variants must be defined at the top level, so that they can be pickled.
+        The copies share the numpy random state of the checkpoint: reseed in the variant if you want
+        independent random numbers.
+        The copies of a simulation run with a spill directory keep spilling to the same directory, so fork
+        such a simulation with a single variant, and export the copy before forking again.
+        """
+        data = self.checkpoint(compress=False)
+
+        if (processes is None) or (processes <= 1):
+            return [_run_fork(data, variant, args) for variant in variants]
+
+        # forked workers see the classes defined in the notebook, spawned workers would not
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = None
+
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            futures = [executor.submit(_run_fork, data, variant, args) for variant in variants]
+            return [future.result() for future in futures]
+
     @abstractmethod
     def simulate_market(self, simulation_step, *args):
         """
@@ -66,6 +176,65 @@ class MarketManager():
         pass
 
 
+    def return_traders_state(self, trader_ids):
+        """Return the state of the traders as a dictionary of numpy arrays, one entry per trader, in the order of trader_ids.
+        This is the input of the vectorised policies (see classes/policy.py).
+        """
+        traders = [self.traders_by_id[trader_id] for trader_id in trader_ids]
+
+        return {
+            'cash': np.array([trader.cash for trader in traders], dtype=float),
+            'margin': np.array([trader.margin for trader in traders], dtype=float),
+            'number_units_stock_in_inventory': np.array([trader.number_units_stock_in_inventory for trader in traders], dtype=float),
+            'number_units_stock_in_market': np.array([trader.number_units_stock_in_market for trader in traders], dtype=float),
+        }
+
+    def submit_orders(self, trader_ids, order_types, prices, quantities, simulation_step, update_lists=True):
+        """Submit to the book the orders of many traders at once. The arrays have one entry per trader,
+        in the order of trader_ids. Prices of market orders are nan and do_nothing orders are skipped.
+        The sequences of the book are updated once, after all the orders.
+        """
+        self.book.time = simulation_step
+
+        for trader_id, order_type, price, quantity in zip(trader_ids, order_types, prices, quantities):
+            if order_type == 'do_nothing':
+                continue
+
+            if (price is not None) and np.isnan(price):
+                price = None
+
+            self.traders_by_id[trader_id].submit_order_to_order_book(
+                str(order_type), price, quantity, self.book, simulation_step, verbose=False, update_lists=False
+                )
+
+        if update_lists:
+            self.book.update_sequences()
+
+    def replace_quotes(self, trader_ids, order_types, old_prices, new_prices, new_quantities, simulation_step, update_lists=True):
+        """Move the resting quotes of many traders (for example the bid and the ask of every market maker) in one call,
+        with OrderBook.replace_quotes. The arrays have one entry per quote: a trader with a two sided quote appears twice,
+        once with limit_buy and once with limit_sell. Return the new order_ids.
+        """
+        quotes = [
+            (self.traders_by_id[trader_id], str(order_type), old_price, new_price, new_quantity, None)
+            for trader_id, order_type, old_price, new_price, new_quantity
+            in zip(trader_ids, order_types, old_prices, new_prices, new_quantities)
+            ]
+
+        return self.book.replace_quotes(quotes, simulation_step, update_lists=update_lists)
+
+    def apply_policy(self, policy, simulation_step, update_lists=True, **traders_parameters):
+        """Let all the traders of a policy decide at once and submit their orders.
+        traders_parameters are additional arrays (one entry per trader) added to the traders' state,
+        for example the expected payoff of each trader at this step.
+        """
+        traders_state = self.return_traders_state(policy.trader_ids)
+        traders_state.update(traders_parameters)
+
+        order_types, prices, quantities = policy.decide(self.book.return_book_features(), traders_state)
+
+        self.submit_orders(policy.trader_ids, order_types, prices, quantities, simulation_step, update_lists)
+
     def update_traders_cash(self, simulation_step):
         for trader in self.traders:
             trader.cash_sequence.append((simulation_step, trader.cash))
@@ -76,13 +245,16 @@ class MarketManager():
             trader.number_units_stock_in_inventory_sequence.append((simulation_step, trader.number_units_stock_in_inventory))
             trader.number_units_stock_in_market_sequence.append((simulation_step, trader.number_units_stock_in_market))
 
+    def return_valuation_price(self):
+        # price used to value the stocks of the traders: the last traded price, or the mid price if there is none
+        if np.isnan(self.book.price_sequence[-1]) or (self.book.price_sequence[-1] == False):
+            return self.book.mid_price_sequence[-1]
+        else:
+            return self.book.price_sequence[-1]
+
     def update_traders_total_wealth(self, simulation_step):
+        price = self.return_valuation_price()
         for trader in self.traders:
-            if np.isnan(self.book.price_sequence[-1]) or (self.book.price_sequence[-1] == False):
-                price = self.book.mid_price_sequence[-1]
-            else:
-                price = self.book.price_sequence[-1]
-
             # total wealth = 
             # cash + (stocks in my inventory + stocks in limit sells) * last price)
             total_wealth = trader.cash + ((trader.number_units_stock_in_inventory + trader.number_units_stock_in_market) * price)
@@ -97,14 +269,8 @@ class MarketManager():
         We don't update some quantities because we already did that in the order book class
         """   
         for trade in self.book.trades[simulation_step]:
-            trader_already_in_book = [
-                trader for trader in self.traders if trader.trader_id == trade.trader_id_already_in_book
-                ][0]
-            
-            trader_coming_in_book = [
-                trader for trader in self.traders if trader.trader_id == trade.trader_id_coming_in_book
-                ][0]
-            
+            trader_already_in_book = self.traders_by_id[trade.trader_id_already_in_book]
+            trader_coming_in_book = self.traders_by_id[trade.trader_id_coming_in_book]
 
             if trade.direction == 'buy':
                 trader_coming_in_book.cash = round(
@@ -144,13 +310,37 @@ class MarketManager():
 
 
 
-    def update_traders_active_orders(self):
+    def update_traders_active_orders(self, trader_ids=None):
         """
-        Keep track of active orders issued by each trader
+        Keep track of active orders issued by each trader (only by the traders in trader_ids, if passed).
+        The book and the conditional orders are scanned once, not once per trader
         """
-        for trader in self.traders:
-            active_limit_buys = [(bid[0], bid[1], bid[2], 'limit_buy') for bid in self.book.bids if bid[3] == trader.trader_id]
-            active_limit_sells = [(ask[0], ask[1], ask[2], 'limit_sell') for ask in self.book.asks if ask[3] == trader.trader_id]
+        if trader_ids is None:
+            trader_ids = self.traders_by_id
+        active_limit_buys = {trader_id: [] for trader_id in trader_ids}
+        active_limit_sells = {trader_id: [] for trader_id in trader_ids}
+        conditional_orders = {trader_id: [] for trader_id in trader_ids}
+
+        for bid in self.book.bids:
+            if bid[3] in active_limit_buys:
+                active_limit_buys[bid[3]].append((bid[0], bid[1], bid[2], 'limit_buy'))
+        for ask in self.book.asks:
+            if ask[3] in active_limit_sells:
+                active_limit_sells[ask[3]].append((ask[0], ask[1], ask[2], 'limit_sell'))
+        for (order_type, trigger_price, quantity, order_id, trader_id) in self.book.trigger_book.orders.values():
+            if trader_id in conditional_orders:
+                conditional_orders[trader_id].append((trigger_price, quantity, order_id, order_type))
+
+        for trader_id in active_limit_buys:
+            self.traders_by_id[trader_id].active_orders = (
+                active_limit_buys[trader_id] + active_limit_sells[trader_id] + conditional_orders[trader_id]
+                )
+
 
-            trader.active_orders = active_limit_buys + active_limit_sells
+def _run_fork(data, variant, args):
+    # restore the checkpoint, apply the variant and run the simulation until the end
+    manager = MarketManager.restore(data, restore_random_state=True)
+    variant(manager)
+    manager.run_market_manager(*args)
 
+    return manager
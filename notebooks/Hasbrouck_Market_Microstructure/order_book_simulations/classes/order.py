@@ -10,9 +10,14 @@ class Order():
         'limit_sell',
         'modify_limit_buy',
         'modify_limit_sell',
+        'stop_buy',
+        'stop_sell',
+        'take_profit_buy',
+        'take_profit_sell',
+        'cancel_conditional_order',
         'do_nothing')
 
-    def __init__(self, order_type, price, quantity, trader_id):
+    def __init__(self, order_type, price, quantity, trader_id, order_id=None):
 
         if order_type not in self.supported_orders:
             raise ValueError(f'valid values for order_type are {self.supported_orders}.\nYou passed {order_type}')
@@ -24,7 +29,7 @@ class Order():
         self.price = price
         self.quantity = quantity
         self.trader_id = trader_id
-        # add the attribute order id if you want to implement the cancel order feature  
+        self.order_id = order_id # order to cancel, for cancel_conditional_order
 
     def print_order(self):
         print(f"{self.order_type} - price: {self.price} - quantity: {self.quantity}")
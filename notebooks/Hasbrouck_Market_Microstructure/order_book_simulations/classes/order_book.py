@@ -6,46 +6,186 @@ This class allows to:
 - place limit orders
 - execute market orders
 - modify orders
+- place stop loss / take profit orders, that become market orders when the traded price reaches their trigger price,
+  and cancel them with their order_id (order type cancel_conditional_order)
+- return the volume ahead of a limit order in the queue of its price level (queue position)
+- return the cost to fill a market order (VWAP and worst price) and the volume within k ticks of the mid price
 - print the state of the order book
+- update streaming indicators (EWMA mid price, realized volatility, VWAP, ...) at every step, and notify the
+  subscribed agents (see classes/streaming_indicators.py)
+- record the order flow as a sparse time x price level matrix while the simulation runs (see classes/order_flow_matrix.py)
 - return various quantities (mid price, micro price, bid ask spread, traded price, traded volumes)
 
-Additional features that can be implemented in this simulator are the following:
-- stop loss / take profit
+By default every recorded sequence grows for the whole simulation. For long simulations, pass retention=K:
+only the trades and the sequences of the last K steps are kept in memory, in fixed size ring buffers
+(see classes/ring_buffer.py). If spill_directory is passed too, the older data is written to disk in a columnar
+format instead of being dropped; call flush_spilled at the end of the simulation to write the last chunks.
+
+The priority rules of the limit orders are price, then time: a partially filled order or an order whose quantity
+is reduced with modify_limit_buy / modify_limit_sell keeps its place in the queue.
+Every order gets its order_id from an integer counter of the book, so the ids are unique and follow the order of
+arrival, also when many orders are submitted at the same time. When the book is filled one order per step
+(time=None), the order_id of an order is its time.
+
+Market makers can move a resting quote in one operation with replace_quote (or many quotes with replace_quotes),
+instead of a modify followed by a new limit order. The order is found with a binary search on the price and
+moved in the list and in the price levels, with these priority rules:
+- same price, lower or equal quantity: the order keeps its place in the queue
+- same price, higher quantity, or a new price: the order goes at the end of the queue of its level, with a new order_id
+- a new price that crosses the other side of the book: the quote is cancelled and the new one is processed
+  like a limit order, so it is executed against the other side
+- quantity 0: the quote is cancelled
 
 """
 
-from classes.order import Order
-from prettytable import PrettyTable
+from .order import Order
+from bisect import bisect_left, bisect_right
 import numpy as np
-from classes.trade import Trade
+from .trade import Trade
+from .trigger_book import TriggerBook
+from .book_side import BookSide
+from .ring_buffer import RingBuffer, SpillWriter
+from .order_flow_matrix import OrderFlowMatrix
 
 
 class OrderBook():
 
-    def __init__(self):
+    def __init__(self, retention=None, spill_directory=None, order_flow_ticksize=None):
+        self.retention = retention # number of steps kept in memory, None to keep everything
+        self.spill_directory = spill_directory # where the older steps are written, None to drop them
+
+        self.next_order_id = 1 # order_id of the next order
+
+        self.bid_side = BookSide('bid') # price levels of the bids, with the queue position of each order
+        self.ask_side = BookSide('ask') # price levels of the asks, with the queue position of each order
+
         self.bids = []  # list of (price, quantity, order_id, trader_id)
         self.asks = []  # list of (price, quantity, order_id, trader_id)
+        self.trigger_book = TriggerBook() # stop loss / take profit orders waiting to be activated
 
         self.trades = {} # dictionary where the key is the time (you can see this as a snapshot number) and the value is the Trade object
         self.time = 0 # time of the simulation, you can see this as an order book snapshot number
 
-        self.price_sequence = [] # contains the sequence of executed prices
-        self.mid_price_sequence = [] # sequence of mid prices
-        self.micro_price_sequence = [] # sequence of micro prices
-        self.volumes_sequence = [] # sequence of volumes of the executed prices
-        self.buy_sequence = [] # 1 if the trade was a buy, 0 otherwise
-        self.sell_sequence = [] # 1 if the trade was a sell, 0 otherwise
-        self.book_state_sequence = [] # wrapper for the book state
-        self.bid_ask_spread_sequence = [] # sequence of bid ask spreads
-        self.volume_imbalance_sequence = [] # sequence of volume imbalances
-        self.order_flow_imbalance_sequence = [] # sequence of order flow imbalances
+        if (retention is not None) and (spill_directory is not None):
+            self.trades_spill_writer = SpillWriter(spill_directory, 'trades', retention, OrderBook.trades_to_columns)
+        else:
+            self.trades_spill_writer = None
+
+        self.price_sequence = self.new_sequence('price_sequence') # contains the sequence of executed prices
+        self.mid_price_sequence = self.new_sequence('mid_price_sequence') # sequence of mid prices
+        self.micro_price_sequence = self.new_sequence('micro_price_sequence') # sequence of micro prices
+        self.volumes_sequence = self.new_sequence('volumes_sequence') # sequence of volumes of the executed prices
+        self.buy_sequence = self.new_sequence('buy_sequence') # 1 if the trade was a buy, 0 otherwise
+        self.sell_sequence = self.new_sequence('sell_sequence') # 1 if the trade was a sell, 0 otherwise
+        # wrapper for the book state, there are two entries (asks and bids) for each step
+        self.book_state_sequence = self.new_sequence('book_state_sequence', 2, OrderBook.book_states_to_columns)
+        self.bid_ask_spread_sequence = self.new_sequence('bid_ask_spread_sequence') # sequence of bid ask spreads
+        self.volume_imbalance_sequence = self.new_sequence('volume_imbalance_sequence') # sequence of volume imbalances
+        self.order_flow_imbalance_sequence = self.new_sequence('order_flow_imbalance_sequence') # sequence of order flow imbalances
         self.last_best_bid_price = np.nan
         self.last_best_ask_price = np.nan
         self.last_best_bid_volume = np.nan
         self.last_best_ask_volume = np.nan
-        self.depth_sequence_size = [] # sequence of depth of the book
-        self.depth_sequence_volumes = [] # sequence of depth of the book
+        self.depth_sequence_size = self.new_sequence('depth_sequence_size') # sequence of depth of the book
+        self.depth_sequence_volumes = self.new_sequence('depth_sequence_volumes') # sequence of depth of the book
+
+        # sparse time x price level matrix of the volumes of the book, None if it is not recorded
+        if order_flow_ticksize is None:
+            self.order_flow_matrix = None
+        else:
+            self.order_flow_matrix = OrderFlowMatrix(order_flow_ticksize)
+
+        self.indicators = {} # name -> streaming indicator, updated at every step
+        self.subscribers = {} # name of an indicator -> callbacks called with (name, value, book) after every update
+
+    def new_sequence(self, name, entries_per_step=1, to_columns=None):
+        # a list, or a ring buffer if only the last steps are retained
+        if self.retention is None:
+            return []
+        else:
+            return RingBuffer(self.retention * entries_per_step, self.spill_directory, name, to_columns)
+
+    @staticmethod
+    def book_states_to_columns(book_states):
+        # columns of the book snapshots: every row is [time, price, volume, side]
+        rows = [row for book_state in book_states for row in book_state]
 
+        return {
+            'time': np.array([row[0] for row in rows]),
+            'price': np.array([row[1] for row in rows], dtype=float),
+            'volume': np.array([row[2] for row in rows], dtype=float),
+            'side': np.array([row[3] for row in rows], dtype=str),
+        }
+
+    @staticmethod
+    def trades_to_columns(trades_per_time):
+        # columns of the trade tape, from a list of (time, list of Trade objects)
+        rows = [(time, trade) for time, trades in trades_per_time for trade in trades]
+
+        return {
+            'time': np.array([time for time, _ in rows]),
+            'price': np.array([trade.price for _, trade in rows], dtype=float),
+            'volume': np.array([trade.volume for _, trade in rows], dtype=float),
+            'direction': np.array([trade.direction for _, trade in rows], dtype=str),
+            'trader_id_already_in_book': np.array([str(trade.trader_id_already_in_book) for _, trade in rows], dtype=str),
+            'trader_id_coming_in_book': np.array([str(trade.trader_id_coming_in_book) for _, trade in rows], dtype=str),
+            'order_id_already_in_book': np.array([str(trade.order_id_already_in_book) for _, trade in rows], dtype=str),
+            'order_id_coming_in_book': np.array([str(trade.order_id_coming_in_book) for _, trade in rows], dtype=str),
+        }
+
+    def prune_trades(self):
+        # keep only the trades of the last retention times, the oldest ones are spilled or dropped
+        if self.retention is None:
+            return
+
+        while len(self.trades) > self.retention:
+            time = next(iter(self.trades))
+            trades = self.trades.pop(time)
+
+            if self.trades_spill_writer is not None:
+                self.trades_spill_writer.write((time, trades))
+
+    def flush_spilled(self):
+        # write to disk the spilled data still waiting for a full chunk
+        if self.trades_spill_writer is not None:
+            self.trades_spill_writer.flush()
+
+        for sequence in vars(self).values():
+            if isinstance(sequence, RingBuffer):
+                sequence.flush()
+
+
+    @property
+    def bids(self):
+        return self._bids
+
+    @bids.setter
+    def bids(self, orders):
+        # the bids can be set directly, for example to initialise the book: rebuild the price levels
+        self._bids = orders
+        self.bid_side.rebuild(orders)
+        self.reserve_order_ids(orders)
+
+    @property
+    def asks(self):
+        return self._asks
+
+    @asks.setter
+    def asks(self, orders):
+        self._asks = orders
+        self.ask_side.rebuild(orders)
+        self.reserve_order_ids(orders)
+
+    def reserve_order_ids(self, orders):
+        # the orders set directly keep their ids, the next orders get larger ones
+        order_ids = [order[2] for order in orders if (len(order) > 2) and isinstance(order[2], (int, float))]
+        if order_ids:
+            self.next_order_id = max(self.next_order_id, int(np.floor(max(order_ids))) + 1)
+
+    def new_order_id(self):
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        return order_id
 
     def execute_market_order(self, quantity, order_type, order_id, trader_id):
         # execute a market order, getting the first available ask if buying
@@ -76,6 +216,7 @@ class OrderBook():
                             order_id_coming_in_book=order_id
                             )
                             ) 
+                self.ask_side.fill(best_available_ask_price, (bb_order_id, bb_trader_id), best_available_ask_quantity)
                 
                 # add another market order for the remaining quantity.
                 # this will call the function again and execute it on the new best ask
@@ -95,11 +236,11 @@ class OrderBook():
                             order_id_already_in_book=bb_order_id,
                             order_id_coming_in_book=order_id)
                             )
+                    self.ask_side.fill(best_available_ask_price, (bb_order_id, bb_trader_id), quantity)
                 # since we popped the best ask, now we want to put it again in the asks sequence,
-                # with the updated volume 
+                # with the updated volume. It keeps its place, at the top of the book
                 # since we called the Trade class, we don't have to take care of margin and units
-                self.asks.append((best_available_ask_price, round(best_available_ask_quantity - quantity, 5), bb_order_id, bb_trader_id))
-                self.asks = sorted(self.asks, key=lambda x: (x[0], x[2]))
+                self.asks.insert(0, (best_available_ask_price, round(best_available_ask_quantity - quantity, 5), bb_order_id, bb_trader_id))
 
         elif order_type == 'market_sell':
             # market sell
@@ -120,6 +261,7 @@ class OrderBook():
                         order_id_already_in_book=bb_order_id,
                         order_id_coming_in_book=order_id)
                         )
+                self.bid_side.fill(best_available_bid_price, (bb_order_id, bb_trader_id), best_available_bid_quantity)
                 # since we called the Trade class, we don't have to take care of margin and units
 
                 self.execute_market_order(round(quantity - best_available_bid_quantity, 5), 'market_sell', order_id, trader_id)
@@ -135,10 +277,10 @@ class OrderBook():
                             order_id_already_in_book=bb_order_id,
                             order_id_coming_in_book=order_id)
                             ) 
+                    self.bid_side.fill(best_available_bid_price, (bb_order_id, bb_trader_id), quantity)
                 # since we called the Trade class, we don't have to take care of margin and units
 
-                self.bids.append((best_available_bid_price, round(best_available_bid_quantity - quantity, 5), bb_order_id, bb_trader_id))
-                self.bids = sorted(self.bids, key=lambda x: (-x[0], x[2]))
+                self.bids.insert(0, (best_available_bid_price, round(best_available_bid_quantity - quantity, 5), bb_order_id, bb_trader_id))
     
 
     @staticmethod
@@ -158,14 +300,14 @@ class OrderBook():
     def modify_order_of_the_order_book(self, trader, price, quantity, order_type, trader_id):
         if order_type == 'modify_limit_buy':
             where_to_look = self.bids
-            rev = True
+            side = self.bid_side
 
             # I already checked that this is feasible
             trader.margin += (price * quantity)
 
         elif order_type == 'modify_limit_sell':
             where_to_look = self.asks
-            rev = False
+            side = self.ask_side
 
             # I already checked that this is feasible
             trader.number_units_stock_in_inventory += quantity
@@ -181,24 +323,20 @@ class OrderBook():
                 # a trader could have many orders with that price
                 (index, q_in_order, id) = [(t[0], t[1][1], t[1][2]) for t in orders if t[1][3] == trader_id][0]
 
+                side.reduce(price, (id, trader_id), min(q_in_order, quantity))
+
                 where_to_look.pop(index)
                 quantity = round(q_in_order - quantity, 5)
 
                 if quantity > 0:
-                    # if something remains, then add it again to the book
-                    where_to_look.append((price, quantity, id, trader_id))
+                    # if something remains, then add it again to the book, in the same place
+                    where_to_look.insert(index, (price, quantity, id, trader_id))
                     break
                 elif quantity == 0:
                     break
                 else:
                     quantity = abs(quantity)
                     orders = OrderBook.find_order_with_certain_price(where_to_look, price)
-
-
-        if rev:
-            self.bids = sorted(self.bids, key=lambda x: (-x[0], x[2]))
-        else:
-            self.asks = sorted(self.asks, key=lambda x: (x[0], x[2]))
         
 
 
@@ -248,7 +386,8 @@ class OrderBook():
 
 
                 self.bids.append((price, quantity, order_id, trader_id))
-                self.bids = sorted(self.bids, key=lambda x: (-x[0], x[2]))  
+                self.bids.sort(key=lambda x: (-x[0], x[2]))
+                self.bid_side.add(price, (order_id, trader_id), quantity)
 
                 trader.margin = round(trader.margin - (quantity * price), 5)
 
@@ -279,47 +418,234 @@ class OrderBook():
                     best_available_ask_price = price + 1
 
                 self.asks.append((price, quantity, order_id, trader_id))
-                self.asks = sorted(self.asks, key=lambda x: (x[0], x[2]))
+                self.asks.sort(key=lambda x: (x[0], x[2]))
+                self.ask_side.add(price, (order_id, trader_id), quantity)
 
                 trader.number_units_stock_in_inventory = round(trader.number_units_stock_in_inventory - quantity, 5)
                 trader.number_units_stock_in_market = quantity
 
+    def find_resting_order(self, order_type, price, trader_id, order_id=None):
+        # index of the first resting limit order of trader_id at price (with order_id, if passed), None if there is none.
+        # the levels are sorted by price, so this costs O(log n + orders at the price level)
+        if order_type == 'limit_buy':
+            orders = self.bids
+            index = bisect_left(orders, -price, key=lambda x: -x[0])
+        else:
+            orders = self.asks
+            index = bisect_left(orders, price, key=lambda x: x[0])
+
+        while (index < len(orders)) and (orders[index][0] == price):
+            if (orders[index][3] == trader_id) and ((order_id is None) or (orders[index][2] == order_id)):
+                return index
+            index += 1
+
+        return None
+
+    def move_limit_order(self, trader, order_type, old_price, new_price, new_quantity, order_id=None):
+        """Replace the resting limit order of trader at old_price with an order of new_quantity units at new_price,
+        with the priority rules described at the top of the file. order_type is 'limit_buy' or 'limit_sell'.
+        Return the order_id of the new quote, None if it was cancelled, executed or if there is no quote to replace.
+        """
+        if order_type == 'limit_buy':
+            orders = self.bids
+            side = self.bid_side
+            sort_key = lambda x: -x[0] # the bids are sorted by descending price
+            crosses = bool(self.asks) and (new_price >= self.asks[0][0])
+        elif order_type == 'limit_sell':
+            orders = self.asks
+            side = self.ask_side
+            sort_key = lambda x: x[0]
+            crosses = bool(self.bids) and (new_price <= self.bids[0][0])
+        else:
+            raise ValueError('Order type not supported')
+
+        index = self.find_resting_order(order_type, old_price, trader.trader_id, order_id)
+        if index is None:
+            return None
+        _, old_quantity, old_order_id, trader_id = orders[index]
+
+        if trader.check_order_feasibility:
+            # the margin and the units of the old quote are released before placing the new one
+            if order_type == 'limit_buy':
+                is_feasible = trader.margin + old_price * old_quantity >= new_price * new_quantity
+            else:
+                is_feasible = trader.number_units_stock_in_inventory + old_quantity >= new_quantity
+            if not is_feasible:
+                return None
+
+        if (new_price == old_price) and (new_quantity <= old_quantity) and (new_quantity > 0):
+            # the order keeps its place in the queue
+            orders[index] = (old_price, new_quantity, old_order_id, trader_id)
+            side.reduce(old_price, (old_order_id, trader_id), round(old_quantity - new_quantity, 5))
+            new_order_id = old_order_id
+        else:
+            orders.pop(index)
+            side.reduce(old_price, (old_order_id, trader_id), old_quantity)
+
+            if (new_quantity <= 0) or crosses:
+                new_order_id = None
+            else:
+                # the order goes at the end of the queue of the new level, with a new order_id
+                new_order_id = self.new_order_id()
+                new_order = (new_price, new_quantity, new_order_id, trader_id)
+                orders.insert(bisect_right(orders, sort_key(new_order), key=sort_key), new_order)
+                side.add(new_price, (new_order_id, trader_id), new_quantity)
+
+        if order_type == 'limit_buy':
+            if crosses:
+                trader.margin = round(trader.margin + old_price * old_quantity, 5)
+            else:
+                trader.margin = round(trader.margin + old_price * old_quantity - new_price * max(new_quantity, 0), 5)
+        else:
+            if crosses:
+                trader.number_units_stock_in_inventory = round(trader.number_units_stock_in_inventory + old_quantity, 5)
+                trader.number_units_stock_in_market = round(trader.number_units_stock_in_market - old_quantity, 5)
+            else:
+                trader.number_units_stock_in_inventory = round(trader.number_units_stock_in_inventory + old_quantity - max(new_quantity, 0), 5)
+                trader.number_units_stock_in_market = round(trader.number_units_stock_in_market - old_quantity + max(new_quantity, 0), 5)
+
+        if crosses and (new_quantity > 0):
+            # the new quote is executed against the other side of the book
+            self.add_limit_order(trader, new_price, new_quantity, order_type, self.new_order_id(), trader_id)
+
+        return new_order_id
+
+    def replace_quote(self, trader, order_type, old_price, new_price, new_quantity, order_id=None, time=None, update_lists=True):
+        # replace one quote of trader as a single operation, see move_limit_order
+        return self.replace_quotes([(trader, order_type, old_price, new_price, new_quantity, order_id)], time, update_lists)[0]
+
+    def replace_quotes(self, quotes, time=None, update_lists=True):
+        """Replace many quotes at the same time, for example the bid and the ask of every market maker.
+        quotes is a list of (trader, order_type, old_price, new_price, new_quantity, order_id), order_id can be None.
+        The sequences of the book are updated once, after all the quotes. Return the new order_ids.
+        """
+        if time is None:
+            self.time += 1
+        else:
+            self.time = time
+
+        self.trades.setdefault(self.time, [])
+        self.prune_trades()
+        number_of_trades_before_quotes = len(self.trades[self.time])
+
+        new_order_ids = [
+            self.move_limit_order(trader, order_type, old_price, new_price, new_quantity, order_id)
+            for (trader, order_type, old_price, new_price, new_quantity, order_id) in quotes
+            ]
+
+        # quotes that cross the book can activate stop loss / take profit orders
+        self.activate_conditional_orders(number_of_trades_before_quotes)
+
+        if update_lists:
+            self.update_sequences()
+
+        return new_order_ids
+
+    def activate_conditional_orders(self, number_of_processed_trades):
+        # the new trades are the ones after number_of_processed_trades.
+        # the conditional orders activated by their prices are executed as market orders, and their trades
+        # can activate other conditional orders: the cascade is processed in this loop, in the same matching pass
+        trades = self.trades[self.time]
+
+        while len(trades) > number_of_processed_trades:
+            new_prices = [trade.price for trade in trades[number_of_processed_trades:]]
+            number_of_processed_trades = len(trades)
+
+            activated_orders = self.trigger_book.pop_activated_orders(max(new_prices), min(new_prices))
+
+            for (order_type, _, quantity, order_id, trader_id) in activated_orders:
+                if order_type in TriggerBook.buy_orders:
+                    self.execute_market_order(quantity, 'market_buy', order_id, trader_id)
+                else:
+                    self.execute_market_order(quantity, 'market_sell', order_id, trader_id)
+
     def order_manager(self, order: Order, trader, time=None, update_lists=True):
-        # method used to add, execute or modify an order of the order book 
+        # method used to add, execute or modify an order of the order book. Return the order_id taken by the order
         if time is None:
             self.time += 1
         else:
             self.time = time
             
-        self.trades[self.time] = []
+        # more than one order can be submitted at the same time, keep the trades of all of them
+        self.trades.setdefault(self.time, [])
+        self.prune_trades()
+        number_of_trades_before_order = len(self.trades[self.time])
+        order_id = self.new_order_id() # taken by every order, so that with time=None the order_id is the time
 
         if order.order_type in ('market_buy', 'market_sell'):
-            self.execute_market_order(order.quantity, order.order_type, self.time, order.trader_id)
+            self.execute_market_order(order.quantity, order.order_type, order_id, order.trader_id)
         elif order.order_type in ('limit_buy', 'limit_sell'):
-            self.add_limit_order(trader, order.price, order.quantity, order.order_type, self.time, order.trader_id)
+            self.add_limit_order(trader, order.price, order.quantity, order.order_type, order_id, order.trader_id)
         elif order.order_type in ('modify_limit_buy', 'modify_limit_sell'):
             self.modify_order_of_the_order_book(trader, order.price, order.quantity, order.order_type, order.trader_id)
+        elif order.order_type in TriggerBook.supported_orders:
+            # the price of a conditional order is its trigger price
+            self.trigger_book.add_order(order.order_type, order.price, order.quantity, order_id, order.trader_id)
+        elif order.order_type == 'cancel_conditional_order':
+            self.trigger_book.cancel_order_of_trader(order.order_id, order.trader_id)
+
+        # trades can activate stop loss / take profit orders
+        self.activate_conditional_orders(number_of_trades_before_order)
 
         # if no orders we want to update the book anyway
 
         # update the lists useful to track various quantities
 
         if update_lists:
-            self.update_mid_price_sequence()
-            self.update_micro_price_sequence()
+            self.update_sequences()
+
+        return order_id
+
+    def update_sequences(self):
+        # update the lists useful to track various quantities at the current time.
+        # this is called by order_manager, but it can also be called directly when the
+        # orders are submitted with update_lists=False and the book is sampled at fixed times
+        self.trades.setdefault(self.time, [])
+        self.prune_trades()
+
+        self.update_mid_price_sequence()
+        self.update_micro_price_sequence()
+
+        self.update_bid_ask_spread_sequence()
+        self.update_price_volume_sequences()
+        self.update_volume_imbalance_sequence()
+        self.update_order_flow_imbalance_sequence()
+
+        self.update_book_state_sequence()
+        self.update_depth_sequence()
 
-            self.update_bid_ask_spread_sequence()
-            self.update_price_volume_sequences()
-            self.update_volume_imbalance_sequence()
-            self.update_order_flow_imbalance_sequence()
+        if self.indicators:
+            self.update_indicators()
 
-            self.update_book_state_sequence()
-            self.update_depth_sequence()
+    def add_indicator(self, name, indicator):
+        # attach a streaming indicator (classes/streaming_indicators.py), updated from the next step
+        self.indicators[name] = indicator
+        self.subscribers.setdefault(name, [])
 
+    def subscribe(self, name, callback):
+        # callback(name, value, book) is called every time the indicator is updated
+        if name not in self.indicators:
+            raise ValueError(f'valid values for name are {tuple(self.indicators)}.\nYou passed {name}')
+        self.subscribers[name].append(callback)
+
+    def unsubscribe(self, name, callback):
+        self.subscribers[name].remove(callback)
+
+    def return_indicator(self, name):
+        # current value of a streaming indicator
+        return self.indicators[name].value
+
+    def update_indicators(self):
+        for name, indicator in self.indicators.items():
+            indicator.update(self)
+            for callback in self.subscribers[name]:
+                callback(name, indicator.value, self)
 
 
     def print_order_book_state(self):
         # print the bid and the asks, with prices and volumess
+        from prettytable import PrettyTable # imported here, so that the simulation doesn't need it
+
         print(f"\nOrder book at time {self.time}")
 
         table = PrettyTable()
@@ -420,6 +746,8 @@ class OrderBook():
     
         ask_list = []
         bid_list = []
+        ask_volumes = {}
+        bid_volumes = {}
 
         if self.asks:
             sums = {}
@@ -435,6 +763,7 @@ class OrderBook():
 
             
             ask_list = [[self.time, p, v, 'ask'] for p, v in sums.items()]
+            ask_volumes = sums
 
             # quantity useful to compute the order flow imbalance
             self.last_best_ask_volume = sums[self.last_best_ask_price]
@@ -455,12 +784,16 @@ class OrderBook():
 
             
             bid_list = [[self.time, p, v, 'bid'] for p, v in sums.items()]
+            bid_volumes = sums
 
             # quantity useful to compute the order flow imbalance
             self.last_best_bid_volume = sums[self.last_best_bid_price]
 
         self.book_state_sequence.append(bid_list)
 
+        if self.order_flow_matrix is not None:
+            self.order_flow_matrix.append_step(self.time, ask_volumes, bid_volumes)
+
 
     def update_mid_price_sequence(self):
         self.mid_price_sequence.append(self.return_mid_price())
@@ -531,19 +864,76 @@ class OrderBook():
         self.order_flow_imbalance_sequence.append(self.return_order_flow_imbalance())
 
     def return_order_book_depth_size(self):
-        return (len(self.book_state_sequence[(self.time * 2) - 2]), 
-                len(self.book_state_sequence[(self.time * 2) - 1]))
+        # number of ask and bid levels of the last snapshot
+        return (len(self.book_state_sequence[-2]), 
+                len(self.book_state_sequence[-1]))
     
     def return_order_book_depth_volumes(self):
-        sum_volumes_ask = 0
-        for a in self.asks:
-            sum_volumes_ask += a[1]
+        # total volumes of the asks and of the bids, from the prefix sums of the price levels
+        return (self.ask_side.total_volume(), self.bid_side.total_volume())
+
+    def return_cost_to_fill(self, order_type, quantity):
+        # return (VWAP, worst price, filled quantity) of a market order, without executing it.
+        # this costs O(log L), with L number of price levels
+        if order_type == 'market_buy':
+            return self.ask_side.cost_to_fill(quantity)
+        elif order_type == 'market_sell':
+            return self.bid_side.cost_to_fill(quantity)
+        else:
+            raise ValueError('Order type not supported')
+
+    def return_volume_within_ticks(self, number_of_ticks, ticksize):
+        # return (ask volume, bid volume) with prices within number_of_ticks ticks of the mid price
+        mid_price = self.return_mid_price()
+        if np.isnan(mid_price):
+            return (np.nan, np.nan)
 
-        sum_volumes_bid = 0
-        for b in self.bids:
-            sum_volumes_bid += b[1]
+        # round to avoid floating point errors on the price grid
+        ask_limit = round(mid_price + number_of_ticks * ticksize, 10)
+        bid_limit = round(mid_price - number_of_ticks * ticksize, 10)
 
-        return (sum_volumes_ask, sum_volumes_bid)
+        return (self.ask_side.volume_up_to_price(ask_limit), self.bid_side.volume_up_to_price(bid_limit))
+
+    def return_book_features(self):
+        # return the current features of the book as numpy floats, this is the input of the vectorised policies.
+        # if a side of the book is empty, its prices and volumes are nan
+        if self.asks:
+            best_ask = self.asks[0][0]
+            best_ask_volume = self.ask_side.level_volume(best_ask)
+        else:
+            best_ask = np.nan
+            best_ask_volume = np.nan
+
+        if self.bids:
+            best_bid = self.bids[0][0]
+            best_bid_volume = self.bid_side.level_volume(best_bid)
+        else:
+            best_bid = np.nan
+            best_bid_volume = np.nan
+
+        depth_volume_ask, depth_volume_bid = self.return_order_book_depth_volumes()
+
+        return {
+            'best_bid': np.float64(best_bid),
+            'best_ask': np.float64(best_ask),
+            'best_bid_volume': np.float64(best_bid_volume),
+            'best_ask_volume': np.float64(best_ask_volume),
+            'mid_price': np.float64(self.return_mid_price()),
+            'bid_ask_spread': np.float64(self.return_bid_ask_spread()),
+            'depth_volume_bid': np.float64(depth_volume_bid),
+            'depth_volume_ask': np.float64(depth_volume_ask),
+        }
+
+    def return_queue_ahead(self, order_type, price, order_id, trader_id):
+        # volume ahead of a resting limit order at its price level, in O(1).
+        # order_type is 'limit_buy' or 'limit_sell', like in Trader.active_orders.
+        # return None if the order is not in the book
+        if order_type == 'limit_buy':
+            return self.bid_side.queue_ahead(price, (order_id, trader_id))
+        elif order_type == 'limit_sell':
+            return self.ask_side.queue_ahead(price, (order_id, trader_id))
+        else:
+            raise ValueError('Order type not supported')
 
     def update_depth_sequence(self):
         self.depth_sequence_size.append(self.return_order_book_depth_size())
@@ -0,0 +1,188 @@
+"""
+This class generates whole streams of random orders as numpy arrays, and submits them to an OrderBook.
+
+Instead of drawing the order type, the price and the quantity of each order one at a time, the arrival times
+of a stream are generated at once, with:
+- a Poisson process with constant intensity
+- a self-exciting Hawkes process with exponential kernel, where each arrival increases the intensity
+  of the following ones: lambda(t) = baseline + sum_i alpha * exp(- beta * (t - t_i))
+- state dependent intensities: one intensity per step (for example a function of the spread or of the
+  imbalance of a previous run), from which the number of arrivals of each step is drawn
+
+Then the marks of all the orders (type, distance of the price from the mid price, quantity) are drawn in bulk.
+The result is a dictionary of arrays (one entry per order) that can be submitted with submit_order_flow.
+Only the generation is vectorised: the orders are submitted one at a time to the matching engine of the book,
+in a Python loop. Pass one trader per order, otherwise all the orders come from the same trader and its
+market orders trade against its own limit orders.
+Example:
+
+generator = OrderFlowGenerator()
+times = generator.hawkes_arrival_times(baseline=0.5, alpha=0.3, beta=1, horizon=10000)
+order_flow = generator.generate_orders(times, {'limit_buy': 0.3, 'limit_sell': 0.3, 'market_buy': 0.2, 'market_sell': 0.2})
+traders = [mm.traders[i] for i in np.random.randint(len(mm.traders), size=len(times))]
+generator.submit_order_flow(book, traders, order_flow, tick_size=1, reference_price=100)
+
+The random numbers are drawn from numpy's global generator, so np.random.seed makes the stream reproducible.
+"""
+from .order_book import OrderBook
+from .trader import Trader
+import numpy as np
+
+
+class OrderFlowGenerator():
+
+    def __init__(self, block_size=4096):
+        # random numbers are drawn in blocks of this size in the Hawkes simulation
+        self.block_size = block_size
+
+    def poisson_arrival_times(self, intensity, horizon):
+        # arrival times in [0, horizon] of a Poisson process: the number of arrivals is Poisson
+        # and, given the number, the times are uniform
+        number_of_arrivals = np.random.poisson(intensity * horizon)
+        return np.sort(np.random.uniform(0, horizon, number_of_arrivals))
+
+    def hawkes_arrival_times(self, baseline, alpha, beta, horizon):
+        """Arrival times in [0, horizon] of a Hawkes process with exponential kernel, with Ogata's thinning.
+        The intensity only decays between arrivals, so the current intensity bounds the next ones.
+        """
+        if alpha >= beta:
+            raise ValueError(f'the process is stationary only if alpha < beta.\nYou passed alpha={alpha}, beta={beta}')
+
+        times = []
+        t = 0
+        excitation = 0 # sum_i alpha * exp(- beta * (t - t_i))
+
+        exponentials = np.random.exponential(1, self.block_size)
+        uniforms = np.random.uniform(0, 1, self.block_size)
+        index = 0
+
+        while True:
+            if index == self.block_size:
+                exponentials = np.random.exponential(1, self.block_size)
+                uniforms = np.random.uniform(0, 1, self.block_size)
+                index = 0
+
+            upper_bound = baseline + excitation
+            waiting_time = exponentials[index] / upper_bound
+            t += waiting_time
+            if t > horizon:
+                break
+
+            excitation *= np.exp(- beta * waiting_time)
+
+            # accept the candidate with probability lambda(t) / upper_bound
+            if uniforms[index] * upper_bound <= baseline + excitation:
+                times.append(t)
+                excitation += alpha
+
+            index += 1
+
+        return np.array(times)
+
+    def state_dependent_arrival_times(self, intensities, step_length=1):
+        """intensities contains one intensity for each step, each step lasts step_length.
+        The number of arrivals of each step is Poisson, and the times are uniform within the step.
+        """
+        intensities = np.asarray(intensities, dtype=float)
+
+        counts = np.random.poisson(intensities * step_length)
+        step_starts = np.repeat(np.arange(len(intensities)) * step_length, counts)
+        times = step_starts + np.random.uniform(0, step_length, counts.sum())
+
+        return np.sort(times)
+
+    def generate_orders(self, times, order_type_probabilities, lambda_=1, theta=0, quantity_low=1, quantity_high=5):
+        """Draw the marks of all the orders at once:
+        - order_type: drawn with the probabilities in the dictionary order_type -> probability
+        - price_offset: distance in ticks of limit orders from the mid price, drawn from
+          f(x) = lambda * exp(- lambda * (x - theta)) like generate_random_variable_exponential in the notebooks
+        - quantity: integers, uniform in [quantity_low, quantity_high)
+        """
+        times = np.asarray(times, dtype=float)
+        number_of_orders = len(times)
+
+        order_types = np.array(list(order_type_probabilities.keys()))
+        probabilities = np.array(list(order_type_probabilities.values()), dtype=float)
+
+        return {
+            'time': times,
+            'order_type': np.random.choice(order_types, number_of_orders, p=probabilities / probabilities.sum()),
+            'price_offset': theta + np.random.exponential(1 / lambda_, number_of_orders),
+            'quantity': np.random.randint(quantity_low, quantity_high, number_of_orders),
+        }
+
+    def submit_order_flow(self, book: OrderBook, traders, order_flow, tick_size, reference_price=None, sampling_interval=None):
+        """Submit the orders to the book one at a time, in time order. traders is a list with the Trader
+        of every order, or a single Trader that submits all of them.
+        Limit buys are placed price_offset ticks below the mid price and limit sells price_offset ticks above,
+        rounded to the tick. If a side of the book is empty, the last traded price (or reference_price) is used,
+        and a ValueError is raised if there is none.
+
+        If sampling_interval is None, each order is a step of the book, like submitting the orders one by one.
+        Otherwise the book is updated once every sampling_interval units of time, also when there are no orders.
+        The times of the orders are measured from the current time of the book, so a stream can be submitted
+        to a book that already ran.
+        """
+        times = order_flow['time']
+        order_types = order_flow['order_type']
+        price_offsets = order_flow['price_offset']
+        quantities = order_flow['quantity']
+
+        if isinstance(traders, Trader):
+            traders = [traders] * len(times)
+        elif len(traders) != len(times):
+            raise ValueError(f'traders must have one trader per order.\nYou passed {len(traders)} traders for {len(times)} orders')
+
+        is_sampled = sampling_interval is not None
+        if is_sampled:
+            # all the orders with time in ((step - 1) * sampling_interval, step * sampling_interval] belong to the step
+            # after the current time of the book, an order at time 0 belongs to the first step
+            last_closed_step = book.time
+            steps = last_closed_step + np.maximum(np.ceil(times / sampling_interval).astype(int), 1)
+
+        for i in range(len(times)):
+            if is_sampled:
+                # close the steps that ended before this order
+                while last_closed_step + 1 < steps[i]:
+                    last_closed_step += 1
+                    book.time = last_closed_step
+                    book.update_sequences()
+                time = last_closed_step + 1
+            else:
+                time = None
+
+            order_type = str(order_types[i])
+            if order_type in ('limit_buy', 'limit_sell'):
+                price = self.return_limit_price(book, order_type, price_offsets[i], tick_size, reference_price)
+            else:
+                price = None
+
+            traders[i].submit_order_to_order_book(
+                order_type, price, quantities[i], book, time, verbose=False, update_lists=not is_sampled
+                )
+
+        if is_sampled and len(times):
+            # close the step of the last order
+            while last_closed_step < max(steps[-1], book.time):
+                last_closed_step += 1
+                book.time = last_closed_step
+                book.update_sequences()
+
+    @staticmethod
+    def return_limit_price(book, order_type, price_offset, tick_size, reference_price):
+        mid_price = book.return_mid_price()
+        if np.isnan(mid_price):
+            if book.price_sequence and not np.isnan(book.price_sequence[-1]):
+                mid_price = book.price_sequence[-1]
+            elif reference_price is not None:
+                mid_price = reference_price
+            else:
+                raise ValueError(f'a side of the book is empty and there is no traded price to place the {order_type}.\nPass reference_price')
+
+        if order_type == 'limit_buy':
+            price = mid_price - price_offset * tick_size
+        else:
+            price = mid_price + price_offset * tick_size
+
+        # round to the tick, with the number of decimals of the tick size
+        return round(round(price / tick_size) * tick_size, 10)
@@ -0,0 +1,159 @@
+"""
+This class records the order flow (the volume of every price level of the book at every step) as a sparse
+time x price level matrix, built while the simulation runs.
+
+book_state_sequence keeps a list of [time, price, volume, side] rows per step, and plot_order_flow has to flatten,
+fill and sort them after the simulation to get the time x price grid. The matrix is kept in coordinate (COO)
+format instead: every step appends one entry per price level of the book, with
+- row: index of the step (the same index of the other sequences of the book)
+- column: price level on the integer tick axis, round(price / ticksize)
+- value: volume of the level, positive for the asks and negative for the bids (the book is never crossed,
+  so an ask and a bid never share a level at the same step)
+
+The entries are stored in numpy arrays that double their size when they are full, so each step costs
+O(number of levels). The matrix can be converted to scipy.sparse (to_coo, to_csr), and heatmaps, depth profiles
+and level based features are taken by slicing it. scipy is imported only by the conversion methods.
+
+Pass order_flow_ticksize to OrderBook to record the matrix during the simulation:
+
+book = OrderBook(order_flow_ticksize=0.1)
+...
+matrix = book.order_flow_matrix.to_csr() # shape (steps, levels), columns are book.order_flow_matrix.price_levels()
+heatmap = book.order_flow_matrix.heatmap(start=1000, end=2000)
+"""
+import numpy as np
+
+
+class OrderFlowMatrix():
+
+    def __init__(self, ticksize=1, initial_capacity=1024):
+        self.ticksize = ticksize # size of the minimum tick, prices are stored as integer ticks
+
+        self.size = 0 # number of entries
+        self.rows = np.empty(initial_capacity, dtype=np.int64)
+        self.ticks = np.empty(initial_capacity, dtype=np.int64)
+        self.volumes = np.empty(initial_capacity, dtype=float)
+
+        self.times = [] # time of the book of every row
+        self.min_tick = None # lowest and highest tick recorded, they define the columns of the matrix
+        self.max_tick = None
+
+        self.csr_cache = {} # side -> (number of entries, csr matrix), so that repeated slices don't convert again
+
+    @property
+    def number_of_steps(self):
+        return len(self.times)
+
+    def reserve(self, number_of_entries):
+        # make room for number_of_entries more entries, doubling the capacity of the arrays
+        capacity = len(self.rows)
+        if self.size + number_of_entries <= capacity:
+            return
+
+        while capacity < self.size + number_of_entries:
+            capacity *= 2
+        for name in ('rows', 'ticks', 'volumes'):
+            array = getattr(self, name)
+            new_array = np.empty(capacity, dtype=array.dtype)
+            new_array[:self.size] = array[:self.size]
+            setattr(self, name, new_array)
+
+    def append_step(self, time, ask_volumes, bid_volumes):
+        """Add one step (one row of the matrix). ask_volumes and bid_volumes are dictionaries price -> volume
+        of the levels of the book at this step.
+        """
+        row = len(self.times)
+        self.times.append(time)
+
+        number_of_levels = len(ask_volumes) + len(bid_volumes)
+        if number_of_levels == 0:
+            return
+
+        self.reserve(number_of_levels)
+        end = self.size + number_of_levels
+
+        prices = list(ask_volumes) + list(bid_volumes)
+        ticks = np.rint(np.array(prices, dtype=float) / self.ticksize).astype(np.int64)
+
+        self.rows[self.size:end] = row
+        self.ticks[self.size:end] = ticks
+        self.volumes[self.size:self.size + len(ask_volumes)] = list(ask_volumes.values())
+        self.volumes[self.size + len(ask_volumes):end] = [- v for v in bid_volumes.values()]
+        self.size = end
+
+        min_tick = int(ticks.min())
+        max_tick = int(ticks.max())
+        self.min_tick = min_tick if self.min_tick is None else min(self.min_tick, min_tick)
+        self.max_tick = max_tick if self.max_tick is None else max(self.max_tick, max_tick)
+
+    @staticmethod
+    def from_book_state_sequence(book_state_sequence, ticksize=1):
+        # build the matrix from a book_state_sequence (two entries per step, asks then bids), like the one of the notebooks
+        order_flow_matrix = OrderFlowMatrix(ticksize)
+        for asks, bids in zip(book_state_sequence[0::2], book_state_sequence[1::2]):
+            time = asks[0][0] if asks else (bids[0][0] if bids else None)
+            ask_volumes = {}
+            for _, price, volume, _ in asks:
+                ask_volumes[price] = ask_volumes.get(price, 0) + volume
+            bid_volumes = {}
+            for _, price, volume, _ in bids:
+                bid_volumes[price] = bid_volumes.get(price, 0) + volume
+            order_flow_matrix.append_step(time, ask_volumes, bid_volumes)
+
+        return order_flow_matrix
+
+    @property
+    def shape(self):
+        if self.min_tick is None:
+            return (self.number_of_steps, 0)
+        return (self.number_of_steps, self.max_tick - self.min_tick + 1)
+
+    def price_levels(self):
+        # price of every column of the matrix
+        if self.min_tick is None:
+            return np.array([])
+        return np.arange(self.min_tick, self.max_tick + 1) * self.ticksize
+
+    def column_of_price(self, price):
+        return int(round(price / self.ticksize)) - self.min_tick
+
+    def to_coo(self, side=None):
+        """The matrix as scipy.sparse.coo_matrix, signed volumes (asks positive, bids negative).
+        side 'ask' or 'bid' keeps only one side of the book, with positive volumes.
+        """
+        from scipy.sparse import coo_matrix # imported here, so that the simulation doesn't need scipy
+
+        rows = self.rows[:self.size]
+        columns = self.ticks[:self.size] - (self.min_tick or 0)
+        volumes = self.volumes[:self.size]
+
+        if side == 'ask':
+            is_side = volumes > 0
+            rows, columns, volumes = rows[is_side], columns[is_side], volumes[is_side]
+        elif side == 'bid':
+            is_side = volumes < 0
+            rows, columns, volumes = rows[is_side], columns[is_side], - volumes[is_side]
+        elif side is not None:
+            raise ValueError(f"valid values for side are (None, 'ask', 'bid').\nYou passed {side}")
+
+        return coo_matrix((volumes, (rows, columns)), shape=self.shape)
+
+    def to_csr(self, side=None):
+        # compressed rows: fast slicing of steps. The conversion is redone only if new steps were added
+        size, csr = self.csr_cache.get(side, (None, None))
+        if (size != self.size) or (csr.shape != self.shape):
+            csr = self.to_coo(side).tocsr()
+            self.csr_cache[side] = (self.size, csr)
+        return csr
+
+    def heatmap(self, start=None, end=None, side=None):
+        # dense (steps, levels) array of the steps start:end, to plot with imshow / pcolormesh
+        return self.to_csr(side)[start:end].toarray()
+
+    def depth_profile(self, step=-1):
+        # signed volume of every price level at one step (asks positive, bids negative)
+        return self.to_csr()[step].toarray()[0]
+
+    def level_volumes(self, price, side=None):
+        # volume of one price level at every step
+        return self.to_csr(side)[:, self.column_of_price(price)].toarray()[:, 0]
@@ -0,0 +1,148 @@
+"""
+This class describes how a population of traders of the same type decides, all at once.
+
+Instead of evaluating the decision of one trader at a time, a Policy takes the current features of the book
+(OrderBook.return_book_features) and the state of all its traders as numpy arrays (MarketManager.return_traders_state),
+and returns three arrays with one entry per trader: order types, prices and quantities.
+The arrays can be submitted directly with MarketManager.submit_orders, or in one call with MarketManager.apply_policy.
+
+Write custom logic in the method decide. ExpectedUtilityPolicy is the vectorised version of the
+CARA traders used in the experiment notebooks. Its decisions can be cached with a UtilityCache
+(classes/utility_cache.py), so that the traders facing the same top of the book with the same parameters
+are evaluated once.
+"""
+from abc import abstractmethod
+from scipy.special import ndtr
+import numpy as np
+
+
+class Policy():
+
+    def __init__(self, trader_ids):
+        # ids of the traders that follow this policy, the arrays are in this order
+        self.trader_ids = list(trader_ids)
+
+    @abstractmethod
+    def decide(self, book_features, traders_state):
+        """
+        Return the arrays (order_types, prices, quantities), with one entry per trader.
+        Prices of market orders and do_nothing orders are nan
+        """
+        pass
+
+
+class ExpectedUtilityPolicy(Policy):
+    """
+    Every trader compares the expected utility of doing nothing, of a market order and of a limit order,
+    with utility function U(W) = - exp(- alpha * W) and normally distributed wealth, like in the experiment notebooks.
+
+    Besides the state of the traders, traders_state should contain these arrays:
+    - is_buyer: True if the trader wants to buy, False if it wants to sell
+    - expected_payoff: payoff expected by each trader
+    - payoff_std: std of the payoff for each trader (0 for an informed trader)
+    - limit_price: price of the limit order the trader would place
+    - quantity: quantity the trader wants to trade
+
+    If cache (a UtilityCache) is passed, the decision of every trader is looked up by the best bid, the best ask,
+    the parameters of the trader and alpha, and only the decisions not in the cache are computed.
+    """
+
+    def __init__(self, trader_ids, alpha, hit_probability_std, cache=None):
+        super().__init__(trader_ids)
+
+        self.alpha = alpha # exponent of the utility function
+        self.hit_probability_std = hit_probability_std # std used to compute the probability that a limit order is hit
+        self.cache = cache # UtilityCache of the decisions, None to compute all of them at every step
+
+    @staticmethod
+    def trader_utility_function_expected_value(alpha, wealth_mean, wealth_std):
+        # the expectation of U(W) = - exp(- alpha * W), given that the wealth is distributed as N(mu_W, sigma_W)
+        return - np.exp(- alpha * wealth_mean + ((alpha * wealth_std)**2)/2)
+
+    @staticmethod
+    def probability_hit_buy(price, mean, std):
+        # probability that a limit buy is hit, with normally distributed prices
+        return ndtr((price - mean) / std)
+
+    @staticmethod
+    def generate_random_variable_exponential(lambda_, theta, size=None):
+        # draw from f(x) = lambda * exp(- lambda * (x - theta)), size draws at once
+        return theta + np.random.exponential(1 / lambda_, size)
+
+    def decide(self, book_features, traders_state):
+        inventory = np.asarray(traders_state['number_units_stock_in_inventory'], dtype=float)
+        is_buyer = np.asarray(traders_state['is_buyer'], dtype=bool)
+        payoff = np.asarray(traders_state['expected_payoff'], dtype=float)
+        std = np.asarray(traders_state['payoff_std'], dtype=float)
+        limit_price = np.asarray(traders_state['limit_price'], dtype=float)
+        quantity = np.asarray(traders_state['quantity'], dtype=float)
+
+        best_bid = book_features['best_bid']
+        best_ask = book_features['best_ask']
+
+        if self.cache is None:
+            order_types, prices = self.evaluate(best_bid, best_ask, is_buyer, inventory, payoff, std, limit_price, quantity)
+            return order_types, prices, quantity
+
+        keys = self.cache.keys_of_rows(
+            (self.alpha, self.hit_probability_std, best_bid, best_ask),
+            (is_buyer, inventory, payoff, std, limit_price, quantity))
+        decisions = [self.cache.get(key) for key in keys]
+
+        # the missing decisions are computed together, once for every distinct problem
+        missing_rows = {}
+        for row, (key, decision) in enumerate(zip(keys, decisions)):
+            if decision is None:
+                missing_rows.setdefault(key, row)
+
+        if missing_rows:
+            rows = np.fromiter(missing_rows.values(), dtype=np.int64, count=len(missing_rows))
+            missing_order_types, missing_prices = self.evaluate(
+                best_bid, best_ask, is_buyer[rows], inventory[rows], payoff[rows], std[rows], limit_price[rows], quantity[rows])
+
+            computed = {}
+            for key, order_type, price in zip(missing_rows, missing_order_types, missing_prices):
+                computed[key] = (str(order_type), float(price))
+                self.cache.put(key, computed[key])
+
+            decisions = [computed[key] if decision is None else decision for key, decision in zip(keys, decisions)]
+
+        order_types = np.array([order_type for order_type, _ in decisions])
+        prices = np.array([price for _, price in decisions], dtype=float)
+
+        return order_types, prices, quantity
+
+    def evaluate(self, best_bid, best_ask, is_buyer, inventory, payoff, std, limit_price, quantity):
+        # arrays (order_types, prices) of the traders, comparing the expected utilities of the three choices
+
+        # buyers trade at the best ask and sellers at the best bid
+        market_price = np.where(is_buyer, best_ask, best_bid)
+
+        # +1 for buyers, -1 for sellers
+        sign = np.where(is_buyer, 1, -1)
+        units_after_trade = inventory + sign * quantity
+
+        base_utility = self.trader_utility_function_expected_value(
+            self.alpha, inventory * payoff, inventory * std)
+
+        limit_utility = self.trader_utility_function_expected_value(
+            self.alpha, units_after_trade * payoff - sign * limit_price * quantity, units_after_trade * std)
+
+        market_utility = self.trader_utility_function_expected_value(
+            self.alpha, units_after_trade * payoff - sign * market_price * quantity, units_after_trade * std)
+
+        probability_hit_buy = self.probability_hit_buy(limit_price, payoff, self.hit_probability_std)
+        probability_hit_limit_order = np.where(is_buyer, probability_hit_buy, 1 - probability_hit_buy)
+
+        hit_utility = probability_hit_limit_order * limit_utility + (1 - probability_hit_limit_order) * base_utility
+
+        is_limit = (hit_utility > base_utility) & (hit_utility > market_utility)
+        is_market = (market_utility > base_utility) & (market_utility > hit_utility)
+
+        order_types = np.where(
+            is_limit, np.where(is_buyer, 'limit_buy', 'limit_sell'),
+            np.where(is_market, np.where(is_buyer, 'market_buy', 'market_sell'), 'do_nothing'))
+
+        prices = np.where(is_limit, limit_price, np.nan)
+
+        return order_types, prices
@@ -0,0 +1,163 @@
+"""
+This class estimates the price impact of the order flow online, with the regression
+
+mid_t - mid_t-1 = intercept + lambda * order_flow_t
+
+where order_flow_t is the order flow imbalance of the book (Cont, Kukanov, Stoikov) or the signed traded volume
+(Kyle's lambda). Instead of refitting the regression on the whole sample, the estimator keeps the sums of
+order_flow, mid price change, their products and squares, so each update costs O(1) and the coefficients
+can be read at every step. Many variants are estimated at the same time:
+- windows: None for an expanding window (all the steps), n for a rolling window of the last n steps
+- halflives: exponentially weighted regressions, where the weight of a step halves every halflife steps
+
+The updates can be passed directly (update, update_many) or read from an OrderBook after each call of
+order_manager (update_from_book), also when the book has a retention. Steps where the mid price is not defined
+(one side of the book is empty) are skipped. Example:
+
+estimator = PriceImpactEstimator(windows=(None, 500), halflives=(100,))
+for step in range(number_of_steps):
+    ...
+    estimator.update_from_book(book)
+    lambdas.append(estimator.return_impact(window=500))
+"""
+from .roll_estimator import SerialCovariance
+import numpy as np
+
+
+class ExponentialCovariance():
+
+    def __init__(self, halflife):
+        self.halflife = halflife
+        self.decay = 0.5 ** (1 / halflife) # weight of the previous steps after a new one
+
+        # sum of the weights and weighted sums of x, y, x * y, x^2 and y^2, like SerialCovariance
+        self.n = 0
+        self.sums = np.zeros(5)
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        k = len(x)
+        if k == 0:
+            return
+
+        # the last pair has weight 1, the one before decay, ...
+        weights = self.decay ** np.arange(k - 1, -1, -1)
+
+        self.n = self.n * self.decay**k + weights.sum()
+        weighted_sums = np.array([
+            (weights * x).sum(), (weights * y).sum(), (weights * x * y).sum(), (weights * x * x).sum(), (weights * y * y).sum()
+            ])
+        self.sums = self.sums * self.decay**k + weighted_sums
+
+
+class PriceImpactEstimator():
+
+    order_flows = ('order_flow_imbalance', 'signed_volume')
+
+    def __init__(self, windows=(None,), halflives=()):
+        self.windows = tuple(windows)
+        self.halflives = tuple(halflives)
+
+        self.covariances = {window: SerialCovariance(window) for window in self.windows}
+        self.exponential_covariances = {halflife: ExponentialCovariance(halflife) for halflife in self.halflives}
+
+        self.last_mid_price = np.nan
+        self.sequence_position = 0 # number of steps of the book already read
+
+    def update(self, order_flow, mid_price):
+        # add one step, O(1) for every window and halflife
+        self.update_many([order_flow], [mid_price])
+
+    def update_many(self, order_flows, mid_prices):
+        # add a chunk of steps
+        order_flows = np.asarray(order_flows, dtype=float)
+        mid_prices = np.asarray(mid_prices, dtype=float)
+        if len(mid_prices) == 0:
+            return
+
+        mid_price_changes = np.diff(np.concatenate([[self.last_mid_price], mid_prices]))
+        self.last_mid_price = mid_prices[-1]
+
+        is_valid = ~np.isnan(mid_price_changes) & ~np.isnan(order_flows)
+        x = order_flows[is_valid]
+        y = mid_price_changes[is_valid]
+
+        for covariance in self.covariances.values():
+            covariance.update(x, y)
+        for covariance in self.exponential_covariances.values():
+            covariance.update(x, y)
+
+    def update_from_book(self, book, order_flow='order_flow_imbalance'):
+        """Read the steps recorded by the book since the last call. order_flow is order_flow_imbalance
+        (book.order_flow_imbalance_sequence) or signed_volume (traded volume, positive for buys and negative for sells).
+        Works both with lists and with the RingBuffers of a book with a retention, as long as it is called
+        before the new steps drop out of the buffers.
+        """
+        if order_flow not in self.order_flows:
+            raise ValueError(f'valid values for order_flow are {self.order_flows}.\nYou passed {order_flow}')
+
+        mid_price_sequence = book.mid_price_sequence
+        total_length = getattr(mid_price_sequence, 'total_length', len(mid_price_sequence))
+        number_of_new_steps = total_length - self.sequence_position
+        if number_of_new_steps <= 0:
+            return
+
+        start = max(len(mid_price_sequence) - number_of_new_steps, 0)
+        mid_prices = mid_price_sequence[start:]
+
+        if order_flow == 'order_flow_imbalance':
+            order_flows = book.order_flow_imbalance_sequence[start:]
+        else:
+            volumes = np.asarray(book.volumes_sequence[start:], dtype=float)
+            signs = np.asarray(book.buy_sequence[start:], dtype=float) - np.asarray(book.sell_sequence[start:], dtype=float)
+            order_flows = volumes * signs
+
+        self.update_many(order_flows, mid_prices)
+        self.sequence_position = total_length
+
+    @staticmethod
+    def regression(n, sums):
+        # (intercept, slope, r squared) of the least squares regression of y on x, from the sums
+        sum_x, sum_y, sum_xy, sum_xx, sum_yy = sums
+        if n <= 0:
+            return (np.nan, np.nan, np.nan)
+
+        covariance = sum_xy - sum_x * sum_y / n
+        variance_x = sum_xx - sum_x * sum_x / n
+        variance_y = sum_yy - sum_y * sum_y / n
+        if variance_x <= 0:
+            return (np.nan, np.nan, np.nan)
+
+        slope = covariance / variance_x
+        intercept = (sum_y - slope * sum_x) / n
+        if variance_y <= 0:
+            r_squared = np.nan
+        else:
+            r_squared = covariance**2 / (variance_x * variance_y)
+
+        return (intercept, slope, r_squared)
+
+    def return_regression(self, window=None, halflife=None):
+        # (intercept, lambda, r squared) of a rolling / expanding window, or of an exponentially weighted regression
+        if halflife is None:
+            covariance = self.covariances[window]
+        else:
+            covariance = self.exponential_covariances[halflife]
+
+        return self.regression(covariance.n, covariance.sums)
+
+    def return_impact(self, window=None, halflife=None):
+        # the price impact coefficient lambda
+        return self.return_regression(window, halflife)[1]
+
+    def return_estimates(self):
+        # name of the variant -> (intercept, lambda, r squared). Names are window_<n>, expanding and halflife_<h>
+        estimates = {}
+        for window in self.windows:
+            name = 'expanding' if window is None else f'window_{window}'
+            estimates[name] = self.return_regression(window=window)
+        for halflife in self.halflives:
+            estimates[f'halflife_{halflife}'] = self.return_regression(halflife=halflife)
+
+        return estimates
@@ -0,0 +1,139 @@
+"""
+This class is a fixed size sequence that keeps only the last capacity items, used to record long simulations
+with a bounded memory (see the retention argument of OrderBook and Trader).
+
+It can be used like the lists it replaces: append, len, indexing (also negative and slices), iteration
+and numpy functions (np.sum(book.buy_sequence), np.array(book.price_sequence)...).
+Indexes refer to the retained items: sequence[0] is the oldest retained item, not the first item ever appended.
+
+The items that drop out of the buffer are lost, unless a spill directory is passed: in that case they are
+written to disk in chunks, in a columnar format (one .npz file per chunk, one array per column).
+The spilled items can be read back with load_spilled_columns.
+The chunks are named after the sequence, so every simulation needs its own spill directory: a SpillWriter refuses
+to start in a directory that already has chunks with its name, instead of overwriting them or mixing them with its own.
+"""
+import glob
+import os
+import numpy as np
+
+
+def default_to_columns(items):
+    # numbers become one column, tuples like (time, value) become one column per element
+    values = np.asarray(items)
+    if values.ndim == 2:
+        return {f'column_{i}': values[:, i] for i in range(values.shape[1])}
+    else:
+        return {'values': values}
+
+
+def spilled_filenames(spill_directory, name):
+    # the chunks spilled with this name, in the order they were written
+    return sorted(glob.glob(os.path.join(spill_directory, f'{name}_[0-9]*.npz')))
+
+
+def load_spilled_columns(spill_directory, name):
+    # read back all the chunks spilled with this name, concatenating every column
+    filenames = spilled_filenames(spill_directory, name)
+
+    columns = {}
+    for filename in filenames:
+        with np.load(filename) as chunk:
+            for column in chunk.files:
+                columns.setdefault(column, []).append(chunk[column])
+
+    return {column: np.concatenate(arrays) for column, arrays in columns.items()}
+
+
+class SpillWriter():
+
+    def __init__(self, spill_directory, name, chunk_size, to_columns=None):
+        self.spill_directory = spill_directory
+        self.name = name # prefix of the files
+        self.chunk_size = chunk_size # number of items per file
+
+        # function that converts a list of items into a dictionary column name -> numpy array
+        if to_columns is None:
+            to_columns = default_to_columns
+        self.to_columns = to_columns
+
+        self.items = [] # items waiting to be written
+        self.number_of_chunks = 0
+        self.number_of_rows = 0 # rows written to disk, summed over the chunks
+
+        os.makedirs(spill_directory, exist_ok=True)
+        if spilled_filenames(spill_directory, name):
+            raise ValueError(f'the spill directory {spill_directory} already has chunks named {name}\n'
+                             f'Use a new spill directory for every simulation, or remove the old chunks')
+
+    def write(self, item):
+        self.items.append(item)
+
+        if len(self.items) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        # write the waiting items to a new chunk
+        if not self.items:
+            return
+
+        filename = os.path.join(self.spill_directory, f'{self.name}_{self.number_of_chunks:06d}.npz')
+        columns = self.to_columns(self.items)
+        np.savez(filename, **columns)
+
+        self.number_of_chunks += 1
+        self.number_of_rows += len(next(iter(columns.values())))
+        self.items = []
+
+
+class RingBuffer():
+
+    def __init__(self, capacity, spill_directory=None, name=None, to_columns=None):
+        self.capacity = capacity
+        self.items = [] # at most capacity items, the oldest one is at index self.start
+        self.start = 0
+        self.total_length = 0 # number of items ever appended
+
+        if spill_directory is None:
+            self.spill_writer = None
+        else:
+            self.spill_writer = SpillWriter(spill_directory, name, capacity, to_columns)
+
+    def append(self, item):
+        self.total_length += 1
+
+        if len(self.items) < self.capacity:
+            self.items.append(item)
+            return
+
+        # the buffer is full: overwrite the oldest item
+        if self.spill_writer is not None:
+            self.spill_writer.write(self.items[self.start])
+
+        self.items[self.start] = item
+        self.start = (self.start + 1) % self.capacity
+
+    def flush(self):
+        # write to disk the items that dropped out of the buffer and are still waiting for a full chunk
+        if self.spill_writer is not None:
+            self.spill_writer.flush()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.items)))]
+
+        if index < 0:
+            index += len(self.items)
+        if (index < 0) or (index >= len(self.items)):
+            raise IndexError('RingBuffer index out of range')
+
+        return self.items[(self.start + index) % len(self.items)]
+
+    def __iter__(self):
+        for i in range(len(self.items)):
+            yield self.items[(self.start + i) % len(self.items)]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(list(self), dtype=dtype)
@@ -0,0 +1,225 @@
+"""
+This class estimates the Roll spread online, from a stream of transaction prices.
+
+Under the Roll model the first order autocovariance of the price changes is cov(dp_t, dp_t-1) = - c^2,
+so the cost per trade is c = sqrt(- cov) and the implied bid-ask spread is 2c.
+If the estimated autocovariance is not negative the estimate is not defined and nan is returned.
+
+The estimator keeps running sums of the pairs (dp_t-1, dp_t) for every window, so each new price costs O(1)
+per window and the price series is never kept in memory:
+- window None: expanding window, all the pairs since the start
+- window n: rolling window, only the last n pairs. The pairs of the window are kept in a circular array,
+  and the sums are recomputed from it once every n updates so that the rounding errors don't build up
+
+Prices can come one at a time (update), in chunks (update_many), from the sequences of an OrderBook
+while it runs (update_from_book), or from a large csv / parquet file read in chunks (update_from_file).
+nan prices are skipped. The price_sequence of a book is never nan: on the steps without trades it repeats the
+last price, and these repeats would add pairs with dp = 0 that pull the autocovariance towards 0. So the steps
+of the book with no traded volume (volumes_sequence == 0) are dropped, and only the transaction prices are used. Example:
+
+estimator = RollEstimator(windows=(None, 100, 1000))
+for step in range(number_of_steps):
+    ...
+    estimator.update_from_book(book)
+estimator.return_estimates() # window -> Roll spread
+"""
+import numpy as np
+
+
+class SerialCovariance():
+
+    def __init__(self, window=None):
+        self.window = window # None for an expanding window
+
+        # sums of x = dp_t-1, y = dp_t, x * y, x^2 and y^2
+        self.n = 0
+        self.sums = np.zeros(5)
+
+        if window is not None:
+            # pairs currently in the window, in a circular array
+            self.x = np.zeros(window)
+            self.y = np.zeros(window)
+            self.position = 0 # where the next pair is written
+            self.updates_since_resync = 0
+
+    @staticmethod
+    def pair_sums(x, y):
+        return np.array([x.sum(), y.sum(), (x * y).sum(), (x * x).sum(), (y * y).sum()])
+
+    def update(self, x, y):
+        # add the pairs (x[i], y[i]), dropping the oldest ones out of the window
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        k = len(x)
+        if k == 0:
+            return
+
+        if self.window is None:
+            self.n += k
+            self.sums += self.pair_sums(x, y)
+            return
+
+        if k >= self.window:
+            # the whole window is replaced
+            self.x[:] = x[-self.window:]
+            self.y[:] = y[-self.window:]
+            self.position = 0
+            self.n = self.window
+            self.resync()
+            return
+
+        indexes = (self.position + np.arange(k)) % self.window
+        if self.n == self.window:
+            self.sums -= self.pair_sums(self.x[indexes], self.y[indexes])
+        else:
+            # positions are written in order, so the dropped pairs are the ones after the first window - n
+            dropped = indexes[self.window - self.n:]
+            self.sums -= self.pair_sums(self.x[dropped], self.y[dropped])
+
+        self.x[indexes] = x
+        self.y[indexes] = y
+        self.sums += self.pair_sums(x, y)
+
+        self.position = (self.position + k) % self.window
+        self.n = min(self.n + k, self.window)
+
+        self.updates_since_resync += k
+        if self.updates_since_resync >= self.window:
+            self.resync()
+
+    def resync(self):
+        # recompute the sums from the pairs in the window
+        if self.n == self.window:
+            self.sums = self.pair_sums(self.x, self.y)
+        else:
+            self.sums = self.pair_sums(self.x[:self.n], self.y[:self.n])
+        self.updates_since_resync = 0
+
+    def covariance(self):
+        # sample covariance of x and y
+        if self.n < 2:
+            return np.nan
+
+        sum_x, sum_y, sum_xy, _, _ = self.sums
+        return (sum_xy - sum_x * sum_y / self.n) / (self.n - 1)
+
+    def variance(self):
+        # sample variance of y
+        if self.n < 2:
+            return np.nan
+
+        _, sum_y, _, _, sum_yy = self.sums
+        return max(sum_yy - sum_y * sum_y / self.n, 0) / (self.n - 1)
+
+    def correlation(self):
+        if self.n < 2:
+            return np.nan
+
+        sum_x, sum_y, _, sum_xx, sum_yy = self.sums
+        variance_x = sum_xx - sum_x * sum_x / self.n
+        variance_y = sum_yy - sum_y * sum_y / self.n
+        if (variance_x <= 0) or (variance_y <= 0):
+            return np.nan
+
+        return self.covariance() * (self.n - 1) / np.sqrt(variance_x * variance_y)
+
+
+class RollEstimator():
+
+    def __init__(self, windows=(None,)):
+        self.windows = tuple(windows)
+        self.covariances = {window: SerialCovariance(window) for window in self.windows}
+
+        self.last_price = np.nan # last valid price
+        self.last_price_change = np.nan # last price change
+        self.number_of_prices = 0
+
+        self.sequence_position = 0 # number of items of the price sequence already read
+
+    def update(self, price):
+        # add one transaction price, O(1) for every window
+        self.update_many([price])
+
+    def update_many(self, prices):
+        # add a chunk of transaction prices
+        prices = np.asarray(prices, dtype=float)
+        prices = prices[~np.isnan(prices)]
+        if len(prices) == 0:
+            return
+        self.number_of_prices += len(prices)
+
+        price_changes = np.diff(np.concatenate([[self.last_price], prices]))
+        self.last_price = prices[-1]
+
+        # pairs (dp_t-1, dp_t), the first price change of the stream has no previous one
+        previous_changes = np.concatenate([[self.last_price_change], price_changes[:-1]])
+        self.last_price_change = price_changes[-1]
+
+        is_valid = ~np.isnan(previous_changes) & ~np.isnan(price_changes)
+        for serial_covariance in self.covariances.values():
+            serial_covariance.update(previous_changes[is_valid], price_changes[is_valid])
+
+    def update_from_price_sequence(self, price_sequence, volumes_sequence=None):
+        """Read the prices appended to the price_sequence of an OrderBook since the last call.
+        If volumes_sequence is passed, the steps without traded volume (where the book repeats the last price)
+        are dropped. Works both with lists and with the RingBuffer of a book with a retention, as long as it is called
+        before the new prices drop out of the buffer.
+        """
+        total_length = getattr(price_sequence, 'total_length', len(price_sequence))
+        number_of_new_prices = total_length - self.sequence_position
+        if number_of_new_prices <= 0:
+            return
+
+        start = max(len(price_sequence) - number_of_new_prices, 0)
+        prices = np.asarray(price_sequence[start:], dtype=float)
+        if volumes_sequence is not None:
+            volumes = np.asarray(volumes_sequence[max(len(volumes_sequence) - len(prices), 0):], dtype=float)
+            prices = prices[volumes > 0]
+
+        self.update_many(prices)
+        self.sequence_position = total_length
+
+    def update_from_book(self, book):
+        # read the transaction prices of the steps of the book since the last call
+        self.update_from_price_sequence(book.price_sequence, book.volumes_sequence)
+
+    def update_from_file(self, filename, column='price', chunksize=1_000_000):
+        # stream the prices of a large csv or parquet file, chunksize rows at a time
+        if filename.endswith('.parquet'):
+            import pyarrow.parquet as pq
+        else:
+            import pandas as pd
+
+        if filename.endswith('.parquet'):
+            for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunksize, columns=[column]):
+                self.update_many(batch.column(0).to_numpy(zero_copy_only=False))
+        else:
+            for chunk in pd.read_csv(filename, usecols=[column], chunksize=chunksize):
+                self.update_many(chunk[column].to_numpy())
+
+    def return_covariance(self, window=None):
+        # first order autocovariance of the price changes
+        return self.covariances[window].covariance()
+
+    def return_roll_cost(self, window=None):
+        # c = sqrt(- cov(dp_t, dp_t-1)), nan if the autocovariance is not negative
+        covariance = self.return_covariance(window)
+        if np.isnan(covariance) or (covariance >= 0):
+            return np.nan
+        return np.sqrt(- covariance)
+
+    def return_roll_spread(self, window=None):
+        # implied bid-ask spread 2c
+        return 2 * self.return_roll_cost(window)
+
+    def return_estimates(self):
+        # window -> dictionary with the autocovariance, the autocorrelation, the variance of the price changes and the Roll spread
+        return {
+            window: {
+                'covariance': serial_covariance.covariance(),
+                'correlation': serial_covariance.correlation(),
+                'variance': serial_covariance.variance(),
+                'roll_spread': self.return_roll_spread(window),
+            }
+            for window, serial_covariance in self.covariances.items()
+        }
@@ -0,0 +1,223 @@
+"""
+This class simulates the sequential trade model (Glosten-Milgrom) of the sequential_trade_model notebooks,
+for many paths at once, as numpy operations over arrays of shape (number of paths, number of trades).
+
+The value of the stock is V_low = V_0 - delta_v with probability delta and V_high = V_0 + delta_v otherwise.
+A fraction mu of the traders is informed: they buy if the value is high and sell if it is low.
+The other traders buy or sell with probability 1/2. The dealer sets the ask as E[V | buy] and the bid
+as E[V | sell], and after each trade updates its belief delta_k that the value is low.
+
+The belief update doesn't need a loop over the trades: every buy multiplies the odds delta_k / (1 - delta_k)
+by (1 - mu) / (1 + mu) and every sell divides them by the same factor, so the belief before each trade only
+depends on the cumulative sum of the directions of the previous trades.
+
+mu and delta can be scalars or arrays with one value per path, so that a grid of parameters is
+explored in one call. Example:
+
+simulator = SequentialTradeSimulator(V_0=100, delta_v=20)
+mu = np.repeat([0.1, 0.5, 0.9], 1000)
+paths = simulator.simulate_paths(mu=mu, delta=0.5, number_of_paths=3000, number_of_trades=100)
+paths['spread'] # array of shape (3000, 100)
+
+The class also contains the extensions of the third notebook: the distribution of the number of buys in a
+sequence of trades, and the order flow with Poisson arrivals and information events (probability alpha).
+The random numbers are drawn from numpy's global generator, so np.random.seed makes the paths reproducible.
+"""
+from scipy.special import expit
+import numpy as np
+import scipy.stats
+
+
+class SequentialTradeSimulator():
+
+    def __init__(self, V_0=100, delta_v=1):
+        self.V_0 = V_0 # starting value of the stock
+        self.delta_v = delta_v # stock increment
+
+        self.V_low = V_0 - delta_v # low realisation of stock value
+        self.V_high = V_0 + delta_v # high realisation of stock value
+
+    @staticmethod
+    def compute_ask(V_low, V_high, delta, mu):
+        # ask = E[V | buy], delta is the probability of having a low realisation. Works on arrays
+        delta = np.asarray(delta, dtype=float)
+        mu = np.asarray(mu, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            num = V_low * (1 - mu) * delta + V_high * (1 - delta) * (1 + mu)
+            den = 1 + mu * (1 - 2*delta)
+            ask = np.where((mu == 1) & (delta == 1), V_high, num / den)
+
+        return ask
+
+    @staticmethod
+    def compute_bid(V_low, V_high, delta, mu):
+        # bid = E[V | sell], delta is the probability of having a low realisation. Works on arrays
+        delta = np.asarray(delta, dtype=float)
+        mu = np.asarray(mu, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            num = V_low * (1 + mu) * delta + V_high * (1 - delta) * (1 - mu)
+            den = 1 - mu * (1 - 2*delta)
+            bid = np.where((mu == 1) & (delta == 0), V_low, num / den)
+
+        return bid
+
+    @staticmethod
+    def compute_bid_ask_spread(V_low, V_high, delta, mu):
+        return (
+            SequentialTradeSimulator.compute_ask(V_low, V_high, delta, mu)
+            - SequentialTradeSimulator.compute_bid(V_low, V_high, delta, mu)
+            )
+
+    def bid_ask_surface(self, mu_values, delta_values):
+        """Ask, bid, spread and mid price for every combination of mu and delta, like the surfaces of the
+        first notebook. Every array has shape (len(mu_values), len(delta_values)).
+        """
+        mu, delta = np.meshgrid(np.asarray(mu_values, dtype=float), np.asarray(delta_values, dtype=float), indexing='ij')
+
+        ask = self.compute_ask(self.V_low, self.V_high, delta, mu)
+        bid = self.compute_bid(self.V_low, self.V_high, delta, mu)
+
+        return {'mu': mu, 'delta': delta, 'ask': ask, 'bid': bid, 'spread': ask - bid, 'mid': (ask + bid) / 2}
+
+    @staticmethod
+    def parameter_per_path(parameter, number_of_paths):
+        # a scalar or an array with one value per path -> column of shape (number_of_paths, 1)
+        return np.broadcast_to(np.asarray(parameter, dtype=float), (number_of_paths,)).reshape(-1, 1)
+
+    def simulate_directions(self, mu, delta, number_of_paths, number_of_trades, informed=True):
+        """Draw the value of the stock of every path and the directions of the trades (+1 buy, -1 sell).
+        If informed is True a trade is a buy with probability (1 + mu) / 2 when the value is high and (1 - mu) / 2
+        when it is low. If informed is False every trade is a buy with probability 1/2, like in the second notebook.
+        Return (is_low, directions), with shapes (number_of_paths,) and (number_of_paths, number_of_trades)
+        """
+        mu = self.parameter_per_path(mu, number_of_paths)
+        delta = self.parameter_per_path(delta, number_of_paths)
+
+        is_low = np.random.uniform(0, 1, (number_of_paths, 1)) < delta
+
+        if informed:
+            probability_buy = np.where(is_low, (1 - mu) / 2, (1 + mu) / 2)
+        else:
+            probability_buy = np.full((number_of_paths, 1), 0.5)
+
+        uniforms = np.random.uniform(0, 1, (number_of_paths, number_of_trades))
+        directions = np.where(uniforms < probability_buy, 1, -1).astype(np.int8)
+
+        return is_low[:, 0], directions
+
+    def simulate_paths(self, mu, delta, number_of_paths, number_of_trades, directions=None, informed=True):
+        """Simulate the dealer's quotes along number_of_paths sequences of number_of_trades trades.
+        If directions (+1 buy, -1 sell, shape (number_of_paths, number_of_trades)) is not passed,
+        it is drawn with simulate_directions.
+
+        Return a dictionary of arrays of shape (number_of_paths, number_of_trades), with the same columns of
+        the second notebook (ask, bid, executed, spread, mid, delta_k_buy, delta_k_sell), the direction of the trades
+        and the belief delta before each trade. is_low (one value per path) is None if the directions are passed.
+        """
+        if directions is None:
+            is_low, directions = self.simulate_directions(mu, delta, number_of_paths, number_of_trades, informed)
+        else:
+            is_low = None
+            directions = np.asarray(directions)
+            if directions.shape != (number_of_paths, number_of_trades):
+                raise ValueError(
+                    f'directions should have shape {(number_of_paths, number_of_trades)}.\nYou passed {directions.shape}'
+                    )
+
+        mu = self.parameter_per_path(mu, number_of_paths)
+        delta = self.parameter_per_path(delta, number_of_paths)
+
+        # net order flow before each trade
+        net_order_flow = np.cumsum(directions, axis=1, dtype=np.int64) - directions
+
+        prior_delta = self.belief_after_order_flow(delta, mu, net_order_flow)
+        delta_k_buy = self.belief_after_order_flow(delta, mu, net_order_flow + 1)
+        delta_k_sell = self.belief_after_order_flow(delta, mu, net_order_flow - 1)
+
+        # ask = E[V | buy] and bid = E[V | sell], from the beliefs after a buy and after a sell like in the notebook.
+        # They are the same of compute_ask and compute_bid, and they stay defined when mu = 1
+        ask = delta_k_buy * self.V_low + (1 - delta_k_buy) * self.V_high
+        bid = delta_k_sell * self.V_low + (1 - delta_k_sell) * self.V_high
+
+        return {
+            'direction': directions,
+            'delta': prior_delta,
+            'delta_k_buy': delta_k_buy,
+            'delta_k_sell': delta_k_sell,
+            'ask': ask,
+            'bid': bid,
+            'executed': np.where(directions == 1, ask, bid),
+            'spread': ask - bid,
+            'mid': (ask + bid) / 2,
+            'is_low': is_low,
+        }
+
+    @staticmethod
+    def belief_after_order_flow(delta, mu, net_order_flow):
+        """Probability of the low value after a net order flow (number of buys - number of sells), starting from delta.
+        Every buy adds log((1 - mu) / (1 + mu)) to the log odds of the low value.
+        With mu = 1 the log ratio is -inf: a positive net order flow reveals the high value and a negative one the low value.
+        With delta = 0 or 1 the value is known from the start and the belief doesn't move.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            initial_log_odds = np.log(delta) - np.log(1 - delta)
+            log_ratio = np.log(1 - mu) - np.log(1 + mu)
+            log_odds = initial_log_odds + np.where(net_order_flow == 0, 0, net_order_flow * log_ratio)
+
+        return np.where((delta == 0) | (delta == 1), delta, expit(log_odds))
+
+    @staticmethod
+    def buy_count_probabilities(n, mu, delta):
+        """Probability of observing b = 0, ..., n buys in n trades, mixing the high state (a buy has probability
+        (1 + mu) / 2) and the low state (probability delta, a buy has probability (1 - mu) / 2).
+        mu and delta can be arrays: the result has their broadcast shape plus a last axis of length n + 1.
+        """
+        b = np.arange(n + 1)
+        mu = np.asarray(mu, dtype=float)[..., None]
+        delta = np.asarray(delta, dtype=float)[..., None]
+
+        p_high = scipy.stats.binom.pmf(b, n, (1 + mu) / 2)
+        p_low = scipy.stats.binom.pmf(b, n, (1 - mu) / 2)
+
+        return delta * p_low + (1 - delta) * p_high
+
+    @staticmethod
+    def poisson_order_flow_probabilities(alpha, delta, epsilon, mu, buys, sells):
+        """Probability of observing buys buy orders and sells sell orders in a period, when uninformed buys and sells
+        arrive with intensity epsilon, an information event happens with probability alpha, and during an event the
+        informed traders arrive with intensity mu on the sell side (bad news, probability delta) or on the buy side.
+        All the arguments can be arrays.
+        """
+        prob_buy_not_inf = scipy.stats.poisson.pmf(k=buys, mu=epsilon)
+        prob_buy_inf_and_not_inf = scipy.stats.poisson.pmf(k=buys, mu=epsilon + mu)
+
+        prob_sell_not_inf = scipy.stats.poisson.pmf(k=sells, mu=epsilon)
+        prob_sell_inf_and_not_inf = scipy.stats.poisson.pmf(k=sells, mu=epsilon + mu)
+
+        return (1 - alpha) * prob_buy_not_inf * prob_sell_not_inf + (
+            alpha) * ((delta * prob_buy_not_inf * prob_sell_inf_and_not_inf) +
+                      ((1 - delta) * prob_buy_inf_and_not_inf * prob_sell_not_inf))
+
+    def simulate_poisson_order_flow(self, alpha, delta, epsilon, mu, number_of_paths, number_of_periods=1):
+        """Draw the number of buys and sells of number_of_periods periods for every path, with the Poisson model above.
+        alpha, delta, epsilon and mu can be scalars or arrays with one value per path.
+        Return a dictionary of arrays of shape (number_of_paths, number_of_periods): event, bad_news, buys, sells
+        """
+        shape = (number_of_paths, number_of_periods)
+        alpha = self.parameter_per_path(alpha, number_of_paths)
+        delta = self.parameter_per_path(delta, number_of_paths)
+        epsilon = self.parameter_per_path(epsilon, number_of_paths)
+        mu = self.parameter_per_path(mu, number_of_paths)
+
+        event = np.random.uniform(0, 1, shape) < alpha
+        bad_news = event & (np.random.uniform(0, 1, shape) < delta)
+        good_news = event & ~bad_news
+
+        return {
+            'event': event,
+            'bad_news': bad_news,
+            'buys': np.random.poisson(epsilon + mu * good_news),
+            'sells': np.random.poisson(epsilon + mu * bad_news),
+        }
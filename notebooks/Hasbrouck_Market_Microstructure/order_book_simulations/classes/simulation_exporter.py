@@ -0,0 +1,193 @@
+"""
+This class exports the outputs of a simulation to Arrow tables and Parquet files, instead of building
+DataFrames row by row from the lists of the book and of the traders.
+
+The outputs are grouped in four tables:
+- book_metrics: one row per step, with the price, mid price, micro price, volumes, spread, imbalances and depth
+- trade_tape: one row per trade
+- book_snapshots: one row per price level of every snapshot of the book
+- trader_histories: one row per trader and step, with cash, units and total wealth
+
+Every sequence is converted once to a typed numpy array, and numeric numpy arrays are wrapped by Arrow
+without copying. If the book was run with a retention and a spill directory, the spilled steps are
+included too (call flush_spilled before exporting). The spilled chunks are checked against what the book and the
+traders wrote: a ValueError is raised if some items were not flushed or if the directory holds other chunks.
+
+The tables of many simulations (for example the paths of a Monte Carlo ensemble) can be written in the same
+directory, partitioned by path_id. They can be loaded back lazily, one column at a time, with load_column:
+
+exporter = SimulationExporter(mm.book, mm.traders)
+exporter.write_parquet('ensemble', path_id=7)
+
+prices = SimulationExporter.load_column('ensemble', 'book_metrics', 'price')
+"""
+from .order_book import OrderBook
+from .ring_buffer import RingBuffer, load_spilled_columns
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+class SimulationExporter():
+
+    tables = ('book_metrics', 'trade_tape', 'book_snapshots', 'trader_histories')
+
+    def __init__(self, book: OrderBook, traders=None):
+        self.book = book
+
+        if traders is None:
+            traders = []
+        self.traders = traders
+
+    @staticmethod
+    def load_spilled(spill_writer):
+        # the chunks of a spill writer, checking that they are exactly the rows it wrote
+        if spill_writer.items:
+            raise ValueError(f'{len(spill_writer.items)} items of {spill_writer.name} are not written to disk yet\n'
+                             f'Call flush_spilled before exporting')
+
+        spilled = load_spilled_columns(spill_writer.spill_directory, spill_writer.name)
+        number_of_rows = len(next(iter(spilled.values()))) if spilled else 0
+        if number_of_rows != spill_writer.number_of_rows:
+            raise ValueError(f'the chunks of {spill_writer.name} in {spill_writer.spill_directory} have {number_of_rows} rows\n'
+                             f'The simulation wrote {spill_writer.number_of_rows} rows')
+
+        return spilled
+
+    @staticmethod
+    def sequence_to_array(sequence, dtype=float):
+        # the whole history of a sequence as a numpy array: the spilled items (if any) and then the retained ones
+        values = np.asarray(sequence, dtype=dtype)
+
+        if isinstance(sequence, RingBuffer) and (sequence.spill_writer is not None):
+            spilled = SimulationExporter.load_spilled(sequence.spill_writer)
+            if spilled:
+                spilled_values = np.column_stack(list(spilled.values())).astype(dtype)
+                if values.ndim == 1:
+                    spilled_values = spilled_values[:, 0]
+                values = np.concatenate([spilled_values, values.reshape((-1,) + spilled_values.shape[1:])])
+
+            if len(values) != sequence.total_length:
+                raise ValueError(f'{sequence.spill_writer.name} has {len(values)} spilled and retained items\n'
+                                 f'The simulation appended {sequence.total_length} items')
+
+        return values
+
+    def book_metrics_table(self):
+        book = self.book
+
+        price = self.sequence_to_array(book.price_sequence)
+        depth_size = self.sequence_to_array(book.depth_sequence_size).reshape(-1, 2)
+        depth_volumes = self.sequence_to_array(book.depth_sequence_volumes).reshape(-1, 2)
+
+        # number of the update of the book, starting from 1. With a retention and no spill only the last ones are available
+        if isinstance(book.price_sequence, RingBuffer):
+            number_of_updates = book.price_sequence.total_length
+        else:
+            number_of_updates = len(book.price_sequence)
+        step = np.arange(number_of_updates - len(price) + 1, number_of_updates + 1)
+
+        return pa.table({
+            'step': pa.array(step),
+            'price': pa.array(price),
+            'mid_price': pa.array(self.sequence_to_array(book.mid_price_sequence)),
+            'micro_price': pa.array(self.sequence_to_array(book.micro_price_sequence)),
+            'volume': pa.array(self.sequence_to_array(book.volumes_sequence)),
+            'buy': pa.array(self.sequence_to_array(book.buy_sequence, dtype=np.int8)),
+            'sell': pa.array(self.sequence_to_array(book.sell_sequence, dtype=np.int8)),
+            'bid_ask_spread': pa.array(self.sequence_to_array(book.bid_ask_spread_sequence)),
+            'volume_imbalance': pa.array(self.sequence_to_array(book.volume_imbalance_sequence)),
+            'order_flow_imbalance': pa.array(self.sequence_to_array(book.order_flow_imbalance_sequence)),
+            'depth_size_ask': pa.array(np.ascontiguousarray(depth_size[:, 0])),
+            'depth_size_bid': pa.array(np.ascontiguousarray(depth_size[:, 1])),
+            'depth_volume_ask': pa.array(np.ascontiguousarray(depth_volumes[:, 0])),
+            'depth_volume_bid': pa.array(np.ascontiguousarray(depth_volumes[:, 1])),
+        })
+
+    def trade_tape_table(self):
+        columns = OrderBook.trades_to_columns(list(self.book.trades.items()))
+        return self.columns_to_table(columns, self.book.trades_spill_writer)
+
+    def book_snapshots_table(self):
+        columns = OrderBook.book_states_to_columns(self.book.book_state_sequence)
+        return self.columns_to_table(columns, getattr(self.book.book_state_sequence, 'spill_writer', None))
+
+    def columns_to_table(self, columns, spill_writer):
+        # prepend the spilled chunks of the book, if any
+        if spill_writer is not None:
+            spilled = self.load_spilled(spill_writer)
+            if spilled:
+                columns = {name: np.concatenate([spilled[name], values]) for name, values in columns.items()}
+
+        return pa.table({name: pa.array(values) for name, values in columns.items()})
+
+    def trader_histories_table(self):
+        tables = []
+        for trader in self.traders:
+            # (step, value) tuples -> arrays. The cash and the units are recorded from step 0, the wealth from step 1
+            cash = self.sequence_to_array(trader.cash_sequence).reshape(-1, 2)
+            inventory = self.sequence_to_array(trader.number_units_stock_in_inventory_sequence).reshape(-1, 2)
+            in_market = self.sequence_to_array(trader.number_units_stock_in_market_sequence).reshape(-1, 2)
+            wealth = self.sequence_to_array(trader.total_wealth_sequence).reshape(-1, 2)
+
+            step = cash[:, 0].astype(np.int64)
+            total_wealth = np.full(len(step), np.nan)
+            total_wealth[np.searchsorted(step, wealth[:, 0].astype(np.int64))] = wealth[:, 1]
+
+            tables.append(pa.table({
+                'trader_id': pa.array(np.full(len(step), str(trader.trader_id))),
+                'step': pa.array(step),
+                'cash': pa.array(np.ascontiguousarray(cash[:, 1])),
+                'number_units_stock_in_inventory': pa.array(np.ascontiguousarray(inventory[:, 1])),
+                'number_units_stock_in_market': pa.array(np.ascontiguousarray(in_market[:, 1])),
+                'total_wealth': pa.array(total_wealth),
+            }))
+
+        if not tables:
+            return pa.table({'trader_id': pa.array([], pa.string()), 'step': pa.array([], pa.int64())})
+
+        return pa.concat_tables(tables)
+
+    def to_arrow(self):
+        # dictionary table name -> Arrow table
+        return {
+            'book_metrics': self.book_metrics_table(),
+            'trade_tape': self.trade_tape_table(),
+            'book_snapshots': self.book_snapshots_table(),
+            'trader_histories': self.trader_histories_table(),
+        }
+
+    def write_parquet(self, directory, path_id=None):
+        """Write every table in directory/table_name. If path_id is passed, the files are written in the
+        partition directory/table_name/path_id=<path_id>, so that the paths of an ensemble form one dataset.
+        """
+        for table_name, table in self.to_arrow().items():
+            table_directory = os.path.join(directory, table_name)
+            if path_id is not None:
+                table_directory = os.path.join(table_directory, f'path_id={path_id}')
+
+            os.makedirs(table_directory, exist_ok=True)
+            pq.write_table(table, os.path.join(table_directory, 'part-0.parquet'))
+
+    @staticmethod
+    def open_dataset(directory, table_name):
+        # lazy dataset of a table, nothing is read until a scan is requested
+        return ds.dataset(os.path.join(directory, table_name), format='parquet', partitioning='hive')
+
+    @staticmethod
+    def load_column(directory, table_name, column, path_ids=None):
+        """Read only one column of a table, optionally only for some paths of the ensemble.
+        The path_id column is returned too, when the table is partitioned.
+        """
+        dataset = SimulationExporter.open_dataset(directory, table_name)
+
+        columns = [column]
+        if 'path_id' in dataset.schema.names:
+            columns.append('path_id')
+
+        if path_ids is None:
+            return dataset.to_table(columns=columns)
+        else:
+            return dataset.to_table(columns=columns, filter=ds.field('path_id').isin(path_ids))
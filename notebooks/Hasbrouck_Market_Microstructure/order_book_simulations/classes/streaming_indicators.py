@@ -0,0 +1,191 @@
+"""
+This file contains streaming indicators of the order book: statistics that are updated in O(1) at every step,
+instead of being recomputed from slices of mid_price_sequence or price_sequence.
+
+An indicator is attached to a book with OrderBook.add_indicator(name, indicator), and it is updated at the end of
+every OrderBook.update_sequences (so after each call of order_manager). Agents read the current value with
+book.return_indicator(name), or subscribe to it with book.subscribe(name, callback): the callback is called
+with (name, value, book) after every update. The indicators only keep their running sums, so they also work
+with a book that has a retention.
+
+Available indicators:
+- EWMAMidPrice: exponentially weighted mid price
+- RealizedVolatility: sqrt of the sum of the squared log returns of the mid price, over the last window steps
+- RollingOrderFlowImbalance: sum of the order flow imbalance over the last window steps
+- TradeSignAutocorrelation: first order autocorrelation of the signs of the trades (+1 buy, -1 sell), over the last window trades
+- VWAP: volume weighted average price of the trades of the last window steps
+
+window None means all the steps since the indicator was added. Example:
+
+book.add_indicator('ewma_mid', EWMAMidPrice(halflife=50))
+book.add_indicator('volatility', RealizedVolatility(window=100))
+book.subscribe('volatility', trader.on_volatility)
+...
+book.return_indicator('ewma_mid')
+
+Write custom indicators by subclassing Indicator and implementing update.
+"""
+from abc import abstractmethod
+from .roll_estimator import SerialCovariance
+import numpy as np
+
+
+class RollingSum():
+    """
+    Sum of the last window values (all the values if window is None), updated in O(1).
+    The values of the window are kept in a circular list, and the sum is recomputed from it once every
+    window updates so that the rounding errors don't build up.
+    """
+
+    def __init__(self, window=None):
+        self.window = window
+        self.sum = 0.0
+        self.n = 0 # number of values in the window
+
+        if window is not None:
+            self.values = [0.0] * window
+            self.position = 0 # where the next value is written
+            self.updates_since_resync = 0
+
+    def update(self, value):
+        if self.window is None:
+            self.sum += value
+            self.n += 1
+            return
+
+        self.sum += value - self.values[self.position]
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.window
+        self.n = min(self.n + 1, self.window)
+
+        self.updates_since_resync += 1
+        if self.updates_since_resync >= self.window:
+            self.sum = float(sum(self.values))
+            self.updates_since_resync = 0
+
+
+class Indicator():
+
+    def __init__(self):
+        self.value = np.nan # current value of the indicator
+
+        # trades of the book already read: more than one order can be submitted at the same time
+        self.last_time = None
+        self.number_of_trades_read = 0
+
+    def new_trades(self, book):
+        # trades of the current time of the book not read yet
+        trades = book.trades.get(book.time, [])
+        if book.time != self.last_time:
+            self.last_time = book.time
+            self.number_of_trades_read = 0
+
+        new_trades = trades[self.number_of_trades_read:]
+        self.number_of_trades_read = len(trades)
+        return new_trades
+
+    @abstractmethod
+    def update(self, book):
+        """
+        Read the last step of the book and update self.value in O(1)
+        """
+        pass
+
+
+class EWMAMidPrice(Indicator):
+
+    def __init__(self, halflife):
+        super().__init__()
+        self.halflife = halflife
+        self.decay = 0.5 ** (1 / halflife) # weight of the previous value after a new step
+
+    def update(self, book):
+        mid_price = book.mid_price_sequence[-1]
+        if np.isnan(mid_price):
+            return
+
+        if np.isnan(self.value):
+            self.value = mid_price
+        else:
+            self.value = self.decay * self.value + (1 - self.decay) * mid_price
+
+
+class RealizedVolatility(Indicator):
+    # steps where the mid price is not defined (one side of the book is empty) are skipped
+
+    def __init__(self, window=None):
+        super().__init__()
+        self.squared_returns = RollingSum(window)
+        self.last_mid_price = np.nan
+
+    def update(self, book):
+        mid_price = book.mid_price_sequence[-1]
+        if np.isnan(mid_price):
+            return
+
+        if not np.isnan(self.last_mid_price):
+            log_return = np.log(mid_price / self.last_mid_price)
+            self.squared_returns.update(log_return * log_return)
+            self.value = np.sqrt(max(self.squared_returns.sum, 0))
+
+        self.last_mid_price = mid_price
+
+
+class RollingOrderFlowImbalance(Indicator):
+
+    def __init__(self, window=None):
+        super().__init__()
+        self.order_flow_imbalance = RollingSum(window)
+
+    def update(self, book):
+        order_flow_imbalance = book.order_flow_imbalance_sequence[-1]
+        if np.isnan(order_flow_imbalance):
+            order_flow_imbalance = 0.0
+
+        self.order_flow_imbalance.update(order_flow_imbalance)
+        self.value = self.order_flow_imbalance.sum
+
+
+class TradeSignAutocorrelation(Indicator):
+    # window is a number of trades, not of steps
+
+    def __init__(self, window=None):
+        super().__init__()
+        self.covariance = SerialCovariance(window)
+        self.last_sign = np.nan
+
+    def update(self, book):
+        new_trades = self.new_trades(book)
+        if not new_trades:
+            return
+
+        signs = np.array([1.0 if trade.direction == 'buy' else -1.0 for trade in new_trades])
+        previous_signs = np.concatenate([[self.last_sign], signs[:-1]])
+        self.last_sign = signs[-1]
+
+        is_valid = ~np.isnan(previous_signs)
+        self.covariance.update(previous_signs[is_valid], signs[is_valid])
+        self.value = self.covariance.correlation()
+
+
+class VWAP(Indicator):
+
+    def __init__(self, window=None):
+        super().__init__()
+        self.notional = RollingSum(window) # sum of price * volume of every step
+        self.volume = RollingSum(window) # sum of the traded volume of every step
+
+    def update(self, book):
+        # the trades already read by a previous call at the same time are not counted twice
+        notional = 0.0
+        volume = 0.0
+        for trade in self.new_trades(book):
+            notional += trade.price * trade.volume
+            volume += trade.volume
+
+        self.notional.update(notional)
+        self.volume.update(volume)
+        if self.volume.sum > 0:
+            self.value = self.notional.sum / self.volume.sum
+        else:
+            self.value = np.nan
@@ -7,14 +7,15 @@ In further iterations, it could contain
 - a generalised way to describe a trading strategy followed by the trader
 """
 
-from classes.order import Order
-from classes.order_book import OrderBook
-from prettytable import PrettyTable
+from .order import Order
+from .order_book import OrderBook
+from .ring_buffer import RingBuffer
 
 import numpy as np
 
 class Trader():
-    def __init__(self, initial_cash=100, number_units_stock_in_inventory=0, trader_id=None, check_order_feasibility=False):
+    def __init__(self, initial_cash=100, number_units_stock_in_inventory=0, trader_id=None, check_order_feasibility=False,
+                 retention=None, spill_directory=None):
         # here you can set different trader attributes
         # like the initial cash, the trading strategy type, the risk aversion, etc...
         self.cash = initial_cash # total cash
@@ -29,10 +30,29 @@ class Trader():
 
         self.active_orders = [] # list containing the active orders of the trader (price, volume, order_id, order_type)
 
-        self.cash_sequence = [] # list containing tuples with (time, cash)
-        self.number_units_stock_in_inventory_sequence = [] # list containing tuples with (time, units stock)
-        self.number_units_stock_in_market_sequence = []
-        self.total_wealth_sequence = [] # list containing tuples with (time, total wealth)
+        # number of steps kept in memory (None to keep everything) and where the older steps are written, see OrderBook
+        self.retention = retention
+        self.spill_directory = spill_directory
+
+        self.cash_sequence = self.new_sequence('cash_sequence') # list containing tuples with (time, cash)
+        self.number_units_stock_in_inventory_sequence = self.new_sequence('number_units_stock_in_inventory_sequence') # list containing tuples with (time, units stock)
+        self.number_units_stock_in_market_sequence = self.new_sequence('number_units_stock_in_market_sequence')
+        self.total_wealth_sequence = self.new_sequence('total_wealth_sequence') # list containing tuples with (time, total wealth)
+
+
+    def new_sequence(self, name):
+        # a list, or a ring buffer if only the last steps are retained
+        if self.retention is None:
+            return []
+        else:
+            return RingBuffer(self.retention, self.spill_directory, f'trader_{self.trader_id}_{name}')
+
+    def flush_spilled(self):
+        # write to disk the spilled data still waiting for a full chunk
+        for sequence in (self.cash_sequence, self.number_units_stock_in_inventory_sequence,
+                         self.number_units_stock_in_market_sequence, self.total_wealth_sequence):
+            if isinstance(sequence, RingBuffer):
+                sequence.flush()
 
 
     def submit_order_to_order_book(self, order_type, price, quantity, book: OrderBook, time=None, verbose=True, update_lists=True):
@@ -47,11 +67,27 @@ class Trader():
             order.print_order()
 
 
-        book.order_manager(order, self, time, update_lists=update_lists)
+        # return the order_id of the order, None if it was not feasible. The order_id of a stop loss / take profit
+        # order can be passed to cancel_conditional_order
+        order_id = book.order_manager(order, self, time, update_lists=update_lists)
+        if order_type != 'do_nothing':
+            return order_id
         
 
+    def cancel_conditional_order(self, order_id, book: OrderBook, time=None, update_lists=True):
+        # cancel a pending stop loss / take profit order of the trader. Nothing happens if it was already activated
+        order = Order(order_type='cancel_conditional_order', price=None, quantity=0, trader_id=self.trader_id, order_id=order_id)
+        book.order_manager(order, self, time, update_lists=update_lists)
+
+
+    def replace_quote(self, order_type, old_price, new_price, new_quantity, book: OrderBook, time=None, update_lists=True):
+        # move a resting limit_buy / limit_sell from old_price to new_price in one operation, see OrderBook.replace_quote
+        return book.replace_quote(self, order_type, old_price, new_price, new_quantity, time=time, update_lists=update_lists)
+
 
     def print_active_orders(self, time=None):
+        from prettytable import PrettyTable # imported here, so that the simulation doesn't need it
+
         print(self.active_orders)
         if time is None:
             print(f"\nActive orders of trader {self.trader_id}")
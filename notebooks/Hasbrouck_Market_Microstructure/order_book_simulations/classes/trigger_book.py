@@ -0,0 +1,122 @@
+"""
+This class contains the conditional orders (stop loss and take profit) waiting to be activated.
+When a conditional order is activated, it becomes a market order.
+
+The supported orders are:
+- stop_buy: buy when the traded price goes up to the trigger price (stop loss of a short position)
+- take_profit_sell: sell when the traded price goes up to the trigger price (take profit of a long position)
+- stop_sell: sell when the traded price goes down to the trigger price (stop loss of a long position)
+- take_profit_buy: buy when the traded price goes down to the trigger price (take profit of a short position)
+
+The orders are kept in two sorted lists, one for the orders activated by a rising price and one for the orders
+activated by a falling price. The orders to activate first are at the end of the lists, so finding and removing
+the k activated orders costs O(log n + k), instead of a scan of every pending order.
+
+A pending order can be cancelled with its sequence number (returned by add_order) or with its order_id, the one
+listed in the active orders of the trader (see cancel_order_of_trader).
+The orders are activated only by trades: an order whose trigger price was already reached by the last traded price
+when it is placed waits for the next trade at or beyond its trigger price.
+"""
+from bisect import bisect_left, insort
+
+
+class TriggerBook():
+
+    supported_orders = (
+        'stop_buy',
+        'take_profit_sell',
+        'stop_sell',
+        'take_profit_buy')
+
+    rising_orders = ('stop_buy', 'take_profit_sell') # activated when price >= trigger price
+    buy_orders = ('stop_buy', 'take_profit_buy')
+
+    def __init__(self):
+        # sorted lists of keys. For the rising orders the key is (-trigger price, -sequence number),
+        # for the falling orders the key is (trigger price, -sequence number).
+        # In both cases the last key is the first order to activate: the trigger price closest to the
+        # current price and, for equal trigger prices, the oldest order
+        self.rising_keys = []
+        self.falling_keys = []
+
+        self.orders = {} # sequence number -> (order_type, trigger_price, quantity, order_id, trader_id)
+        self.sequence_numbers = {} # order_id -> sequence number
+        self.sequence_number = 0
+
+        self.activated_trader_ids = set() # traders with orders activated since the set was last cleared
+
+    def __len__(self):
+        return len(self.orders)
+
+    def add_order(self, order_type, trigger_price, quantity, order_id, trader_id):
+        # add a conditional order, return its sequence number that can be used to cancel it
+        if order_type not in self.supported_orders:
+            raise ValueError(f'valid values for order_type are {self.supported_orders}.\nYou passed {order_type}')
+
+        sequence_number = self.sequence_number
+        self.sequence_number += 1
+
+        self.orders[sequence_number] = (order_type, trigger_price, quantity, order_id, trader_id)
+        self.sequence_numbers[order_id] = sequence_number
+
+        if order_type in self.rising_orders:
+            insort(self.rising_keys, (-trigger_price, -sequence_number))
+        else:
+            insort(self.falling_keys, (trigger_price, -sequence_number))
+
+        return sequence_number
+
+    def cancel_order(self, sequence_number):
+        # remove a conditional order before it is activated
+        order_type, trigger_price, _, order_id, _ = self.orders.pop(sequence_number)
+        del self.sequence_numbers[order_id]
+
+        if order_type in self.rising_orders:
+            keys = self.rising_keys
+            key = (-trigger_price, -sequence_number)
+        else:
+            keys = self.falling_keys
+            key = (trigger_price, -sequence_number)
+
+        keys.pop(bisect_left(keys, key))
+
+    def cancel_order_of_trader(self, order_id, trader_id):
+        # cancel the pending order with this order_id, if it belongs to trader_id. Return False if there is no
+        # such order, for example because it was already activated
+        sequence_number = self.sequence_numbers.get(order_id)
+        if (sequence_number is None) or (self.orders[sequence_number][4] != trader_id):
+            return False
+
+        self.cancel_order(sequence_number)
+        return True
+
+    def pop_activated_orders(self, max_price, min_price):
+        """Remove and return the orders activated by trades with prices between min_price and max_price,
+        in the order they should be executed.
+        Every order is returned as (order_type, trigger_price, quantity, order_id, trader_id)
+        """
+        activated = []
+
+        # rising orders with trigger price <= max_price, i.e. keys >= (-max_price, ...)
+        index = bisect_left(self.rising_keys, (-max_price, -float('inf')))
+        activated.extend(reversed(self.rising_keys[index:]))
+        del self.rising_keys[index:]
+
+        # falling orders with trigger price >= min_price, i.e. keys >= (min_price, ...)
+        index = bisect_left(self.falling_keys, (min_price, -float('inf')))
+        activated.extend(reversed(self.falling_keys[index:]))
+        del self.falling_keys[index:]
+
+        activated_orders = [self.orders.pop(-key[1]) for key in activated]
+        for order in activated_orders:
+            del self.sequence_numbers[order[3]]
+        self.activated_trader_ids.update(order[4] for order in activated_orders)
+
+        return activated_orders
+
+    def return_orders_of_trader(self, trader_id):
+        # list of (trigger_price, quantity, order_id, order_type) of the pending orders of a trader
+        return [
+            (trigger_price, quantity, order_id, order_type)
+            for (order_type, trigger_price, quantity, order_id, t_id) in self.orders.values() if t_id == trader_id
+            ]
@@ -0,0 +1,112 @@
+"""
+This class caches the decisions of the traders, so that the same decision problem is solved only once.
+
+The decision of a CARA trader (do nothing, market order or limit order) only depends on the top of the book
+(best bid and best ask) and on the parameters of the trader (side, inventory, expected payoff, payoff std,
+limit price, quantity, risk aversion). In the experiments many traders face the same problem at the same step,
+and the top of the book often doesn't change between steps, so the expected utilities are computed again and again.
+
+The cache is a dictionary key -> decision with a bounded size: when it is full, the least recently used entry
+is dropped (LRU). The floats of the key are rounded to decimals digits, so that two problems that only differ
+by floating point noise share the same entry (decimals=None keeps the exact values).
+The statistics (hits, misses, evictions, hit rate) show if the cache is useful for a simulation.
+
+It is used by ExpectedUtilityPolicy (policy = ExpectedUtilityPolicy(..., cache=UtilityCache())), and any function
+of hashable arguments can be cached with memoize, for example the per trader decision function of a notebook:
+
+cache = UtilityCache(max_items=10000)
+
+@cache.memoize
+def decide(best_bid, best_ask, is_buyer, inventory, expected_payoff, payoff_std, limit_price, quantity):
+    ...
+
+cache.statistics()
+"""
+from collections import OrderedDict
+from functools import wraps
+import numpy as np
+
+
+class UtilityCache():
+
+    def __init__(self, max_items=2**16, decimals=8):
+        self.max_items = max_items # number of decisions kept
+        self.decimals = decimals # digits of the floats of the keys, None to use the exact values
+
+        self.items = OrderedDict() # key -> value, the least recently used is the first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, *values):
+        # hashable key of a decision problem, with the floats rounded. nan (an empty side of the book) becomes None,
+        # since nan is not equal to itself and would never be found
+        values = tuple(None if (isinstance(value, float) and np.isnan(value)) else value for value in values)
+        if self.decimals is None:
+            return values
+        return tuple(round(value, self.decimals) if isinstance(value, float) else value for value in values)
+
+    def keys_of_rows(self, prefix, columns):
+        """Keys of many decision problems at once: prefix is a tuple shared by all the problems (for example the
+        top of the book), columns are arrays with one entry per problem. Return a list of tuples prefix + row.
+        """
+        matrix = np.column_stack([np.asarray(column, dtype=float) for column in columns])
+        if self.decimals is not None:
+            matrix = np.round(matrix, self.decimals)
+        prefix = self.key(*prefix)
+
+        # nan becomes None, like in key
+        rows = matrix.astype(object)
+        rows[np.isnan(matrix)] = None
+
+        return [prefix + row for row in map(tuple, rows.tolist())]
+
+    def get(self, key, default=None):
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, function):
+        # return the cached value, computing and caching it with function() if it is missing
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = function()
+            self.put(key, value)
+        return value
+
+    def memoize(self, function):
+        # decorator: cache the results of function, keyed on its (positional) arguments
+        @wraps(function)
+        def memoized_function(*args):
+            return self.get_or_compute((function.__name__,) + self.key(*args), lambda: function(*args))
+        return memoized_function
+
+    def clear(self):
+        # drop the decisions and reset the statistics, so that they describe the use of the cache after clear
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def statistics(self):
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'items': len(self.items),
+            'hit_rate': self.hits / requests if requests else 0,
+        }
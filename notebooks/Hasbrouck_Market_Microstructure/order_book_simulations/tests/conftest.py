@@ -0,0 +1,42 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# the tests import the classes like the notebooks do, from the order_book_simulations directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.market_manager import MarketManager
+from classes.order_book import OrderBook
+
+
+class NoiseMarket(MarketManager):
+    # one random order of one random trader per step
+
+    def simulate_market(self, simulation_step):
+        self.book.time = simulation_step
+        trader = self.traders[np.random.randint(len(self.traders))]
+        order_type = np.random.choice(['market_buy', 'market_sell', 'limit_buy', 'limit_sell'])
+        price = {'limit_buy': 100 - np.random.randint(1, 4), 'limit_sell': 100 + np.random.randint(1, 4)}.get(order_type)
+        trader.submit_order_to_order_book(order_type, price, 1, self.book, simulation_step, verbose=False, update_lists=False)
+        self.book.update_sequences()
+
+
+@pytest.fixture
+def noise_market():
+    # function that runs a seeded NoiseMarket with four traders, on a book built with book_arguments (retention,
+    # spill_directory, ...) and with streaming indicators (name -> indicator) whose updates are sent to callback
+    def run(simulation_length, stop_step=None, indicators=None, callback=None, **book_arguments):
+        np.random.seed(5)
+        traders_dict = {trader_id: (1e5, 1e3, False) for trader_id in range(4)}
+        book = OrderBook(**book_arguments)
+        for name, indicator in (indicators or {}).items():
+            book.add_indicator(name, indicator)
+            if callback is not None:
+                book.subscribe(name, callback)
+        manager = NoiseMarket(simulation_length, traders_dict, book)
+        manager.run_market_manager(stop_step=stop_step)
+        return manager
+
+    return run
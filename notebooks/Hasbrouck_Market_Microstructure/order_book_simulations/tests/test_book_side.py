@@ -0,0 +1,69 @@
+import numpy as np
+
+from classes.order_book import OrderBook
+from classes.trader import Trader
+
+
+def run_book(quantity_decimals):
+    # seeded random order flow. At every step the depth is also computed like the original book did,
+    # summing the quantities of the lists of orders
+    np.random.seed(7)
+    book = OrderBook()
+    book.asks = [(101, 5, 0, 0)]
+    book.bids = [(99, 5, 0, 1)]
+    traders = [Trader(trader_id=i) for i in range(6)]
+
+    list_depth_volumes = []
+    for step in range(3000):
+        trader = traders[np.random.randint(len(traders))]
+        order_type = np.random.choice(['market_buy', 'market_sell', 'limit_buy', 'limit_sell'], p=[.2, .2, .3, .3])
+        mid_price = book.return_mid_price()
+        if np.isnan(mid_price):
+            mid_price = 100
+
+        if quantity_decimals is None:
+            quantity = int(np.random.randint(1, 6))
+        else:
+            quantity = round(float(np.random.uniform(0.1, 5)), quantity_decimals)
+        price = {
+            'limit_buy': round(mid_price - np.random.randint(1, 5) * 0.1, 2),
+            'limit_sell': round(mid_price + np.random.randint(1, 5) * 0.1, 2),
+            }.get(order_type)
+
+        trader.submit_order_to_order_book(order_type, price, quantity, book, verbose=False)
+        list_depth_volumes.append((sum(ask[1] for ask in book.asks), sum(bid[1] for bid in book.bids)))
+
+    return list(book.depth_sequence_volumes), list_depth_volumes
+
+
+def test_depth_volumes_are_exact_with_integer_quantities():
+    depth_volumes, list_depth_volumes = run_book(quantity_decimals=None)
+    assert depth_volumes == list_depth_volumes
+    assert all(isinstance(volume, int) for volumes in depth_volumes for volume in volumes)
+
+
+def test_depth_volumes_do_not_drift_with_fractional_quantities():
+    # the running sums only differ from the sums of the lists by the order of the floating point additions
+    for quantity_decimals in (2, 7):
+        depth_volumes, list_depth_volumes = run_book(quantity_decimals)
+        assert np.allclose(depth_volumes, list_depth_volumes, rtol=0, atol=1e-9)
+
+
+def test_cost_to_fill_and_volume_up_to_price_walk_the_levels():
+    book = OrderBook()
+    book.asks = [(101, 2, 1, 'a'), (101, 1, 2, 'b'), (102, 3, 3, 'a'), (104, 5, 4, 'b')]
+    book.bids = [(99, 4, 5, 'a'), (97, 1, 6, 'b')]
+
+    # 3 units at 101 and 2 at 102
+    assert book.return_cost_to_fill('market_buy', 5) == ((3 * 101 + 2 * 102) / 5, 102, 5)
+    assert book.return_cost_to_fill('market_buy', 3) == (101, 101, 3)
+    # more than the side has: filled for the available volume
+    assert book.return_cost_to_fill('market_sell', 10) == ((4 * 99 + 97) / 5, 97, 5)
+
+    assert [book.ask_side.volume_up_to_price(price) for price in (100, 101, 103, 104)] == [0, 3, 6, 11]
+    assert [book.bid_side.volume_up_to_price(price) for price in (100, 99, 98, 97)] == [0, 4, 4, 5]
+
+    # the cached prefix sums follow the changes of the book
+    Trader(trader_id='c').submit_order_to_order_book('market_buy', None, 2, book, verbose=False)
+    assert book.return_cost_to_fill('market_buy', 2) == ((101 + 102) / 2, 102, 2)
+    assert book.ask_side.volume_up_to_price(103) == 4
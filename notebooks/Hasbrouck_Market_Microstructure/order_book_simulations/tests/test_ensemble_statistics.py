@@ -0,0 +1,38 @@
+import numpy as np
+
+from classes.ensemble_statistics import EnsembleStatistics
+
+
+def test_merge_then_add_paths():
+    np.random.seed(0)
+    paths_a = np.random.normal(0, 1, (30, 5))
+    paths_b = np.random.normal(1, 2, (20, 5))
+    paths_c = np.random.normal(-1, 1, (10, 5))
+
+    a = EnsembleStatistics()
+    a.add_paths('price', paths_a)
+    b = EnsembleStatistics()
+    b.add_paths('price', paths_b)
+    b.add_paths('wealth', paths_b)
+    b_mean = b.mean('wealth').copy()
+
+    # 'wealth' is only in b: the merged reducer must not share it with b
+    merged = EnsembleStatistics().merge(a).merge(b)
+    merged.add_paths('wealth', paths_c)
+    merged.add_path({'price': paths_c[0]})
+
+    assert np.array_equal(b.mean('wealth'), b_mean)
+    assert b.summary('wealth')['number_of_paths'] == 20
+    assert a.number_of_paths == 30
+
+    assert merged.summary('wealth')['number_of_paths'] == 30
+    assert merged.summary('price')['number_of_paths'] == 51
+    assert merged.number_of_paths == 51
+    assert np.allclose(merged.mean('wealth'), np.concatenate([paths_b, paths_c]).mean(axis=0))
+    assert np.allclose(merged.std('price'), np.concatenate([paths_a, paths_b, paths_c[:1]]).std(axis=0, ddof=1))
+
+    # merge_all leaves the reducers untouched
+    total = EnsembleStatistics.merge_all([a, b])
+    total.add_paths('price', paths_c)
+    assert a.number_of_paths == 30
+    assert total.summary('price')['number_of_paths'] == 60
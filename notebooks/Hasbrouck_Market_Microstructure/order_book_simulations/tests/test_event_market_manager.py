@@ -0,0 +1,79 @@
+import numpy as np
+
+from classes.order_book import OrderBook
+from classes.event_market_manager import EventMarketManager
+
+
+class SparseMarket(EventMarketManager):
+    # a market maker quoting once, noise traders waking up rarely and a trader with a stop loss
+
+    def initialise_events(self):
+        self.submit_order('mm', 'limit_sell', 101, 50, 0.1)
+        self.submit_order('mm', 'limit_buy', 99, 50, 0.1)
+        self.submit_order('mm', 'limit_sell', 102, 50, 0.1)
+        self.submit_order('mm', 'limit_buy', 98, 50, 0.1)
+        self.submit_order('stop', 'stop_sell', 99, 5, 0.2)
+        for trader_id in range(10):
+            self.schedule_wake_up(trader_id, np.random.exponential(30))
+
+    def on_wake_up(self, trader, time):
+        order_type = np.random.choice(['market_buy', 'market_sell', 'limit_buy', 'limit_sell'])
+        price = {'limit_buy': 97, 'limit_sell': 103}.get(order_type)
+        self.submit_order(trader.trader_id, order_type, price, 1, time)
+        self.schedule_wake_up(trader.trader_id, time + np.random.exponential(30))
+
+
+class LockstepSparseMarket(SparseMarket):
+    # reference: every trader is updated at every step, like in MarketManager
+
+    def run_market_manager(self, *args, stop_step=None):
+        if self.current_step == 0:
+            self.update_traders_cash(simulation_step=0)
+            self.update_traders_number_of_units_of_stock(simulation_step=0)
+            self.initialise_events(*args)
+
+        for simulation_step in range(self.current_step + 1, self.last_step(stop_step) + 1):
+            self.book.time = simulation_step
+            next_time = self.scheduler.next_time()
+            while (next_time is not None) and (next_time <= simulation_step * self.sampling_interval):
+                event = self.scheduler.pop()
+                self.current_time = event.time
+                self.process_event(event, simulation_step, *args)
+                next_time = self.scheduler.next_time()
+
+            self.book.update_sequences()
+            self.update_current_cash_margin_and_units(simulation_step)
+            self.update_traders_cash(simulation_step)
+            self.update_traders_number_of_units_of_stock(simulation_step)
+            self.update_traders_total_wealth(simulation_step)
+            self.update_traders_active_orders()
+            self.current_step = simulation_step
+
+
+def run(manager_class, stop_steps, retention=None):
+    np.random.seed(3)
+    traders_dict = {trader_id: (1e5, 1e3, False) for trader_id in list(range(10)) + ['mm', 'stop']}
+    manager = manager_class(500, traders_dict, OrderBook(retention=retention), latencies={0: 2, 1: 0.5})
+    for stop_step in stop_steps:
+        manager.run_market_manager(stop_step=stop_step)
+    return manager
+
+
+def assert_same_traders(manager, reference):
+    for trader, reference_trader in zip(manager.traders, reference.traders):
+        for name in ('cash_sequence', 'number_units_stock_in_inventory_sequence',
+                     'number_units_stock_in_market_sequence', 'total_wealth_sequence'):
+            assert list(getattr(trader, name)) == list(getattr(reference_trader, name))
+        assert trader.active_orders == reference_trader.active_orders
+
+
+def test_lazy_fill_forward_matches_lockstep_updates():
+    reference = run(LockstepSparseMarket, [None])
+    assert_same_traders(run(SparseMarket, [None]), reference)
+    # pausing the simulation fills the quiet traders too
+    assert_same_traders(run(SparseMarket, [37, 200, None]), reference)
+
+
+def test_lazy_fill_forward_with_retention():
+    reference = run(LockstepSparseMarket, [None], retention=64)
+    assert_same_traders(run(SparseMarket, [None], retention=64), reference)
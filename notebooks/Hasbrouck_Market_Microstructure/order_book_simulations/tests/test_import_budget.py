@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import classes
+from classes.import_budget import check_import_budget, core_modules
+
+order_book_simulations_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules_after(code):
+    # modules of the package classes loaded by code, in a fresh interpreter
+    script = code + "\nimport sys\nprint(' '.join(sorted(name for name in sys.modules if name.startswith('classes'))))"
+    output = subprocess.run([sys.executable, '-c', script], cwd=order_book_simulations_directory,
+                            capture_output=True, text=True, check=True).stdout
+    return set(output.split())
+
+
+def test_package_imports_a_module_when_its_name_is_used():
+    assert loaded_modules_after('import classes') == {'classes'}
+    assert loaded_modules_after('from classes import TriggerBook') == {'classes', 'classes.trigger_book'}
+
+
+def test_every_name_of_the_package_exists():
+    for name in classes.__all__:
+        assert getattr(classes, name).__name__ == name
+
+    with pytest.raises(AttributeError):
+        classes.NotAClass
+
+
+def test_core_modules_are_within_the_budget():
+    # the budget of the test is larger than the one of the module, the time of a shared test machine varies.
+    # The libraries that the core must not load are checked as they are
+    report = check_import_budget(budget=5, number_of_runs=1)
+
+    assert set(report) == set(core_modules)
+    assert all(loaded_forbidden == [] for _, loaded_forbidden in report.values())
+
+
+def test_budget_error_names_the_forbidden_library():
+    with pytest.raises(RuntimeError, match="classes.simulation_exporter imports \\['pyarrow'\\]"):
+        check_import_budget(modules=('classes.simulation_exporter',), budget=5, forbidden=('pyarrow',), number_of_runs=1)
@@ -0,0 +1,30 @@
+import numpy as np
+
+from classes.market_manager import MarketManager
+
+
+def test_resuming_a_checkpoint_gives_the_same_simulation(noise_market):
+    reference = noise_market(200)
+
+    manager = noise_market(200, stop_step=80)
+    data = manager.checkpoint()
+    np.random.seed(999) # the random numbers drawn after the checkpoint don't matter
+
+    resumed = MarketManager.restore(data, restore_random_state=True)
+    resumed.run_market_manager()
+
+    np.testing.assert_array_equal(resumed.book.price_sequence, reference.book.price_sequence)
+    for trader, reference_trader in zip(resumed.traders, reference.traders):
+        np.testing.assert_array_equal(trader.cash_sequence, reference_trader.cash_sequence)
+        np.testing.assert_array_equal(trader.total_wealth_sequence, reference_trader.total_wealth_sequence)
+
+
+def test_restore_leaves_the_random_state_alone_by_default(noise_market):
+    data = noise_market(200, stop_step=80).checkpoint()
+
+    np.random.seed(999)
+    expected = np.random.uniform()
+    np.random.seed(999)
+    MarketManager.restore(data)
+
+    assert np.random.uniform() == expected
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from classes.order_book import OrderBook
+from classes.trader import Trader
+from classes.order_flow_generator import OrderFlowGenerator
+
+
+def test_sampled_stream_starts_at_the_time_of_the_book():
+    book = OrderBook()
+    book.asks = [(101, 50, 0, 'mm')]
+    book.bids = [(99, 50, 0, 'mm')]
+    for time in range(1, 101):
+        book.time = time
+        book.update_sequences()
+    number_of_steps_before = len(book.mid_price_sequence)
+
+    order_flow = {
+        'time': np.array([0.0, 0.5, 2.5, 2.7, 10.0]),
+        'order_type': np.array(['market_buy', 'market_sell', 'market_buy', 'market_buy', 'market_sell']),
+        'price_offset': np.zeros(5),
+        'quantity': np.ones(5, dtype=int),
+    }
+    OrderFlowGenerator().submit_order_flow(book, Trader(trader_id=1), order_flow, tick_size=1, sampling_interval=1)
+
+    # the 10 units of time of the stream are the 10 steps after the book time
+    assert book.time == 110
+    assert len(book.mid_price_sequence) == number_of_steps_before + 10
+    assert {time: len(trades) for time, trades in book.trades.items() if trades} == {101: 2, 103: 2, 110: 1}
+
+
+def test_limit_price_of_an_empty_book():
+    generator = OrderFlowGenerator()
+    order_flow = {
+        'time': np.array([1.0]),
+        'order_type': np.array(['limit_buy']),
+        'price_offset': np.array([2.0]),
+        'quantity': np.array([1]),
+    }
+
+    # without trades and without a reference price the price of the order is not defined
+    with pytest.raises(ValueError):
+        generator.submit_order_flow(OrderBook(), Trader(trader_id=1), order_flow, tick_size=1)
+
+    book = OrderBook()
+    generator.submit_order_flow(book, Trader(trader_id=1), order_flow, tick_size=1, reference_price=100)
+    assert book.bids[0][:2] == (98, 1)
+
+    # with one side empty, the last traded price is used
+    book = OrderBook()
+    book.asks = [(101, 5, 0, 'mm')]
+    Trader(trader_id=2).submit_order_to_order_book('market_buy', None, 5, book, verbose=False)
+    generator.submit_order_flow(book, Trader(trader_id=1), order_flow, tick_size=1)
+    assert book.bids[0][:2] == (99, 1)
+
+
+def test_every_order_comes_from_its_trader():
+    book = OrderBook()
+    buyer, seller = Trader(trader_id='buyer'), Trader(trader_id='seller')
+    order_flow = {
+        'time': np.array([1.0, 2.0, 3.0]),
+        'order_type': np.array(['limit_sell', 'limit_sell', 'market_buy']),
+        'price_offset': np.array([1.0, 2.0, 0.0]),
+        'quantity': np.array([1, 1, 2]),
+    }
+    OrderFlowGenerator().submit_order_flow(book, [seller, seller, buyer], order_flow, tick_size=1, reference_price=100)
+
+    trades = [trade for trades in book.trades.values() for trade in trades]
+    assert [(trade.price, trade.trader_id_already_in_book, trade.trader_id_coming_in_book) for trade in trades] == [(101, 'seller', 'buyer'), (102, 'seller', 'buyer')]
+
+    with pytest.raises(ValueError, match='one trader per order'):
+        OrderFlowGenerator().submit_order_flow(book, [seller, buyer], order_flow, tick_size=1)
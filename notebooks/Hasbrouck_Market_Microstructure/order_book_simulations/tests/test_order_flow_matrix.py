@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from classes.order_flow_matrix import OrderFlowMatrix
+
+
+def dense_order_flow(book_state_sequence, price_levels):
+    # (steps, levels) grid of the signed volumes, filled from the rows of book_state_sequence like plot_order_flow
+    columns = {price: column for column, price in enumerate(price_levels)}
+    grid = np.zeros((len(book_state_sequence) // 2, len(price_levels)))
+    for step, levels in enumerate(zip(book_state_sequence[0::2], book_state_sequence[1::2])):
+        for _, price, volume, side in levels[0] + levels[1]:
+            grid[step, columns[price]] += volume if side == 'ask' else - volume
+    return grid
+
+
+def test_matrix_recorded_during_the_simulation_matches_the_book_states(noise_market):
+    reference = noise_market(400)
+    book = noise_market(400, retention=16, order_flow_ticksize=1).book
+
+    # the matrix keeps every step, also when the book keeps only the last ones
+    order_flow_matrix = book.order_flow_matrix
+    assert order_flow_matrix.times == list(range(1, 401))
+    assert order_flow_matrix.size > 1024 # the arrays grew past their initial capacity
+
+    price_levels = order_flow_matrix.price_levels()
+    expected = dense_order_flow(list(reference.book.book_state_sequence), price_levels)
+    np.testing.assert_array_equal(order_flow_matrix.heatmap(), expected)
+    np.testing.assert_array_equal(order_flow_matrix.to_coo().toarray(), expected)
+
+    rebuilt = OrderFlowMatrix.from_book_state_sequence(list(reference.book.book_state_sequence), ticksize=1)
+    np.testing.assert_array_equal(rebuilt.price_levels(), price_levels)
+    np.testing.assert_array_equal(rebuilt.heatmap(), expected)
+
+    # slices and sides
+    np.testing.assert_array_equal(order_flow_matrix.heatmap(start=100, end=200), expected[100:200])
+    np.testing.assert_array_equal(order_flow_matrix.heatmap(side='ask'), np.maximum(expected, 0))
+    np.testing.assert_array_equal(order_flow_matrix.heatmap(side='bid'), np.maximum(- expected, 0))
+    np.testing.assert_array_equal(order_flow_matrix.depth_profile(), expected[-1])
+    np.testing.assert_array_equal(order_flow_matrix.level_volumes(101, side='ask'), np.maximum(expected[:, list(price_levels).index(101)], 0))
+
+    with pytest.raises(ValueError):
+        order_flow_matrix.to_coo(side='mid')
+
+
+def test_prices_on_a_decimal_tick():
+    order_flow_matrix = OrderFlowMatrix(ticksize=0.1, initial_capacity=1)
+    order_flow_matrix.append_step(1, {10.2: 3, 10.3: 1}, {10.0: 2})
+    order_flow_matrix.append_step(2, {}, {})
+
+    np.testing.assert_allclose(order_flow_matrix.price_levels(), [10.0, 10.1, 10.2, 10.3])
+    np.testing.assert_array_equal(order_flow_matrix.heatmap(), [[-2, 0, 3, 1], [0, 0, 0, 0]])
+
+    # the compressed matrix is converted again after a new step
+    order_flow_matrix.append_step(3, {10.5: 4}, {})
+    assert order_flow_matrix.to_csr().shape == (3, 6)
+    np.testing.assert_array_equal(order_flow_matrix.level_volumes(10.5), [0, 0, 4])
@@ -0,0 +1,76 @@
+import numpy as np
+from scipy import stats
+
+from classes.policy import ExpectedUtilityPolicy
+from classes.utility_cache import UtilityCache
+
+
+def notebook_decision(alpha, payoff_std, best_bid, best_ask, is_buyer, inventory, expected_payoff, std, price, quantity):
+    # the decision of one trader, written like the simulate loop of experiment_1_CMSW_framework.ipynb
+    def utility(wealth_mean, wealth_std):
+        return - np.exp(- alpha * wealth_mean + ((alpha * wealth_std)**2)/2)
+
+    base_utility = utility(inventory * expected_payoff, inventory * std)
+    if is_buyer:
+        limit_utility = utility((inventory + quantity) * expected_payoff - price * quantity, (inventory + quantity) * std)
+        market_utility = utility((inventory + quantity) * expected_payoff - best_ask * quantity, (inventory + quantity) * std)
+        probability_hit_limit_order = stats.norm.cdf((price - expected_payoff) / payoff_std)
+    else:
+        limit_utility = utility((inventory - quantity) * expected_payoff + price * quantity, (inventory - quantity) * std)
+        market_utility = utility((inventory - quantity) * expected_payoff + best_bid * quantity, (inventory - quantity) * std)
+        probability_hit_limit_order = 1 - stats.norm.cdf((price - expected_payoff) / payoff_std)
+
+    hit_utility = probability_hit_limit_order * limit_utility + (1 - probability_hit_limit_order) * base_utility
+
+    if (hit_utility > market_utility) and (hit_utility > base_utility):
+        return ('limit_buy' if is_buyer else 'limit_sell'), price
+    elif (market_utility > base_utility) and (market_utility > hit_utility):
+        return ('market_buy' if is_buyer else 'market_sell'), np.nan
+    else:
+        return 'do_nothing', np.nan
+
+
+def random_traders(number_of_traders, best_bid, best_ask, payoff_mean, payoff_std):
+    # sellers own the quantity they sell, buyers own nothing and a third of them are informed, like in the notebook
+    np.random.seed(700)
+    is_buyer = np.random.uniform(size=number_of_traders) < 0.5
+    is_informed = is_buyer & (np.random.uniform(size=number_of_traders) < 1 / 3)
+    quantity = np.abs(np.random.normal(0, 1, number_of_traders))
+    noise = np.abs(np.random.normal(0, payoff_std, (2, number_of_traders)))
+
+    limit_price = np.round(np.where(is_buyer, best_ask - noise[0], best_bid + noise[0]), 2)
+    limit_price = np.where(is_informed, np.round(np.minimum(payoff_mean - noise[0], best_ask), 2), limit_price)
+    expected_payoff = np.where(is_buyer, limit_price + noise[1], limit_price - noise[1])
+    expected_payoff = np.where(is_informed, payoff_mean, expected_payoff)
+
+    return {
+        'is_buyer': is_buyer,
+        'number_units_stock_in_inventory': np.where(is_buyer, 0, quantity),
+        'expected_payoff': expected_payoff,
+        'payoff_std': np.where(is_informed, 0, payoff_std),
+        'limit_price': limit_price,
+        'quantity': quantity,
+    }
+
+
+def test_policy_decides_like_the_notebook_loop():
+    alpha, payoff_mean, payoff_std = 1, 10, 0.05
+    book_features = {'best_bid': 9.99, 'best_ask': 10.01}
+    traders_state = random_traders(500, book_features['best_bid'], book_features['best_ask'], payoff_mean, payoff_std)
+
+    expected = [
+        notebook_decision(alpha, payoff_std, book_features['best_bid'], book_features['best_ask'], *row)
+        for row in zip(*(traders_state[name] for name in ('is_buyer', 'number_units_stock_in_inventory', 'expected_payoff',
+                                                          'payoff_std', 'limit_price', 'quantity')))
+        ]
+
+    for cache in (None, UtilityCache()):
+        policy = ExpectedUtilityPolicy(range(500), alpha, hit_probability_std=payoff_std, cache=cache)
+        order_types, prices, quantities = policy.decide(book_features, traders_state)
+
+        assert list(order_types) == [order_type for order_type, _ in expected]
+        np.testing.assert_array_equal(prices, [price for _, price in expected])
+        np.testing.assert_array_equal(quantities, traders_state['quantity'])
+
+    # every kind of decision is covered
+    assert {order_type for order_type, _ in expected} >= {'limit_buy', 'limit_sell', 'market_buy', 'do_nothing'}
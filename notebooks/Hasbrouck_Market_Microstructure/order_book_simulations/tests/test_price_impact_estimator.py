@@ -0,0 +1,55 @@
+import numpy as np
+
+from classes.order_book import OrderBook
+from classes.price_impact_estimator import PriceImpactEstimator
+from classes.trader import Trader
+
+
+def test_regressions_match_polyfit():
+    generator = np.random.default_rng(11)
+    order_flows = generator.normal(0, 10, 600)
+    mid_prices = 100 + np.cumsum(0.01 + 0.05 * order_flows + generator.normal(0, 0.2, 600))
+    mid_prices[[100, 101, 350]] = np.nan # a side of the book was empty
+
+    estimator = PriceImpactEstimator(windows=(None, 50), halflives=(30,))
+    estimator.update(order_flows[0], mid_prices[0])
+    for start in range(1, 600, 97):
+        estimator.update_many(order_flows[start:start + 97], mid_prices[start:start + 97])
+
+    # the pairs (order flow, mid price change) of the steps where both mid prices are defined
+    y = np.diff(mid_prices)
+    x = order_flows[1:]
+    is_valid = ~np.isnan(y)
+    x, y = x[is_valid], y[is_valid]
+
+    expanding = estimator.return_regression()
+    np.testing.assert_allclose(expanding[1::-1], np.polyfit(x, y, 1), rtol=1e-9)
+    assert np.isclose(expanding[2], np.corrcoef(x, y)[0, 1]**2)
+
+    np.testing.assert_allclose(estimator.return_regression(window=50)[1::-1], np.polyfit(x[-50:], y[-50:], 1), rtol=1e-9)
+
+    weights = 0.5 ** (np.arange(len(x) - 1, -1, -1) / 30)
+    np.testing.assert_allclose(estimator.return_regression(halflife=30)[1::-1], np.polyfit(x, y, 1, w=np.sqrt(weights)), rtol=1e-9)
+
+
+def test_reading_a_book_with_retention_matches_reading_the_whole_lists():
+    np.random.seed(3)
+    books = (OrderBook(), OrderBook(retention=16))
+    traders = [Trader(trader_id=i) for i in range(4)]
+    estimator = PriceImpactEstimator(windows=(None, 20), halflives=(10,))
+
+    for step in range(300):
+        trader = traders[np.random.randint(4)]
+        order_type = np.random.choice(['market_buy', 'market_sell', 'limit_buy', 'limit_sell'])
+        price = {'limit_buy': 100 - np.random.randint(1, 4), 'limit_sell': 100 + np.random.randint(1, 4)}.get(order_type)
+        quantity = np.random.randint(1, 4)
+        for book in books:
+            trader.submit_order_to_order_book(order_type, price, quantity, book, verbose=False)
+        estimator.update_from_book(books[1], order_flow='signed_volume')
+
+    reference = PriceImpactEstimator(windows=(None, 20), halflives=(10,))
+    reference.update_from_book(books[0], order_flow='signed_volume')
+
+    assert not np.isnan(reference.return_impact(window=20))
+    for name, estimates in reference.return_estimates().items():
+        np.testing.assert_allclose(estimator.return_estimates()[name], estimates, rtol=1e-9)
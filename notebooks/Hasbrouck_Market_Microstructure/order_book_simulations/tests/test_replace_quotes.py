@@ -0,0 +1,46 @@
+from classes.order_book import OrderBook
+from classes.trader import Trader
+
+
+def test_quotes_moved_to_the_same_price_stay_distinct():
+    book = OrderBook()
+    market_maker = Trader(trader_id='mm')
+    other = Trader(trader_id='other')
+
+    # three asks of the market maker at different prices, then a competing ask at 103
+    for time, price in ((1, 105), (2, 106), (3, 107)):
+        market_maker.submit_order_to_order_book('limit_sell', price, 2, book, time, verbose=False)
+    other.submit_order_to_order_book('limit_sell', 103, 1, book, 4, verbose=False)
+
+    # move all of them to 103 in one batch
+    new_order_ids = book.replace_quotes([(market_maker, 'limit_sell', price, 103, 2, None) for price in (105, 106, 107)], time=5)
+
+    assert len(set(new_order_ids)) == 3
+    assert [ask[2] for ask in book.asks] == [4] + new_order_ids
+    assert [book.return_queue_ahead('limit_sell', 103, order_id, 'mm') for order_id in new_order_ids] == [1, 3, 5]
+
+    # each quote can still be moved by its own id, the others keep their place
+    book.replace_quote(market_maker, 'limit_sell', 103, 103, 0, order_id=new_order_ids[1], time=6)
+    assert [(ask[1], ask[2]) for ask in book.asks] == [(1, 4), (2, new_order_ids[0]), (2, new_order_ids[2])]
+    assert book.return_queue_ahead('limit_sell', 103, new_order_ids[2], 'mm') == 3
+    assert book.return_order_book_depth_volumes() == (5, 0)
+
+
+def test_moved_quotes_keep_their_priority_over_later_orders():
+    book = OrderBook()
+    market_maker = Trader(trader_id='mm')
+    other = Trader(trader_id='other')
+    for price in (105, 106):
+        market_maker.submit_order_to_order_book('limit_sell', price, 2, book, 2**40, verbose=False)
+
+    new_order_ids = book.replace_quotes([(market_maker, 'limit_sell', price, 103, 2, None) for price in (105, 106)], time=2**40 + 1)
+    # a new order at the same price and at the same time goes behind the moved quotes
+    other.submit_order_to_order_book('limit_sell', 103, 1, book, 2**40 + 1, verbose=False)
+
+    assert all(isinstance(order_id, int) for order_id in new_order_ids)
+    assert [ask[3] for ask in book.asks] == ['mm', 'mm', 'other']
+    assert [book.return_queue_ahead('limit_sell', 103, ask[2], ask[3]) for ask in book.asks] == [0, 2, 4]
+
+    Trader(trader_id='taker').submit_order_to_order_book('market_buy', None, 4, book, 2**40 + 2, verbose=False)
+    assert [trade.trader_id_already_in_book for trade in book.trades[2**40 + 2]] == ['mm', 'mm']
+    assert book.asks == [(103, 1, book.asks[0][2], 'other')]
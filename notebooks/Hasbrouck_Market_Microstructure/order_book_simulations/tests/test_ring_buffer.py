@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from classes.ring_buffer import RingBuffer, load_spilled_columns
+
+
+def test_ring_buffer_spills_what_it_drops(tmp_path):
+    sequence = RingBuffer(8, str(tmp_path), 'values')
+    for i in range(30):
+        sequence.append(i)
+    sequence.flush()
+
+    assert list(sequence) == list(range(22, 30))
+    assert list(load_spilled_columns(str(tmp_path), 'values')['values']) == list(range(22))
+
+
+def test_spilled_and_retained_steps_match_an_unbounded_run(tmp_path, noise_market):
+    reference = noise_market(200)
+    manager = noise_market(200, retention=16, spill_directory=str(tmp_path))
+    manager.flush_spilled()
+
+    spilled_prices = load_spilled_columns(str(tmp_path), 'price_sequence')['values']
+    np.testing.assert_array_equal(np.concatenate([spilled_prices, manager.book.price_sequence]), reference.book.price_sequence)
+
+    for trader, reference_trader in zip(manager.traders, reference.traders):
+        spilled_cash = load_spilled_columns(str(tmp_path), f'trader_{trader.trader_id}_cash_sequence')
+        cash = list(zip(spilled_cash['column_0'], spilled_cash['column_1'])) + list(trader.cash_sequence)
+        np.testing.assert_array_equal(cash, reference_trader.cash_sequence)
+
+
+def test_a_second_simulation_refuses_the_same_spill_directory(tmp_path, noise_market):
+    noise_market(200, retention=16, spill_directory=str(tmp_path)).flush_spilled()
+
+    with pytest.raises(ValueError, match='already has chunks'):
+        noise_market(60, retention=16, spill_directory=str(tmp_path))
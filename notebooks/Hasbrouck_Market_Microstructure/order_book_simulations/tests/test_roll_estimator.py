@@ -0,0 +1,39 @@
+import numpy as np
+from types import SimpleNamespace
+
+from classes.roll_estimator import RollEstimator
+
+
+def test_idle_steps_do_not_change_the_roll_spread():
+    np.random.seed(0)
+    # transaction prices of the Roll model: efficient price plus half spread times the trade sign
+    number_of_trades = 2000
+    trade_prices = 100 + np.cumsum(np.random.normal(0, 0.01, number_of_trades)) + 0.05 * np.random.choice([-1, 1], number_of_trades)
+
+    # the book repeats the last price, with volume 0, on the steps without trades
+    price_sequence = []
+    volumes_sequence = []
+    for price in trade_prices:
+        for _ in range(np.random.randint(0, 4)):
+            if price_sequence:
+                price_sequence.append(price_sequence[-1])
+                volumes_sequence.append(0)
+        price_sequence.append(price)
+        volumes_sequence.append(np.random.randint(1, 10))
+
+    expected = RollEstimator(windows=(None, 100))
+    expected.update_many(trade_prices)
+
+    estimator = RollEstimator(windows=(None, 100))
+    book = SimpleNamespace(price_sequence=[], volumes_sequence=[])
+    for step in range(len(price_sequence)):
+        # read the book while it grows, like during a simulation
+        book.price_sequence.append(price_sequence[step])
+        book.volumes_sequence.append(volumes_sequence[step])
+        if step % 7 == 0:
+            estimator.update_from_book(book)
+    estimator.update_from_book(book)
+
+    for window in (None, 100):
+        assert np.isclose(estimator.return_roll_spread(window), expected.return_roll_spread(window))
+    assert np.isclose(estimator.return_roll_spread(), 0.1, rtol=0.2)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from classes.sequential_trade_simulator import SequentialTradeSimulator
+
+
+def notebook_recursion(directions, mu, delta, V_0, delta_v):
+    # the dealer's quotes of one sequence of trades, with the loop of sequential_trade_model_part_2.ipynb
+    rows = []
+    d_minus_one = delta
+    v_high, v_low = V_0 + delta_v, V_0 - delta_v
+    for direction in directions:
+        delta_k_buy = d_minus_one * (1 - mu) / (1 + mu * (1 - 2 * d_minus_one))
+        delta_k_sell = d_minus_one * (1 + mu) / (1 - mu * (1 - 2 * d_minus_one))
+        d_minus_one = delta_k_buy if direction == 1 else delta_k_sell
+
+        bid = delta_k_sell * v_low + (1 - delta_k_sell) * v_high
+        ask = delta_k_buy * v_low + (1 - delta_k_buy) * v_high
+        rows.append((ask, bid, ask if direction == 1 else bid, delta_k_buy, delta_k_sell))
+    return np.array(rows)
+
+
+def test_paths_match_the_notebook_recursion():
+    np.random.seed(76)
+    simulator = SequentialTradeSimulator(V_0=100, delta_v=20)
+    mu = np.array([0.1, 0.5, 0.9, 0.5])
+    delta = np.array([0.5, 0.5, 0.3, 0.8])
+    directions = np.random.choice([1, -1], size=(4, 100))
+
+    paths = simulator.simulate_paths(mu=mu, delta=delta, number_of_paths=4, number_of_trades=100, directions=directions)
+
+    for i in range(4):
+        expected = notebook_recursion(directions[i], mu[i], delta[i], 100, 20)
+        columns = np.column_stack([paths[name][i] for name in ('ask', 'bid', 'executed', 'delta_k_buy', 'delta_k_sell')])
+        np.testing.assert_allclose(columns, expected, rtol=0, atol=1e-9)
+
+
+def test_fully_informed_traders_reveal_the_value():
+    np.random.seed(76)
+    simulator = SequentialTradeSimulator(V_0=100, delta_v=20)
+    directions = np.random.choice([1, -1], size=(3, 50))
+    directions[0] = 1 # all buys: the first one reveals the high value
+
+    paths = simulator.simulate_paths(mu=1, delta=np.array([0.5, 0.5, 0.2]), number_of_paths=3, number_of_trades=50, directions=directions)
+    limit = simulator.simulate_paths(mu=1 - 1e-12, delta=np.array([0.5, 0.5, 0.2]), number_of_paths=3, number_of_trades=50, directions=directions)
+
+    for name in ('delta', 'delta_k_buy', 'delta_k_sell', 'ask', 'bid'):
+        assert not np.isnan(paths[name]).any(), name
+        np.testing.assert_allclose(paths[name], limit[name], rtol=0, atol=1e-6)
+    assert (paths['executed'][0] == 120).all()
@@ -0,0 +1,39 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from classes.simulation_exporter import SimulationExporter
+
+
+def test_export_with_spill_matches_an_unbounded_run(tmp_path, noise_market):
+    reference = noise_market(200)
+    manager = noise_market(200, retention=16, spill_directory=str(tmp_path))
+    manager.flush_spilled()
+
+    tables = SimulationExporter(manager.book, manager.traders).to_arrow()
+    reference_tables = SimulationExporter(reference.book, reference.traders).to_arrow()
+
+    for table_name in SimulationExporter.tables:
+        pd.testing.assert_frame_equal(tables[table_name].to_pandas(), reference_tables[table_name].to_pandas())
+    assert tables['book_metrics'].column('step').to_pylist() == list(range(1, 201))
+
+
+def test_export_refuses_items_not_flushed(tmp_path, noise_market):
+    manager = noise_market(200, retention=16, spill_directory=str(tmp_path))
+
+    with pytest.raises(ValueError, match='flush_spilled'):
+        SimulationExporter(manager.book).book_metrics_table()
+
+
+def test_export_refuses_chunks_it_did_not_write(tmp_path, noise_market):
+    manager = noise_market(200, retention=16, spill_directory=str(tmp_path))
+    manager.flush_spilled()
+
+    # a chunk left by another simulation, numbered after the last one of this book
+    last_chunk = os.path.join(str(tmp_path), f'price_sequence_{manager.book.price_sequence.spill_writer.number_of_chunks - 1:06d}.npz')
+    shutil.copy(last_chunk, os.path.join(str(tmp_path), 'price_sequence_999999.npz'))
+
+    with pytest.raises(ValueError, match='The simulation wrote'):
+        SimulationExporter(manager.book).book_metrics_table()
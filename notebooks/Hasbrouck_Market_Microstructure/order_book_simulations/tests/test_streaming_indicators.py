@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from classes.streaming_indicators import EWMAMidPrice, RealizedVolatility, RollingOrderFlowImbalance, TradeSignAutocorrelation, VWAP
+
+
+def last(values, window):
+    return values if window is None else values[-window:]
+
+
+def recomputed_values(book, halflife, window):
+    # value of every indicator after every step, recomputed from the whole sequences of the book
+    mid_prices = np.array(book.mid_price_sequence)
+    order_flow_imbalance = np.nan_to_num(np.array(book.order_flow_imbalance_sequence))
+
+    values = {name: [] for name in ('ewma_mid', 'volatility', 'order_flow_imbalance', 'trade_sign', 'vwap')}
+    signs, notional, volume = [], [], []
+    for step in range(len(mid_prices)):
+        defined_mid_prices = mid_prices[:step + 1][~np.isnan(mid_prices[:step + 1])]
+        if len(defined_mid_prices):
+            ewma = pd.Series(defined_mid_prices).ewm(halflife=halflife, adjust=False).mean().iloc[-1]
+        else:
+            ewma = np.nan
+        values['ewma_mid'].append(ewma)
+
+        log_returns = np.diff(np.log(defined_mid_prices))
+        values['volatility'].append(np.sqrt(np.sum(last(log_returns, window) ** 2)) if len(log_returns) else np.nan)
+
+        values['order_flow_imbalance'].append(np.sum(last(order_flow_imbalance[:step + 1], window)))
+
+        trades = book.trades[step + 1]
+        signs += [1.0 if trade.direction == 'buy' else -1.0 for trade in trades]
+        pairs = last(np.array([signs[:-1], signs[1:]]).T, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # before the signs change the correlation is not defined, like in the indicator
+            values['trade_sign'].append(np.corrcoef(pairs.T)[0, 1] if len(pairs) >= 2 else np.nan)
+
+        notional.append(sum(trade.price * trade.volume for trade in trades))
+        volume.append(sum(trade.volume for trade in trades))
+        traded_volume = np.sum(last(volume, window))
+        values['vwap'].append(np.sum(last(notional, window)) / traded_volume if traded_volume > 0 else np.nan)
+
+    return values
+
+
+def test_indicators_match_the_values_recomputed_from_the_sequences(noise_market):
+    for window in (None, 15):
+        indicators = {
+            'ewma_mid': EWMAMidPrice(halflife=10),
+            'volatility': RealizedVolatility(window),
+            'order_flow_imbalance': RollingOrderFlowImbalance(window),
+            'trade_sign': TradeSignAutocorrelation(window),
+            'vwap': VWAP(window),
+        }
+        updates = {name: [] for name in indicators}
+        manager = noise_market(300, indicators=indicators, callback=lambda name, value, book: updates[name].append(value))
+
+        expected = recomputed_values(manager.book, halflife=10, window=window)
+        for name in indicators:
+            np.testing.assert_allclose(updates[name], expected[name], rtol=1e-9, atol=1e-12, err_msg=f'{name} {window}')
+            assert manager.book.return_indicator(name) == updates[name][-1]
+        assert not np.isnan(updates['trade_sign'][-1])
+
+
+def test_indicators_work_with_a_retention(noise_market):
+    indicators = {'volatility': RealizedVolatility(window=15), 'vwap': VWAP(window=15)}
+    reference_indicators = {'volatility': RealizedVolatility(window=15), 'vwap': VWAP(window=15)}
+
+    noise_market(300, retention=16, indicators=indicators)
+    noise_market(300, indicators=reference_indicators)
+
+    for name in indicators:
+        assert indicators[name].value == reference_indicators[name].value
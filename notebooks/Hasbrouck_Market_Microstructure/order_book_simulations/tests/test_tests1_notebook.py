@@ -0,0 +1,19 @@
+import json
+import os
+
+
+def test_tests1_notebook():
+    # run the code cells of tests1.ipynb, the original tests of the order book mechanics, in one namespace
+    filename = os.path.join(os.path.dirname(__file__), 'tests1.ipynb')
+    with open(filename) as f:
+        notebook = json.load(f)
+
+    namespace = {'__name__': '__main__'}
+    current_directory = os.getcwd()
+    os.chdir(os.path.dirname(filename)) # the notebook adds ../../order_book_simulations to the path
+    try:
+        for i, cell in enumerate(notebook['cells']):
+            if cell['cell_type'] == 'code':
+                exec(compile(''.join(cell['source']), f'tests1.ipynb cell {i}', 'exec'), namespace)
+    finally:
+        os.chdir(current_directory)
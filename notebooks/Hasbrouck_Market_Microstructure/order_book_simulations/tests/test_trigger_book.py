@@ -0,0 +1,57 @@
+from classes.order_book import OrderBook
+from classes.trader import Trader
+
+
+def book_with_bids(bids):
+    # a book with one bid of the trader 'mm' for every (price, quantity)
+    book = OrderBook()
+    market_maker = Trader(trader_id='mm')
+    for price, quantity in bids:
+        market_maker.submit_order_to_order_book('limit_buy', price, quantity, book, verbose=False)
+    return book
+
+
+def test_a_stop_activates_another_stop_in_the_same_pass():
+    book = book_with_bids([(98, 1), (97, 1), (96, 5)])
+    first, second, seller = Trader(trader_id='first'), Trader(trader_id='second'), Trader(trader_id='seller')
+    first.submit_order_to_order_book('stop_sell', 98, 1, book, verbose=False)
+    second.submit_order_to_order_book('stop_sell', 97, 1, book, verbose=False)
+
+    # the sale at 98 activates the stop at 98, that sells at 97 and activates the stop at 97
+    seller.submit_order_to_order_book('market_sell', None, 1, book, time=10, verbose=False)
+
+    assert [(trade.price, trade.trader_id_coming_in_book) for trade in book.trades[10]] == [(98, 'seller'), (97, 'first'), (96, 'second')]
+    assert len(book.trigger_book) == 0
+
+
+def test_a_stop_is_cancelled_with_its_order_id():
+    book = book_with_bids([(98, 1), (97, 1)])
+    trader, seller = Trader(trader_id='trader'), Trader(trader_id='seller')
+    order_id = trader.submit_order_to_order_book('stop_sell', 98, 1, book, verbose=False)
+
+    # another trader can't cancel it
+    seller.cancel_conditional_order(order_id, book)
+    assert book.trigger_book.return_orders_of_trader('trader') == [(98, 1, order_id, 'stop_sell')]
+
+    trader.cancel_conditional_order(order_id, book)
+    seller.submit_order_to_order_book('market_sell', None, 1, book, time=10, verbose=False)
+
+    assert [trade.price for trade in book.trades[10]] == [98]
+    assert len(book.trigger_book) == 0
+
+
+def test_a_stop_already_crossed_waits_for_the_next_trade():
+    book = book_with_bids([(98, 1), (97, 1)])
+    trader, seller = Trader(trader_id='trader'), Trader(trader_id='seller')
+    seller.submit_order_to_order_book('market_sell', None, 1, book, time=10, verbose=False)
+
+    # the last trade was at 98, below the trigger price of the stop
+    trader.submit_order_to_order_book('stop_sell', 99, 1, book, time=11, verbose=False)
+    assert len(book.trigger_book) == 1
+
+    seller.submit_order_to_order_book('limit_buy', 95, 1, book, time=12, verbose=False)
+    assert len(book.trigger_book) == 1
+
+    # the next trade activates it
+    seller.submit_order_to_order_book('market_sell', None, 1, book, time=13, verbose=False)
+    assert [(trade.price, trade.trader_id_coming_in_book) for trade in book.trades[13]] == [(97, 'seller'), (95, 'trader')]
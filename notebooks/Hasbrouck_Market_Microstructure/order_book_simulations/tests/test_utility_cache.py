@@ -0,0 +1,38 @@
+import numpy as np
+
+from classes.utility_cache import UtilityCache
+
+
+def test_rows_with_nan_hit_the_cache():
+    cache = UtilityCache()
+    # the best ask is nan: the ask side of the book is empty
+    prefix = (99.5, np.nan)
+    columns = [np.array([1.0, np.nan]), np.array([100.0, 101.0])]
+
+    for key in cache.keys_of_rows(prefix, columns):
+        cache.put(key, 'do_nothing')
+
+    keys = cache.keys_of_rows(prefix, columns)
+    assert keys[1] == (99.5, None, None, 101.0)
+    assert [cache.get(key) for key in keys] == ['do_nothing', 'do_nothing']
+    assert cache.statistics()['hits'] == 2
+    assert cache.statistics()['items'] == 2
+
+    # a single key of the same problem is the same
+    assert cache.key(99.5, np.nan, np.nan, 101.0) == keys[1]
+
+
+def test_clear_resets_the_statistics():
+    cache = UtilityCache(max_items=1)
+
+    @cache.memoize
+    def square(x):
+        return x * x
+
+    square(2.0), square(2.0), square(3.0)
+    assert cache.statistics() == {'hits': 1, 'misses': 2, 'evictions': 1, 'items': 1, 'hit_rate': 1 / 3}
+
+    cache.clear()
+    assert cache.statistics() == {'hits': 0, 'misses': 0, 'evictions': 0, 'items': 0, 'hit_rate': 0}
+    assert square(3.0) == 9.0
+    assert cache.statistics()['misses'] == 1
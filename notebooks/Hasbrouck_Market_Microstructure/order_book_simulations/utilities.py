@@ -1,5 +1,4 @@
 from typing import List
-from matplotlib import pyplot as plt
 
 
 def number_of_decimal_digits(number):
@@ -67,6 +66,8 @@ def plot_order_flow(book_state_sequence: List[List], price_sequence: List =None,
                             3rd place in the example) if the price didn't move (notice that its volume is 0 and the price didn't change)
         - ticksize (float): size of minimum tick. if ask or bid are missing between ticks, an order with volume = 0 will be added in that price level
     """
+    from matplotlib import pyplot as plt # imported here, so that importing utilities doesn't load matplotlib
+
     # Step 1: plot the order book in each timestep
 
     # Get Bid and Ask data in two different lists
@@ -0,0 +1,125 @@
+"""
+This file implements the deseasoning of the temperatures of many stations at once.
+
+Instead of fitting a model station by station, the temperatures are stacked in a (days x stations) matrix
+and the same regression is fitted for every station with one least squares solve:
+
+temperature_t = intercept + trend * t + sum_k (a_k * cos(2 pi k t / period) + b_k * sin(2 pi k t / period)) + residual_t
+
+with method='harmonic', or with one dummy per month instead of the harmonics with method='monthly'.
+
+Missing values are handled with a mask: every station is fitted only on its observed days. The normal equations
+X' M_s X beta_s = X' M_s y_s of all the stations s are built with two matrix products and solved together,
+so thousands of stations take seconds. Stations with less than min_observations observed days get nan.
+
+The residuals are the deseasoned temperatures, a (days x stations) DataFrame ready for the analysis.
+The annual difference used in temperature_dataset_deseasoning.ipynb is simply panel.diff(365) on the same matrix.
+Example:
+
+store = TemperatureStore('data', 'cache')
+panel = Deseasoner.to_panel(store.load(countries=['US'], columns=['TMAX']), 'TMAX')
+
+deseasoner = Deseasoner(method='harmonic', number_of_harmonics=2)
+residuals = deseasoner.deseason(panel)
+deseasoner.coefficients # one row per station
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Deseasoner():
+
+    methods = ('harmonic', 'monthly')
+
+    def __init__(self, method='harmonic', number_of_harmonics=2, trend=True, period=365.25, min_observations=60):
+        if method not in self.methods:
+            raise ValueError(f'valid values for method are {self.methods}.\nYou passed {method}')
+
+        self.method = method
+        self.number_of_harmonics = number_of_harmonics # number of sine / cosine pairs of the harmonic regression
+        self.trend = trend # if True a linear trend is fitted too
+        self.period = period # length of the seasonal cycle in days
+        self.min_observations = min_observations # stations with less observed days are not fitted
+
+        self.start_date = None # dates are measured in days from the first date of the fitted panel
+        self.coefficients = None # DataFrame stations x regressors, set by fit
+
+    @staticmethod
+    def to_panel(temperature, column):
+        """(days x stations) DataFrame from a DataFrame indexed by (datetime, id) like the one of the notebooks.
+        The days without any observation are added as rows of nan, like resample('D').asfreq() in the notebook.
+        """
+        panel = temperature[column].unstack('id')
+        return panel.asfreq('D')
+
+    def design_matrix(self, dates):
+        # regressors for each date, shape (number of dates, number of regressors), and their names
+        dates = pd.DatetimeIndex(dates)
+        if self.start_date is None:
+            self.start_date = dates.min()
+        t = np.asarray((dates - self.start_date).days, dtype=float)
+
+        columns = [np.ones(len(t))]
+        names = ['intercept']
+
+        if self.trend:
+            columns.append(t / self.period) # trend per period
+            names.append('trend')
+
+        if self.method == 'harmonic':
+            for k in range(1, self.number_of_harmonics + 1):
+                angle = 2 * np.pi * k * t / self.period
+                columns.extend([np.cos(angle), np.sin(angle)])
+                names.extend([f'cos_{k}', f'sin_{k}'])
+        else:
+            # months from february to december, january is in the intercept
+            for month in range(2, 13):
+                columns.append((dates.month == month).astype(float))
+                names.append(f'month_{month}')
+
+        return np.column_stack(columns), names
+
+    def fit(self, panel):
+        # fit the regression of every station (column of the panel) with one batched solve
+        self.start_date = None
+        X, names = self.design_matrix(panel.index)
+
+        Y = panel.to_numpy(dtype=float)
+        mask = ~np.isnan(Y)
+        Y = np.where(mask, Y, 0)
+        M = mask.astype(float)
+
+        number_of_regressors = X.shape[1]
+
+        # X' M_s X for every station: the products of the pairs of regressors, summed over the observed days
+        products = (X[:, :, None] * X[:, None, :]).reshape(len(X), -1)
+        gram = (M.T @ products).reshape(-1, number_of_regressors, number_of_regressors)
+
+        # X' M_s y_s for every station, the missing values are 0 in Y
+        moments = (X.T @ Y).T
+
+        # the pseudo inverse gives the least squares solution also when a regressor is never observed
+        beta = np.einsum('sij,sj->si', np.linalg.pinv(gram), moments)
+
+        is_fitted = mask.sum(axis=0) >= self.min_observations
+        beta[~is_fitted] = np.nan
+
+        self.coefficients = pd.DataFrame(beta, index=panel.columns, columns=names)
+        return self
+
+    def seasonal_component(self, dates):
+        # fitted seasonal component (and trend) of every station for the dates, as a (days x stations) DataFrame
+        if self.coefficients is None:
+            raise ValueError('the model is not fitted yet, call fit first')
+
+        X, _ = self.design_matrix(dates)
+        return pd.DataFrame(X @ self.coefficients.to_numpy().T, index=pd.DatetimeIndex(dates), columns=self.coefficients.index)
+
+    def deseason(self, panel, refit=True):
+        # residuals of the regression, nan where the temperature is missing
+        if refit or (self.coefficients is None):
+            self.fit(panel)
+
+        seasonal_component = self.seasonal_component(panel.index)[panel.columns]
+        return panel - seasonal_component
@@ -0,0 +1,267 @@
+"""
+This file implements a cached store for the GHCN daily temperatures used in the temperature notebooks.
+Download the data here: https://www.ncei.noaa.gov/pub/data/ghcn/daily/by_year/
+
+Reading every yearly csv with pd.read_csv each time a notebook runs is slow, so the store converts them once
+to a Parquet cache with the same format of format_dataset in temperature_dataset_deseasoning.ipynb:
+one row per day and station, one column per element (TMAX, TMIN) in celsius degrees.
+Only the rows without quality problems and with the daily summary source flag W are kept.
+
+The cache is partitioned by year and by country (the first two letters of the station id), and inside a partition
+the rows are sorted by station and date, so a load reads only the partitions and the row groups of the stations,
+countries, dates and columns it needs.
+
+The yearly files are parsed in parallel, one process per file. The store keeps a manifest with the size and the
+modification time of every source file: when a file changes (for example the file of the current year is downloaded
+again) only that file is parsed again, and the cache of removed files is deleted.
+Example:
+
+store = TemperatureStore('data', 'cache')
+temperature = store.load(countries=['US'], columns=['TMAX'], start='2022-01-01')
+stations = store.load_stations('data/ghcnd-stations.txt')
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+def _ingest_file(filename, dataset_directory, elements, source_flags):
+    # parse one yearly csv and write it to the cache, return the list of written files.
+    # this is a module level function so that it can be sent to the processes of the pool
+    dataset = TemperatureStore.format_dataset(filename, elements, source_flags)
+
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    written_files = []
+
+    def visit(written_file):
+        written_files.append(os.path.relpath(written_file.path, dataset_directory))
+
+    pq.write_to_dataset(
+        pa.Table.from_pandas(dataset, preserve_index=False),
+        root_path=dataset_directory,
+        partition_cols=['year', 'country'],
+        basename_template=f'{stem}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_visitor=visit,
+        )
+
+    return written_files
+
+
+class TemperatureStore():
+
+    manifest_filename = 'manifest.json'
+    csv_columns = ['id', 'date', 'element', 'value', 'm_flag', 'q_flag', 's_flag', 'obs_time']
+
+    def __init__(self, data_directory, cache_directory, elements=('TMAX', 'TMIN'), source_flags=('W',), processes=None):
+        self.data_directory = data_directory # where the yearly csv are
+        self.cache_directory = cache_directory # where the parquet cache is written
+        self.dataset_directory = os.path.join(cache_directory, 'temperatures') # partitions of the temperatures
+        self.elements = list(elements) # elements to keep, one column each
+        self.source_flags = list(source_flags) # s_flag values to keep
+        self.processes = processes # number of processes used to parse the files, None for the number of cpus
+
+    @staticmethod
+    def format_dataset(filename, elements=('TMAX', 'TMIN'), source_flags=('W',)):
+        # read a yearly csv and format it like format_dataset of the deseasoning notebook, without the country filter
+        dataset = pd.read_csv(
+            filename,
+            header=None,
+            names=TemperatureStore.csv_columns,
+            usecols=['id', 'date', 'element', 'value', 'q_flag', 's_flag'],
+            dtype={'id': str, 'date': str, 'element': str, 'value': np.float64, 'q_flag': str, 's_flag': str},
+            )
+
+        dataset = dataset.loc[dataset['q_flag'].isna()]
+        dataset = dataset.loc[dataset['s_flag'].isin(list(source_flags))]
+        dataset = dataset.loc[dataset['element'].isin(list(elements))]
+
+        dataset['datetime'] = pd.to_datetime(dataset['date'], format='%Y%m%d')
+        dataset = dataset.pivot_table(index=['id', 'datetime'], columns='element', values='value', aggfunc='last')
+        dataset = dataset.reindex(columns=list(elements))
+
+        dataset = dataset / 10 # temperature is in decimals of celsius degrees
+        dataset = dataset.sort_index().reset_index()
+        dataset.columns.name = None
+
+        dataset['year'] = dataset['datetime'].dt.year
+        dataset['country'] = dataset['id'].str[:2]
+
+        return dataset
+
+    def source_files(self):
+        # yearly csv files of the data directory, the compressed ones are ignored
+        return sorted(glob.glob(os.path.join(self.data_directory, '*.csv')))
+
+    @staticmethod
+    def file_signature(filename):
+        stat = os.stat(filename)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def read_manifest(self):
+        path = os.path.join(self.cache_directory, self.manifest_filename)
+        if not os.path.exists(path):
+            return {'parameters': None, 'files': {}}
+
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def write_manifest(self, manifest):
+        path = os.path.join(self.cache_directory, self.manifest_filename)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def remove_cached_files(self, cached_files):
+        for cached_file in cached_files:
+            path = os.path.join(self.dataset_directory, cached_file)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def update(self):
+        """Bring the cache up to date with the source files: parse the new and the changed files in parallel
+        and delete the cache of the removed ones. Return the list of parsed files.
+        """
+        os.makedirs(self.cache_directory, exist_ok=True)
+        manifest = self.read_manifest()
+
+        parameters = {'elements': self.elements, 'source_flags': self.source_flags}
+        if manifest['parameters'] != parameters:
+            # the cache was built with other filters, build it again
+            for entry in manifest['files'].values():
+                self.remove_cached_files(entry['cached_files'])
+            manifest = {'parameters': parameters, 'files': {}}
+
+        source_files = self.source_files()
+        names = [os.path.basename(filename) for filename in source_files]
+
+        for name in list(manifest['files']):
+            if name not in names:
+                self.remove_cached_files(manifest['files'].pop(name)['cached_files'])
+
+        to_parse = []
+        for filename, name in zip(source_files, names):
+            entry = manifest['files'].get(name)
+            if (entry is None) or (entry['signature'] != self.file_signature(filename)):
+                if entry is not None:
+                    self.remove_cached_files(entry['cached_files'])
+                    del manifest['files'][name]
+                to_parse.append(filename)
+
+        if to_parse:
+            signatures = [self.file_signature(filename) for filename in to_parse]
+
+            if len(to_parse) == 1:
+                results = [_ingest_file(to_parse[0], self.dataset_directory, self.elements, self.source_flags)]
+            else:
+                # the default start method of the platform: a worker parses a whole yearly file, so its start up
+                # doesn't matter, and the parent is not forked while the threads of pyarrow are running
+                with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                    results = list(executor.map(
+                        _ingest_file,
+                        to_parse,
+                        [self.dataset_directory] * len(to_parse),
+                        [self.elements] * len(to_parse),
+                        [self.source_flags] * len(to_parse),
+                        ))
+
+            for filename, signature, cached_files in zip(to_parse, signatures, results):
+                manifest['files'][os.path.basename(filename)] = {'signature': signature, 'cached_files': cached_files}
+
+        self.write_manifest(manifest)
+
+        return to_parse
+
+    def open_dataset(self):
+        # lazy dataset of the cache, nothing is read until a scan is requested
+        return ds.dataset(
+            self.dataset_directory,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([('year', pa.int32()), ('country', pa.string())]), flavor='hive'),
+            exclude_invalid_files=True,
+            )
+
+    def load(self, stations=None, countries=None, columns=None, start=None, end=None, update=True):
+        """Load the temperatures as a DataFrame indexed by (datetime, id), like the notebooks.
+        - stations, countries: lists of station ids / two letters country codes to read, None for all
+        - columns: list of elements to read (for example ['TMAX']), None for all
+        - start, end: first and last date to read (included), None for no limit
+        Only the partitions and the columns needed are read.
+        """
+        if update:
+            self.update()
+
+        if not self.read_manifest()['files']:
+            return pd.DataFrame(columns=self.elements if columns is None else list(columns))
+
+        dataset = self.open_dataset()
+
+        conditions = []
+        if stations is not None:
+            stations = list(stations)
+            conditions.append(ds.field('id').isin(stations))
+            # the country of a station is in its id, this skips the partitions of the other countries
+            conditions.append(ds.field('country').isin(sorted(set(station[:2] for station in stations))))
+        if countries is not None:
+            conditions.append(ds.field('country').isin(list(countries)))
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions.append(ds.field('year') >= start.year)
+            conditions.append(ds.field('datetime') >= start.to_pydatetime())
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions.append(ds.field('year') <= end.year)
+            conditions.append(ds.field('datetime') <= end.to_pydatetime())
+
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+
+        if columns is None:
+            columns = self.elements
+        table = dataset.to_table(columns=['datetime', 'id'] + list(columns), filter=condition)
+
+        temperature = table.to_pandas()
+        temperature = temperature.set_index(['datetime', 'id']).sort_index()
+
+        return temperature
+
+    def load_stations(self, filename):
+        """Read the stations file ghcnd-stations.txt as a DataFrame indexed by id, with latitude, longitude, elevation
+        and state like the notebooks (for non US stations the state is the country code).
+        The file is parsed once and cached with the same invalidation of the yearly files.
+        """
+        os.makedirs(self.cache_directory, exist_ok=True)
+        cached_filename = os.path.join(self.cache_directory, 'stations.parquet')
+        signature_filename = os.path.join(self.cache_directory, 'stations.json')
+
+        signature = self.file_signature(filename)
+        if os.path.exists(cached_filename) and os.path.exists(signature_filename):
+            with open(signature_filename, 'r') as f:
+                if json.load(f) == signature:
+                    return pd.read_parquet(cached_filename)
+
+        # fixed width columns: id, latitude, longitude, elevation, state
+        stations = pd.read_fwf(
+            filename,
+            colspecs=[(0, 11), (12, 20), (21, 30), (31, 37), (38, 40)],
+            names=['id', 'latitude', 'longitude', 'elevation', 'state'],
+            dtype={'id': str, 'latitude': np.float64, 'longitude': np.float64, 'elevation': np.float64, 'state': str},
+            )
+
+        is_us = stations['id'].str[:2] == 'US'
+        stations.loc[~is_us, 'state'] = stations.loc[~is_us, 'id'].str[:2]
+        stations = stations.set_index('id')
+
+        stations.to_parquet(cached_filename)
+        with open(signature_filename, 'w') as f:
+            json.dump(signature, f)
+
+        return stations
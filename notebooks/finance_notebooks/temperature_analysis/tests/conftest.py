@@ -0,0 +1,42 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the tests import the modules like the notebooks do, from the temperature_analysis directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def _write_yearly_csv(filename, year, stations, generator):
+    # a GHCN daily file with TMAX, TMIN and PRCP of every station and day, and some rows with quality or source problems
+    rows = []
+    for day in pd.date_range(f'{year}-01-01', f'{year}-12-31', freq='D'):
+        for station in stations:
+            for element in ('TMAX', 'TMIN', 'PRCP'):
+                if generator.uniform() < 0.1:
+                    continue # missing observation
+                q_flag = 'I' if generator.uniform() < 0.02 else ''
+                s_flag = 'W' if generator.uniform() < 0.9 else '7'
+                value = int(generator.normal(150 if element == 'TMAX' else 50, 80))
+                rows.append(f'{station},{day:%Y%m%d},{element},{value},,{q_flag},{s_flag},0700')
+
+    with open(filename, 'w') as f:
+        f.write('\n'.join(rows) + '\n')
+
+
+@pytest.fixture
+def write_yearly_csv():
+    return _write_yearly_csv
+
+
+@pytest.fixture
+def data_directory(tmp_path):
+    # two yearly files of three US stations and one Canadian station
+    generator = np.random.default_rng(1)
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    for year in (2022, 2023):
+        _write_yearly_csv(directory / f'{year}.csv', year, ['USC00000001', 'USC00000002', 'USW00000003', 'CA000000004'], generator)
+    return directory
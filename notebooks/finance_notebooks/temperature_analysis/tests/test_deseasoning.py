@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from deseasoning import Deseasoner
+
+
+def random_panel(number_of_stations=6, seed=4):
+    # seasonal temperatures with a trend and missing days, one station with too few observations
+    generator = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', '2023-12-31', freq='D')
+    t = np.arange(len(dates))[:, None]
+    values = (15 + 0.001 * t + 10 * np.cos(2 * np.pi * (t - 200) / 365.25)
+              + generator.normal(0, 3, (len(dates), number_of_stations)))
+    values[generator.uniform(size=values.shape) < 0.3] = np.nan
+    values[40:, -1] = np.nan
+
+    return pd.DataFrame(values, index=dates, columns=[f'US{i:09d}' for i in range(number_of_stations)])
+
+
+@pytest.mark.parametrize('method', Deseasoner.methods)
+def test_batched_fit_matches_a_least_squares_fit_per_station(method):
+    panel = random_panel()
+    deseasoner = Deseasoner(method=method, number_of_harmonics=2)
+    residuals = deseasoner.deseason(panel)
+
+    X, names = deseasoner.design_matrix(panel.index)
+    for station in panel.columns[:-1]:
+        is_observed = panel[station].notna().to_numpy()
+        beta = np.linalg.lstsq(X[is_observed], panel[station].to_numpy()[is_observed], rcond=None)[0]
+
+        np.testing.assert_allclose(deseasoner.coefficients.loc[station, names], beta, rtol=1e-7, atol=1e-9)
+        np.testing.assert_allclose(residuals[station], panel[station] - X @ beta, rtol=1e-7, atol=1e-7)
+
+    # the last station has at most 40 observed days, less than min_observations, and is not fitted
+    assert deseasoner.coefficients.iloc[-1].isna().all()
+    assert residuals.iloc[:, -1].isna().all()
+
+
+def test_panel_from_the_notebook_format():
+    index = pd.MultiIndex.from_tuples(
+        [(pd.Timestamp('2023-01-01'), 'USA'), (pd.Timestamp('2023-01-01'), 'USB'), (pd.Timestamp('2023-01-03'), 'USA')],
+        names=['datetime', 'id'])
+    temperature = pd.DataFrame({'TMAX': [1.0, 2.0, 3.0]}, index=index)
+
+    panel = Deseasoner.to_panel(temperature, 'TMAX')
+    assert list(panel.index) == list(pd.date_range('2023-01-01', '2023-01-03'))
+    assert panel.loc['2023-01-02'].isna().all()
+    assert panel.loc['2023-01-03', 'USA'] == 3.0
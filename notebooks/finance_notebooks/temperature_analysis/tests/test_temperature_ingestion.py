@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from temperature_ingestion import TemperatureStore
+
+
+def notebook_format_dataset(filename):
+    # format_dataset of temperature_dataset_deseasoning.ipynb, without the print
+    dataset = pd.read_csv(filename, header=None, dtype={1: str, 7: str})
+
+    dataset.columns = ['id', 'date', 'element', 'value', 'm_flag', 'q_flag', 's_flag', 'obs_time']
+    dataset = dataset.loc[dataset['q_flag'].isna()]
+    dataset = dataset.loc[dataset['s_flag'] == 'W']
+    dataset = dataset.loc[dataset['element'].isin(['TMIN', 'TMAX'])]
+
+    dataset['datetime'] = pd.to_datetime(dataset['date'], format='%Y%m%d')
+    dataset = dataset[['datetime', 'id', 'value', 'element']]
+
+    dataset = dataset.set_index(['datetime', 'id', 'element'])
+    dataset = dataset['value'].unstack()
+
+    dataset = dataset / 10
+    dataset = dataset.sort_index()
+
+    us_ids = [a for a in list(dataset.index.get_level_values('id').unique()) if 'US' in a]
+    dataset = dataset.loc[dataset.index.get_level_values('id').isin(us_ids)]
+
+    return dataset
+
+
+def test_store_loads_what_the_notebook_reads(data_directory, tmp_path):
+    store = TemperatureStore(str(data_directory), str(tmp_path / 'cache'), processes=2)
+    temperature = store.load(countries=['US'])
+
+    expected = pd.concat([notebook_format_dataset(os.path.join(data_directory, f'{year}.csv')) for year in (2022, 2023)])
+    expected.columns.name = None
+    pd.testing.assert_frame_equal(temperature, expected, check_index_type=False)
+
+    # only the rows of the filters are read
+    loaded = store.load(stations=['USW00000003'], columns=['TMAX'], start='2023-03-01', end='2023-03-31')
+    dates = expected.index.get_level_values('datetime')
+    is_selected = (expected.index.get_level_values('id') == 'USW00000003') & (dates >= '2023-03-01') & (dates <= '2023-03-31')
+    assert len(loaded) > 0
+    pd.testing.assert_frame_equal(loaded, expected.loc[is_selected, ['TMAX']], check_index_type=False)
+
+
+def test_update_parses_only_the_changed_files(data_directory, tmp_path, write_yearly_csv):
+    store = TemperatureStore(str(data_directory), str(tmp_path / 'cache'), processes=2)
+    assert [os.path.basename(filename) for filename in store.update()] == ['2022.csv', '2023.csv']
+    assert store.update() == []
+
+    # the file of the current year is downloaded again with a new station, and the older file is removed
+    write_yearly_csv(data_directory / '2023.csv', 2023, ['USC00000005'], np.random.default_rng(2))
+    os.remove(data_directory / '2022.csv')
+
+    assert [os.path.basename(filename) for filename in store.update()] == ['2023.csv']
+    temperature = store.load(update=False)
+    assert sorted(temperature.index.get_level_values('id').unique()) == ['USC00000005']
+    assert set(temperature.index.get_level_values('datetime').year) == {2023}
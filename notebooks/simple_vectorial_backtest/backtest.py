@@ -15,6 +15,8 @@ The arguments of the constructor are:
 - commissions: a float representing how many basis points a transaction costs
 - number_of_instruments_long_leg: int representing how many instruments to go long
 - number_of_instruments_short_leg: int representing how many instruments to go short. If this number is 0 then the strategy is long only.
+- cache: optional PreprocessingCache (see preprocessing.py). If passed, the forward returns are computed once for each
+  prices DataFrame and shared by all the backtests that use the same cache.
 
 The weights of the long only strategy sum to 1, the weights of the long short strategy sum to 0 and their absolute value sums to 1.
 This is done in order to keep the leverage at 1.
@@ -37,7 +39,8 @@ class VectorialBacktest():
             initial_cash, 
             commissions, 
             number_of_instruments_long_leg, 
-            number_of_instruments_short_leg) -> None:
+            number_of_instruments_short_leg,
+            cache=None) -> None:
         
         self.signals = signals
         self.prices = prices
@@ -45,6 +48,7 @@ class VectorialBacktest():
         self.commissions = commissions
         self.number_of_instruments_long_leg = number_of_instruments_long_leg
         self.number_of_instruments_short_leg = number_of_instruments_short_leg
+        self.cache = cache
 
     # define if the strategy is long short or long only
     def is_longshort(self):
@@ -119,6 +123,13 @@ class VectorialBacktest():
     # compute forward returns for each asset. Forward returns are computed open to close
     # of t+1 with respect to signal t
     def get_forward_returns(self):
+        if self.cache is None:
+            return self.compute_forward_returns()
+
+        from preprocessing import content_hash # imported here, so that the backtest doesn't need the cache module
+        return self.cache.get_or_compute('forward_returns-' + content_hash(self.prices), self.compute_forward_returns)
+
+    def compute_forward_returns(self):
         # first compute open to close returns
         open_to_close_returns = (self.prices['close'] / self.prices['open']) - 1
         
@@ -0,0 +1,205 @@
+"""
+This file implements an incremental version of VectorialBacktest, for strategies that are run every day.
+
+Instead of running do_backtest over the whole history each time a new bar is available, the backtest keeps its state:
+the weights of the last date, the product of the total returns, the equity line, the running sums of the daily
+returns and the running peak and maximum drawdown of the equity line. When new bars are appended with update,
+only the new dates are computed, so the cost is O(new rows) and not O(history).
+
+The results are the same of VectorialBacktest.do_backtest run on the whole history (up to floating point rounding
+in the mean and the standard deviation of the returns, that are running sums here):
+- the weights of a date only depend on the signals of that date
+- the return of the portfolio of date t is known when the prices of date t+1 arrive, so at every update the
+  return of the last date of the previous update is completed and the equity line is extended up to the last date
+
+Signals and prices have the same format of VectorialBacktest, and the dates of every update must be after the last
+date already processed. Signals and prices are aligned like in do_backtest: a date with prices but without signals
+holds no position (and pays no costs), a date with signals but without prices has no returns.
+The state can be saved and loaded with pickle.
+Example:
+
+backtest_obj = IncrementalBacktest(initial_cash=100, commissions=5, number_of_instruments_long_leg=1, number_of_instruments_short_leg=1)
+backtest_obj.update(historical_signals_df, historical_prices_df)
+
+# every day
+todays_weights, todays_equity, backtest_metrics = backtest_obj.update(todays_signals_df, todays_prices_df)
+
+trades_df, equity_line_df, backtest_metrics = backtest_obj.results()
+"""
+
+import pickle
+import numpy as np
+import pandas as pd
+from backtest import VectorialBacktest
+
+
+class IncrementalBacktest(VectorialBacktest):
+
+    def __init__(
+            self,
+            initial_cash,
+            commissions,
+            number_of_instruments_long_leg,
+            number_of_instruments_short_leg,
+            signals=None,
+            prices=None) -> None:
+
+        super().__init__(
+            signals=None,
+            prices=None,
+            initial_cash=initial_cash,
+            commissions=commissions,
+            number_of_instruments_long_leg=number_of_instruments_long_leg,
+            number_of_instruments_short_leg=number_of_instruments_short_leg)
+
+        self.dates = [] # processed dates
+        self.weights = [] # one Series of weights per date
+        self.equity_line = [] # portfolio value of each date
+
+        self.last_weights = None # weights of the last date, used to compute the weights change of the next one
+        self.pending_weights = None # weights of the last date, waiting for the returns of the next date
+        self.pending_costs = None # costs of the last date
+        self.total_return_product = 1 # product of the total returns up to the last completed date
+
+        # running statistics of the equity line
+        self.number_of_returns = 0
+        self.mean_return = 0
+        self.sum_of_squared_deviations = 0 # Welford's algorithm for the std of the returns
+        self.peak = -np.inf
+        self.max_drawdown = 0
+
+        if signals is not None:
+            self.update(signals, prices)
+
+    def compute_weights(self, signals):
+        # weights of the long and short legs for the dates of signals, like do_backtest
+        if signals.empty:
+            return pd.DataFrame()
+
+        self.signals = signals
+        top_n = self.get_long_leg_instruments_weights()
+        bottom_n = self.get_short_leg_instruments_weights()
+        self.signals = None
+
+        portfolio_weights_df = pd.concat([top_n, bottom_n])
+        portfolio_weights_df = portfolio_weights_df['signal'].unstack()
+        return portfolio_weights_df.fillna(0)
+
+    def add_equity(self, portfolio_value):
+        # append a value to the equity line and update the running statistics
+        if self.equity_line:
+            daily_return = portfolio_value / self.equity_line[-1] - 1
+
+            self.number_of_returns += 1
+            delta = daily_return - self.mean_return
+            self.mean_return += delta / self.number_of_returns
+            self.sum_of_squared_deviations += delta * (daily_return - self.mean_return)
+
+        # same logic of _compute_max_drawdown, one value at a time
+        if portfolio_value > self.peak:
+            self.peak = portfolio_value
+        else:
+            drawdown = (self.peak - portfolio_value) / self.peak
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+
+        self.equity_line.append(portfolio_value)
+
+    def update(self, signals, prices):
+        """Append the signals and the prices of new dates. Return the weights of the last date,
+        the portfolio value of the last date and the metrics of the whole history.
+        """
+        signal_dates = signals.index.get_level_values('datetime').unique()
+        price_dates = prices.index.get_level_values('datetime').unique()
+        new_dates = price_dates.union(signal_dates).sort_values()
+
+        if self.dates and (new_dates[0] <= self.dates[-1]):
+            raise ValueError(f'new dates should be after the last date {self.dates[-1]}.\nYou passed {new_dates[0]}')
+
+        transaction_costs = self.commissions / 10000  # Convert basis points to decimal
+
+        portfolio_weights_df = self.compute_weights(signals)
+        open_to_close_returns = ((prices['close'] / prices['open']) - 1).unstack()
+
+        for date in new_dates:
+            if date in open_to_close_returns.index:
+                returns = open_to_close_returns.loc[date]
+            else:
+                returns = pd.Series(dtype=float)
+
+            # the return of the last date is the return of the portfolio over this date
+            if self.pending_weights is not None:
+                gross_return = 1 + (self.pending_weights * returns).sum()
+                total_return = gross_return * (1 - self.pending_costs)
+                self.total_return_product = self.total_return_product * total_return
+                self.add_equity(self.total_return_product * self.initial_cash)
+
+            if date in portfolio_weights_df.index:
+                weights = portfolio_weights_df.loc[date]
+                weights = weights[weights.notna()]
+
+                if self.last_weights is None:
+                    weights_change = weights
+                else:
+                    weights_change = weights.sub(self.last_weights, fill_value=0)
+
+                self.pending_costs = abs(weights_change).sum() * transaction_costs
+                self.last_weights = weights
+            else:
+                # no signals: no position on this date, the weights change is computed at the next date with signals
+                weights = pd.Series(dtype=float)
+                self.pending_costs = 0
+
+            self.pending_weights = weights
+
+            self.dates.append(date)
+            self.weights.append(weights)
+
+            if len(self.dates) == 1:
+                self.add_equity(self.initial_cash)
+
+        # the equity line has one value per date: the last one is the product of the returns up to the date before
+        return self.weights[-1], self.equity_line[-1], self.metrics()
+
+    def metrics(self):
+        # the same metrics of _compute_metrics, from the running statistics
+        cumulative_return = self.equity_line[-1] / self.equity_line[0] - 1
+        annualised_return = self.mean_return * 252 if self.number_of_returns else np.nan
+        if self.number_of_returns > 1:
+            annualised_std = np.sqrt(self.sum_of_squared_deviations / (self.number_of_returns - 1)) * np.sqrt(252)
+        else:
+            annualised_std = np.nan
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.float64(annualised_return) / annualised_std
+            calmar = np.float64(annualised_return) / abs(self.max_drawdown)
+
+        return {
+            'cumulative_return': cumulative_return,
+            'annualised_return': annualised_return,
+            'annualised_std': annualised_std,
+            'sharpe': sharpe,
+            'max_drawdown': self.max_drawdown,
+            'calmar': calmar,
+        }
+
+    def results(self):
+        # the weights, the equity line and the metrics, in the same format of do_backtest
+        index = pd.DatetimeIndex(self.dates, name='datetime')
+
+        portfolio_weights_df = pd.DataFrame(self.weights, index=index)
+        portfolio_weights_df = portfolio_weights_df.reindex(columns=sorted(portfolio_weights_df.columns)).fillna(0)
+        portfolio_weights_df.columns.name = 'asset'
+
+        equity_line_df = pd.DataFrame({'portfolio_value': self.equity_line}, index=index)
+
+        return portfolio_weights_df, equity_line_df, self.metrics()
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,208 @@
+"""
+This file implements a preprocessing pipeline for the signals and the prices of VectorialBacktest, with a cache
+shared by all the backtests, so that repeated backtests on the same universe don't repeat the same reshaping.
+
+The cache (PreprocessingCache) is keyed by a hash of the content of the inputs (content_hash), not by the
+identity of the objects: two DataFrames with the same values, index and columns share the same cache entry.
+The entries are kept in memory with a least recently used eviction, and optionally written to disk (one pickle
+file per entry), so that they survive the restart of the notebook. Cached objects are shared: don't modify them.
+
+Two kinds of objects are cached:
+- forward returns: pass the cache to VectorialBacktest and get_forward_returns is computed once per prices DataFrame
+- transformed signals: SignalPipeline applies a sequence of cross-sectional transformations (winsorize, zscore,
+  rank, neutralize) to the signals, computed once per signals DataFrame and sequence of steps
+
+Example:
+
+cache = PreprocessingCache(max_items=32, cache_directory='preprocessing_cache')
+pipeline = SignalPipeline([('winsorize', {'lower': 0.05, 'upper': 0.95}), ('zscore', {})])
+
+for number_of_instruments in [1, 2, 3]:
+    backtest_obj = VectorialBacktest(
+        signals=pipeline.transform(signals_df, cache),
+        prices=prices_df,
+        initial_cash=100,
+        commissions=5,
+        number_of_instruments_long_leg=number_of_instruments,
+        number_of_instruments_short_leg=number_of_instruments,
+        cache=cache)
+    trades_df, equity_line_df, backtest_metrics = backtest_obj.do_backtest()
+
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import pandas as pd
+
+
+def content_hash(*objects):
+    # hash of the content of DataFrames, Series, lists, tuples, dictionaries and of any other object with a deterministic repr
+    h = hashlib.sha1()
+    for obj in objects:
+        _update_hash(h, obj)
+    return h.hexdigest()
+
+
+def _update_hash(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+
+        if isinstance(obj, pd.DataFrame):
+            columns = [str(c) for c in obj.columns]
+            dtypes = [str(d) for d in obj.dtypes]
+        else:
+            columns = [str(obj.name)]
+            dtypes = [str(obj.dtype)]
+        h.update(repr((type(obj).__name__, obj.shape, columns, dtypes, list(obj.index.names))).encode())
+
+    elif isinstance(obj, (list, tuple)):
+        # the repr of long pandas objects is truncated, so the containers are hashed item by item
+        h.update(f'{type(obj).__name__}{len(obj)}'.encode())
+        for item in obj:
+            _update_hash(h, item)
+
+    elif isinstance(obj, dict):
+        h.update(f'dict{len(obj)}'.encode())
+        for key in sorted(obj, key=repr):
+            _update_hash(h, key)
+            _update_hash(h, obj[key])
+
+    else:
+        h.update(repr(obj).encode())
+
+
+class PreprocessingCache():
+
+    def __init__(self, max_items=16, cache_directory=None):
+        self.max_items = max_items # number of entries kept in memory
+        self.cache_directory = cache_directory # where the entries are written, None to keep them only in memory
+
+        self.items = OrderedDict() # key -> value, the least recently used is the first
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_directory is not None:
+            os.makedirs(cache_directory, exist_ok=True)
+
+    def filename(self, key):
+        return os.path.join(self.cache_directory, f'{key}.pkl')
+
+    def get(self, key, default=None):
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.memory_hits += 1
+            return self.items[key]
+
+        if (self.cache_directory is not None) and os.path.exists(self.filename(key)):
+            with open(self.filename(key), 'rb') as f:
+                value = pickle.load(f)
+            self.disk_hits += 1
+            self.put(key, value, write=False)
+            return value
+
+        self.misses += 1
+        return default
+
+    def put(self, key, value, write=True):
+        self.items[key] = value
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+        if write and (self.cache_directory is not None):
+            # write to a temporary file first, so that a crash doesn't leave a broken entry
+            with open(self.filename(key) + '.tmp', 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.filename(key) + '.tmp', self.filename(key))
+
+    def get_or_compute(self, key, function):
+        # return the cached value, computing and caching it with function() if it is missing
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = function()
+            self.put(key, value)
+        return value
+
+    def clear(self, disk=False):
+        # drop the items (and the files if disk is True) and reset the statistics
+        self.items = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk and (self.cache_directory is not None):
+            for filename in os.listdir(self.cache_directory):
+                if filename.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_directory, filename))
+
+    def statistics(self):
+        requests = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / requests if requests else 0,
+        }
+
+
+class SignalPipeline():
+
+    def __init__(self, steps):
+        # list of (transformation, parameters), for example [('winsorize', {'lower': 0.05, 'upper': 0.95}), ('zscore', {})]
+        for name, _ in steps:
+            if name not in ('winsorize', 'zscore', 'rank', 'neutralize'):
+                raise ValueError(f"valid transformations are ('winsorize', 'zscore', 'rank', 'neutralize').\nYou passed {name}")
+        self.steps = [(name, dict(parameters)) for name, parameters in steps]
+
+    # the transformations work on a panel of signals, indexed by datetime and with one column per asset.
+    # they are cross-sectional: each date is transformed independently
+
+    @staticmethod
+    def winsorize(panel, lower=0.01, upper=0.99):
+        # clip the signals of each date to their lower and upper quantiles
+        return panel.clip(lower=panel.quantile(lower, axis=1), upper=panel.quantile(upper, axis=1), axis=0)
+
+    @staticmethod
+    def zscore(panel):
+        # subtract the mean of each date and divide by the standard deviation
+        return panel.sub(panel.mean(axis=1), axis=0).div(panel.std(axis=1), axis=0)
+
+    @staticmethod
+    def rank(panel):
+        # percentile rank of each signal within its date
+        return panel.rank(axis=1, pct=True)
+
+    @staticmethod
+    def neutralize(panel, groups=None):
+        """Subtract the mean signal of each date. If groups is passed (a Series asset -> group, for example the sector),
+        the mean of the group is subtracted instead, so that the signal is neutral within each group.
+        """
+        if groups is None:
+            return panel.sub(panel.mean(axis=1), axis=0)
+
+        groups = pd.Series(groups).reindex(panel.columns)
+        group_means = panel.T.groupby(groups).transform('mean').T
+        return panel - group_means
+
+    def transform_panel(self, panel):
+        for name, parameters in self.steps:
+            panel = getattr(self, name)(panel, **parameters)
+        return panel
+
+    def transform(self, signals, cache=None):
+        """Apply the steps to signals (indexed by datetime and asset, with a column 'signal' like VectorialBacktest)
+        and return the transformed signals in the same format. With a cache, the result is computed once.
+        """
+        def compute():
+            panel = self.transform_panel(signals['signal'].unstack())
+            transformed = panel.stack().dropna().rename('signal').to_frame()
+            return transformed.reindex(signals.index).dropna()
+
+        if cache is None:
+            return compute()
+
+        return cache.get_or_compute('signals-' + content_hash(signals, self.steps), compute)
@@ -0,0 +1,190 @@
+"""
+This file implements resampling tests for the results of VectorialBacktest: is the Sharpe ratio of a strategy
+significantly larger than zero, or is it the result of luck?
+
+The daily returns of the strategy (or of many strategies, one column each) are resampled thousands of times under
+the null hypothesis of zero expected return, and the metrics of the backtest are computed for every replicate:
+- stationary bootstrap (Politis and Romano): the returns, demeaned, are resampled in blocks of random length with
+  mean mean_block_length, so that the autocorrelation of the returns is preserved.
+  The replicates are index arrays into the return matrix, built without loops
+- sign permutation: the sign of every daily return is flipped with probability 1/2. The returns keep their size,
+  and under the null hypothesis of returns symmetric around zero every sign pattern is equally likely
+
+The same indexes (or signs) are used for all the columns of the return matrix, so the correlation between
+the strategies is preserved. The metrics are the same of VectorialBacktest._compute_metrics (sharpe, annualised
+return and std, max drawdown, calmar), computed for all the replicates at once with array operations.
+There is no p-value for the annualised std: the null hypothesis is about the expected return, and a sign flip
+doesn't change the size of the returns, so the std of the replicates is about the same of the observed one.
+The replicates are generated in chunks that fit in max_memory bytes, optionally in parallel on a pool of processes
+(start_method chooses how the processes are started, by default the start method of the platform).
+Each chunk has its own random seed, drawn from numpy's global generator, so np.random.seed makes the results
+reproducible, with or without processes.
+Example:
+
+trades_df, equity_line_df, backtest_metrics = backtest_obj.do_backtest()
+returns = ResamplingTest.returns_from_equity_line(equity_line_df)
+
+resampling_test = ResamplingTest(number_of_replicates=10000, method='stationary_bootstrap', mean_block_length=10)
+results = resampling_test.run(returns)
+results['p_values']['sharpe']
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+
+def _resample_chunk(returns, method, number_of_replicates, mean_block_length, seed):
+    # metrics of number_of_replicates replicates of the return matrix.
+    # this is a module level function so that it can be sent to the processes of the pool
+    generator = np.random.default_rng(seed)
+    number_of_days = returns.shape[0]
+
+    if method == 'stationary_bootstrap':
+        indexes = ResamplingTest.stationary_bootstrap_indexes(generator, number_of_days, number_of_replicates, mean_block_length)
+        replicates = returns[indexes] # (replicates, days, strategies)
+    else:
+        signs = generator.choice(np.array([-1.0, 1.0]), size=(number_of_replicates, number_of_days, 1))
+        replicates = signs * returns[None, :, :]
+
+    return ResamplingTest.compute_metrics(replicates, axis=1)
+
+
+class ResamplingTest():
+
+    methods = ('stationary_bootstrap', 'sign_permutation')
+
+    def __init__(self, number_of_replicates=1000, method='stationary_bootstrap', mean_block_length=20, max_memory=2**28, processes=None, start_method=None):
+        if method not in self.methods:
+            raise ValueError(f'valid values for method are {self.methods}.\nYou passed {method}')
+        if start_method is not None and start_method not in multiprocessing.get_all_start_methods():
+            raise ValueError(f'valid values for start_method are {multiprocessing.get_all_start_methods()} or None.\nYou passed {start_method}')
+
+        self.number_of_replicates = number_of_replicates
+        self.method = method
+        self.mean_block_length = mean_block_length # mean length of the blocks of the stationary bootstrap
+        self.max_memory = max_memory # bytes of the arrays of a chunk of replicates
+        self.processes = processes # number of processes, None to compute the chunks in this process
+        self.start_method = start_method # start method of the processes, None for the default of the platform
+
+    @staticmethod
+    def returns_from_equity_line(equity_line_df):
+        # daily returns of the equity line returned by do_backtest, the same used by _compute_metrics
+        return equity_line_df['portfolio_value'].pct_change().dropna()
+
+    @staticmethod
+    def stationary_bootstrap_indexes(generator, number_of_days, number_of_replicates, mean_block_length):
+        """(replicates, days) array of indexes: every block starts at a random day and continues with the next days
+        (wrapping around the end), a new block starts with probability 1 / mean_block_length.
+        """
+        shape = (number_of_replicates, number_of_days)
+        starts = generator.integers(0, number_of_days, size=shape)
+        new_block = generator.random(shape) < 1 / mean_block_length
+        new_block[:, 0] = True
+
+        # position of the start of the block of each day
+        days = np.arange(number_of_days)
+        block_start = np.maximum.accumulate(np.where(new_block, days, 0), axis=1)
+
+        return (np.take_along_axis(starts, block_start, axis=1) + days - block_start) % number_of_days
+
+    @staticmethod
+    def compute_metrics(returns, axis=0):
+        """Metrics of _compute_metrics from daily returns along axis, for every other index of the array.
+        The equity line starts from 1 and is multiplied by 1 + return every day.
+        """
+        annualised_return = returns.mean(axis=axis) * 252
+        annualised_std = returns.std(axis=axis, ddof=1) * np.sqrt(252)
+
+        equity_line = np.cumprod(1 + returns, axis=axis)
+        # the first value of the equity line (1) is a peak too
+        peak = np.maximum(np.maximum.accumulate(equity_line, axis=axis), 1)
+        max_drawdown = ((peak - equity_line) / peak).max(axis=axis)
+
+        cumulative_return = np.take(equity_line, -1, axis=axis) - 1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = annualised_return / annualised_std
+            calmar = annualised_return / np.abs(max_drawdown)
+
+        return {
+            'cumulative_return': cumulative_return,
+            'annualised_return': annualised_return,
+            'annualised_std': annualised_std,
+            'sharpe': sharpe,
+            'max_drawdown': max_drawdown,
+            'calmar': calmar,
+        }
+
+    def chunk_size(self, number_of_days, number_of_strategies):
+        # replicates per chunk: about four float64 arrays of shape (replicates, days, strategies) are alive at the same time
+        bytes_per_replicate = 4 * 8 * number_of_days * max(number_of_strategies, 1)
+        return int(max(1, min(self.number_of_replicates, self.max_memory // bytes_per_replicate)))
+
+    def run(self, returns):
+        """Resample the daily returns (array, Series or DataFrame with one column per strategy) and return a dictionary with:
+        - observed: metrics of the returns
+        - replicates: metrics of every replicate, arrays of shape (replicates, strategies) (or (replicates,) for one strategy)
+        - p_values: for each metric but annualised_std, fraction of replicates at least as good as the observed value
+          (higher is better, lower for max_drawdown)
+        """
+        is_one_dimensional = np.ndim(returns) == 1
+        matrix = np.asarray(returns, dtype=float)
+        if is_one_dimensional:
+            matrix = matrix[:, None]
+
+        if np.isnan(matrix).any():
+            raise ValueError('returns contain nan, drop them before resampling')
+
+        observed = self.compute_metrics(matrix, axis=0)
+
+        # under the null hypothesis the expected return is zero
+        if self.method == 'stationary_bootstrap':
+            null_returns = matrix - matrix.mean(axis=0)
+        else:
+            null_returns = matrix
+
+        chunk_size = self.chunk_size(*matrix.shape)
+        chunks = [chunk_size] * (self.number_of_replicates // chunk_size)
+        if self.number_of_replicates % chunk_size:
+            chunks.append(self.number_of_replicates % chunk_size)
+
+        seeds = np.random.SeedSequence(np.random.randint(0, 2**31)).spawn(len(chunks))
+
+        arguments = [
+            [null_returns] * len(chunks),
+            [self.method] * len(chunks),
+            chunks,
+            [self.mean_block_length] * len(chunks),
+            seeds,
+        ]
+        if self.processes is None:
+            results = list(map(_resample_chunk, *arguments))
+        else:
+            # _resample_chunk is defined at the top level, so every start method works
+            context = None if self.start_method is None else multiprocessing.get_context(self.start_method)
+            with ProcessPoolExecutor(max_workers=self.processes, mp_context=context) as executor:
+                results = list(executor.map(_resample_chunk, *arguments))
+
+        replicates = {name: np.concatenate([result[name] for result in results]) for name in observed}
+
+        p_values = {}
+        for name in observed:
+            if name == 'annualised_std':
+                continue
+            if name == 'max_drawdown':
+                at_least_as_good = replicates[name] <= observed[name]
+            else:
+                at_least_as_good = replicates[name] >= observed[name]
+            p_values[name] = (1 + at_least_as_good.sum(axis=0)) / (1 + self.number_of_replicates)
+
+        if is_one_dimensional:
+            observed = {name: value[0] for name, value in observed.items()}
+            replicates = {name: value[:, 0] for name, value in replicates.items()}
+            p_values = {name: value[0] for name, value in p_values.items()}
+        elif isinstance(returns, pd.DataFrame):
+            observed = {name: pd.Series(value, index=returns.columns) for name, value in observed.items()}
+            p_values = {name: pd.Series(value, index=returns.columns) for name, value in p_values.items()}
+
+        return {'observed': observed, 'replicates': replicates, 'p_values': p_values}
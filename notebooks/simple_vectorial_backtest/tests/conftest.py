@@ -0,0 +1,24 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the tests import the modules like the notebook does, from the simple_vectorial_backtest directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@pytest.fixture
+def signals_and_prices():
+    # random signals and prices of 5 assets over 60 days, in the format of VectorialBacktest
+    generator = np.random.default_rng(123)
+    index = pd.MultiIndex.from_product(
+        [pd.date_range('2024-01-01', periods=60, freq='D'), [f'Asset_{i}' for i in range(1, 6)]],
+        names=['datetime', 'asset'])
+
+    signals = pd.DataFrame({'signal': generator.random(len(index))}, index=index)
+    open_prices = 100 * np.exp(np.cumsum(generator.normal(0, 0.01, (60, 5)), axis=0)).ravel()
+    prices = pd.DataFrame({'open': open_prices, 'close': open_prices * (1 + generator.normal(0, 0.01, len(index)))}, index=index)
+
+    return signals, prices
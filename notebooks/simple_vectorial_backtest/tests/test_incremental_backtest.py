@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import VectorialBacktest
+from incremental_backtest import IncrementalBacktest
+
+
+parameters = dict(initial_cash=100, commissions=5, number_of_instruments_long_leg=2, number_of_instruments_short_leg=1)
+
+
+def daily_updates(backtest_obj, signals, prices):
+    # update the backtest one date at a time, like a strategy run every day
+    signal_dates = signals.index.get_level_values('datetime')
+    price_dates = prices.index.get_level_values('datetime')
+    for date in price_dates.union(signal_dates).unique().sort_values():
+        backtest_obj.update(signals[signal_dates == date], prices[price_dates == date])
+    return backtest_obj
+
+
+def assert_same_results(results, expected):
+    weights, equity_line, metrics = results
+    expected_weights, expected_equity_line, expected_metrics = expected
+
+    pd.testing.assert_frame_equal(weights, expected_weights, check_names=False, check_freq=False)
+    np.testing.assert_allclose(equity_line['portfolio_value'], expected_equity_line['portfolio_value'], rtol=1e-12)
+    for name, value in expected_metrics.items():
+        assert np.isclose(metrics[name], value, rtol=1e-9), name
+
+
+def test_daily_updates_match_do_backtest(signals_and_prices):
+    signals, prices = signals_and_prices
+    expected = VectorialBacktest(signals, prices, **parameters).do_backtest()
+
+    assert_same_results(IncrementalBacktest(signals=signals, prices=prices, **parameters).results(), expected)
+    assert_same_results(daily_updates(IncrementalBacktest(**parameters), signals, prices).results(), expected)
+
+
+def test_dates_without_signals_hold_no_position(signals_and_prices):
+    signals, prices = signals_and_prices
+    # the signals of some dates are missing, and there are signals of the date after the last prices
+    signal_dates = signals.index.get_level_values('datetime')
+    signals = signals[~signal_dates.isin(signal_dates.unique()[[5, 6, 30]])]
+    prices = prices[prices.index.get_level_values('datetime') < prices.index.get_level_values('datetime').max()]
+
+    weights, equity_line, metrics = daily_updates(IncrementalBacktest(**parameters), signals, prices).results()
+    expected_weights, expected_equity_line, _ = VectorialBacktest(signals, prices, **parameters).do_backtest()
+
+    # do_backtest leaves these dates out of the weights and has no portfolio value for them,
+    # here the weights are 0 and the portfolio value doesn't change
+    pd.testing.assert_frame_equal(weights.loc[expected_weights.index], expected_weights, check_names=False, check_freq=False)
+    assert (weights.drop(expected_weights.index) == 0).all().all()
+
+    expected_equity_line = expected_equity_line.ffill()
+    np.testing.assert_allclose(equity_line['portfolio_value'], expected_equity_line['portfolio_value'], rtol=1e-12)
+    for name, value in VectorialBacktest._compute_metrics(expected_weights, expected_equity_line).items():
+        assert np.isclose(metrics[name], value, rtol=1e-9), name
+
+
+def test_update_refuses_old_dates(signals_and_prices):
+    signals, prices = signals_and_prices
+    backtest_obj = IncrementalBacktest(signals=signals, prices=prices, **parameters)
+
+    with pytest.raises(ValueError, match='new dates should be after the last date'):
+        backtest_obj.update(signals, prices)
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+from backtest import VectorialBacktest
+from preprocessing import PreprocessingCache, SignalPipeline, content_hash
+
+
+def test_content_hash_depends_on_the_content_only(signals_and_prices):
+    signals, _ = signals_and_prices
+    changed = signals.copy()
+    changed.iloc[0, 0] += 1
+
+    assert content_hash(signals) == content_hash(signals.copy())
+    assert content_hash(signals) != content_hash(changed)
+    assert content_hash(signals, [('zscore', {})]) != content_hash(signals, [('rank', {})])
+
+
+def test_cache_evicts_the_least_recently_used_and_reads_back_from_disk(tmp_path):
+    cache = PreprocessingCache(max_items=2, cache_directory=str(tmp_path))
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert list(cache.items) == ['a', 'c']
+    assert cache.get('b') == 2 # evicted from memory, read from disk
+    assert cache.get('d') is None
+    assert cache.statistics() == {'memory_hits': 1, 'disk_hits': 1, 'misses': 1, 'hit_rate': 2 / 3}
+
+    cache.clear()
+    assert cache.statistics() == {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'hit_rate': 0}
+    assert cache.get('a') == 1 # the files are kept
+
+
+def test_pipeline_with_a_cache_computes_once(signals_and_prices):
+    signals, _ = signals_and_prices
+    pipeline = SignalPipeline([('winsorize', {'lower': 0.1, 'upper': 0.9}), ('zscore', {})])
+    cache = PreprocessingCache()
+
+    expected = pipeline.transform(signals)
+    pd.testing.assert_frame_equal(pipeline.transform(signals, cache), expected)
+    pd.testing.assert_frame_equal(pipeline.transform(signals.copy(), cache), expected)
+
+    assert (cache.misses, cache.memory_hits) == (1, 1)
+    panel = expected['signal'].unstack()
+    assert panel.mean(axis=1).abs().max() < 1e-12
+    assert ((panel.std(axis=1) - 1).abs() < 1e-12).all()
+
+
+def test_pipeline_refuses_unknown_steps():
+    with pytest.raises(ValueError, match='You passed demean'):
+        SignalPipeline([('demean', {})])
+
+
+def test_backtest_with_a_cache_matches_the_backtest_without(signals_and_prices):
+    signals, prices = signals_and_prices
+    cache = PreprocessingCache()
+    parameters = dict(initial_cash=100, commissions=5, number_of_instruments_long_leg=2, number_of_instruments_short_leg=2)
+
+    _, equity_line, metrics = VectorialBacktest(signals, prices, **parameters).do_backtest()
+    for _ in range(2):
+        _, cached_equity_line, cached_metrics = VectorialBacktest(signals, prices, cache=cache, **parameters).do_backtest()
+        pd.testing.assert_frame_equal(cached_equity_line, equity_line)
+        assert cached_metrics == metrics
+
+    assert (cache.misses, cache.memory_hits) == (1, 1)
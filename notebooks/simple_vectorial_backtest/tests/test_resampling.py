@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import VectorialBacktest
+from resampling import ResamplingTest
+
+
+def test_metrics_match_compute_metrics_of_the_backtest(signals_and_prices):
+    signals, prices = signals_and_prices
+    _, equity_line_df, backtest_metrics = VectorialBacktest(
+        signals, prices, initial_cash=100, commissions=0.001, number_of_instruments_long_leg=2, number_of_instruments_short_leg=2
+        ).do_backtest()
+
+    returns = ResamplingTest.returns_from_equity_line(equity_line_df)
+    observed = ResamplingTest(number_of_replicates=10).run(returns)['observed']
+
+    for name, value in backtest_metrics.items():
+        assert np.isclose(observed[name], value, rtol=1e-9), name
+
+
+def test_replicates_match_compute_metrics_of_their_equity_lines():
+    generator = np.random.default_rng(4)
+    returns = pd.DataFrame(generator.normal(0.001, 0.01, (250, 3)), columns=['a', 'b', 'c'])
+
+    for method in ResamplingTest.methods:
+        np.random.seed(11)
+        results = ResamplingTest(number_of_replicates=7, method=method, mean_block_length=5).run(returns)
+
+        # the same replicates, one at a time
+        np.random.seed(11)
+        seed = np.random.SeedSequence(np.random.randint(0, 2**31)).spawn(1)[0]
+        generator = np.random.default_rng(seed)
+        null_returns = returns.values - returns.values.mean(axis=0) if method == 'stationary_bootstrap' else returns.values
+        if method == 'stationary_bootstrap':
+            indexes = ResamplingTest.stationary_bootstrap_indexes(generator, 250, 7, 5)
+            replicates = [null_returns[replicate_indexes] for replicate_indexes in indexes]
+        else:
+            signs = generator.choice(np.array([-1.0, 1.0]), size=(7, 250, 1))
+            replicates = [replicate_signs * null_returns for replicate_signs in signs]
+
+        for replicate_number, replicate in enumerate(replicates):
+            for column_number in range(3):
+                equity_line_df = pd.DataFrame({'portfolio_value': np.cumprod(np.r_[1, 1 + replicate[:, column_number]])})
+                for name, value in VectorialBacktest._compute_metrics(None, equity_line_df).items():
+                    assert np.isclose(results['replicates'][name][replicate_number, column_number], value, rtol=1e-9), (method, name)
+
+
+def test_processes_give_the_same_replicates():
+    returns = np.random.default_rng(8).normal(0.0005, 0.01, 300)
+
+    np.random.seed(3)
+    results = ResamplingTest(number_of_replicates=50, max_memory=4 * 8 * 300 * 20).run(returns)
+    np.random.seed(3)
+    results_with_processes = ResamplingTest(number_of_replicates=50, max_memory=4 * 8 * 300 * 20, processes=2).run(returns)
+
+    for name in results['replicates']:
+        np.testing.assert_array_equal(results['replicates'][name], results_with_processes['replicates'][name])
+    assert results['p_values'] == results_with_processes['p_values']
+
+
+def test_p_values():
+    generator = np.random.default_rng(2)
+    returns = pd.DataFrame({'skilled': generator.normal(0.003, 0.01, 500), 'lucky': generator.normal(0, 0.01, 500)})
+
+    np.random.seed(0)
+    p_values = ResamplingTest(number_of_replicates=500, method='sign_permutation').run(returns)['p_values']
+
+    assert 'annualised_std' not in p_values
+    assert p_values['sharpe']['skilled'] < 0.01
+    assert p_values['sharpe']['lucky'] > 0.05
+
+
+def test_invalid_start_method():
+    with pytest.raises(ValueError, match='start_method'):
+        ResamplingTest(start_method='teleport')